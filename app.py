@@ -1,16 +1,32 @@
+import time
 from random import shuffle
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import streamlit as st
 
-from interfaces import AVAILABLE_MODELS
+from interfaces.cache import get_default_cache
+from interfaces.jobs import DONE, FAILED
+from interfaces.service import get_review_service
+from utils import load_environment
+from utils.ingestion import SECTIONS, extract_sections_from_data
+
+load_environment()
+
+# Seconds between reruns while a review is being generated in the background
+JOB_POLL_INTERVAL = 0.5
 
 st.set_page_config(page_title="revAIsor - Scientific Article Review", layout="wide")
 
 
+@st.cache_resource
+def review_service() -> Any:
+    # The review API of server.py when REVAISOR_API_URL is set, reviews in this process otherwise
+    return get_review_service()
+
+
 @st.cache_resource
 def randomized_models() -> List[str]:
-    models = list(AVAILABLE_MODELS.keys())
+    models = review_service().models()
     shuffle(models)
     return models
 
@@ -42,6 +58,30 @@ st.markdown(
 )
 
 
+def response_cells(
+    response: Dict[str, Union[Dict[str, str], str]]
+) -> Dict[Tuple[str, Optional[str]], str]:
+    cells: Dict[Tuple[str, Optional[str]], str] = {}
+    for title, result in response.items():
+        if isinstance(result, dict):
+            for prompt_name, text in result.items():
+                cells[(title, prompt_name)] = text
+        else:
+            cells[(title, None)] = result
+    return cells
+
+
+def render_review(cells: Dict[Tuple[str, Optional[str]], str]) -> None:
+    current_title = None
+    for (title, section), text in cells.items():
+        if title != current_title:
+            st.subheader(title)
+            current_title = title
+        if section:
+            st.markdown(f"**{section.capitalize()}**")
+        st.markdown(text)
+
+
 def main() -> None:
     st.title("Welcome to revAIsor!")
     st.markdown(
@@ -55,13 +95,42 @@ def main() -> None:
 
     selected_model = st.radio("Select a model", randomized_models())
 
+    # Start from the last reviewed text, so an edit only re-reviews what changed
+    last_review = st.session_state.get("last_review", {})
     context_text = st.text_area(
-        "Explain what is the objective of your article and what is the context of your work:"
+        "Explain what is the objective of your article and what is the context of your work:",
+        value=last_review.get("context", ""),
     )
 
-    abstract_text = st.text_area("Insert your abstract text here:")
-    introduction_text = st.text_area("Insert your introduction text here:")
-    conclusion_text = st.text_area("Insert your conclusion text here:")
+    last_prompts = last_review.get("prompts", {})
+    uploaded = st.file_uploader(
+        "Or upload your article and its sections will be filled in:", type=["pdf", "tex"]
+    )
+    if uploaded is not None:
+        try:
+            sections = extract_sections_from_data(
+                uploaded.name, uploaded.getvalue(), cache=get_default_cache()
+            )
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            missing = [section for section in SECTIONS if not sections.get(section)]
+            if missing:
+                st.warning(
+                    f"Could not find the {', '.join(missing)} section(s), please paste them."
+                )
+            last_prompts = {**last_prompts, **sections}
+
+    abstract_text = st.text_area(
+        "Insert your abstract text here:", value=last_prompts.get("abstract", "")
+    )
+    introduction_text = st.text_area(
+        "Insert your introduction text here:", value=last_prompts.get("introduction", "")
+    )
+    conclusion_text = st.text_area(
+        "Insert your conclusion text here:", value=last_prompts.get("conclusion", "")
+    )
+    fused = st.checkbox("Review all sections in a single request (faster, less detailed)")
 
     if st.button("Review"):
         if not (abstract_text and introduction_text and conclusion_text):
@@ -72,6 +141,7 @@ def main() -> None:
             st.session_state["introduction"] = introduction_text
             st.session_state["conclusion"] = conclusion_text
             st.session_state["model"] = selected_model
+            st.session_state["fused"] = fused
             st.experimental_rerun()
 
 
@@ -81,13 +151,10 @@ def second_page() -> None:
     conclusion = st.session_state.get("conclusion", "")
     selected_model = st.session_state.get("model", "")
     context = st.session_state.get("context", "")
+    fused = st.session_state.get("fused", False)
     st.title("revAIsor Suggestions")
 
-    model = AVAILABLE_MODELS[selected_model]
-    if not model:
-        st.error("Invalid model selected. Please, try again.")
-        st.stop()
-
+    pending = False
     if abstract and introduction and conclusion:
         # Use the selected model to evaluate prompts
         prompts = {
@@ -96,11 +163,49 @@ def second_page() -> None:
             "conclusion": conclusion,
         }
 
-        # Get suggestions from the model
-        suggestions = model(context, prompts).response
+        # The review runs in a background worker, reruns only read its progress
+        service = review_service()
+        reviews = st.session_state.setdefault("reviews", {})
+        job_id = st.session_state.get("job_id")
+        if job_id is None:
+            last_review = st.session_state.get("last_review", {})
+            try:
+                job_id = service.submit(
+                    selected_model,
+                    context,
+                    prompts,
+                    fused=fused,
+                    previous_response=last_review.get("response"),
+                    previous_hashes=last_review.get("section_hashes"),
+                )
+            except ValueError as error:
+                st.error(f"{error} Please, try again.")
+                st.stop()
+            st.session_state["job_id"] = job_id
 
         st.write("revAIsor Response:")
-        st.write(suggestions)
+        if job_id in reviews:
+            render_review(response_cells(reviews[job_id]))
+        else:
+            snapshot = service.snapshot(job_id)
+            if snapshot is None:
+                st.error("This review is no longer available. Please, submit your text again.")
+            elif snapshot["status"] == DONE:
+                reviews[job_id] = snapshot["response"]
+                st.session_state["last_review"] = {
+                    "context": context,
+                    "prompts": prompts,
+                    "response": snapshot["response"],
+                    "section_hashes": snapshot["section_hashes"],
+                }
+                render_review(response_cells(reviews[job_id]))
+            elif snapshot["status"] == FAILED:
+                st.error(f"The review failed: {snapshot['error']}")
+            else:
+                render_review(
+                    {(title, section): text for title, section, text in snapshot["partial"]}
+                )
+                pending = True
 
     if st.button("Submit another text"):
         st.session_state.pop("abstract")
@@ -108,6 +213,12 @@ def second_page() -> None:
         st.session_state.pop("conclusion")
         st.session_state.pop("model")
         st.session_state.pop("context")
+        st.session_state.pop("fused", None)
+        st.session_state.pop("job_id", None)
+        st.experimental_rerun()
+
+    if pending:
+        time.sleep(JOB_POLL_INTERVAL)
         st.experimental_rerun()
 
 
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, Optional, Set
+
+from interfaces import AVAILABLE_ASYNC_MODELS
+from interfaces.cache import get_default_cache
+from utils import load_environment
+from utils.ingestion import SECTIONS, extract_sections
+
+
+def read_article(path: str, name: str) -> Optional[Dict[str, str]]:
+    if name.endswith(".json"):
+        with open(path, encoding="utf-8") as file:
+            return {"id": name[: -len(".json")], **json.load(file)}
+    if name.endswith((".pdf", ".tex")):
+        # Full papers are split into their sections
+        return {
+            "id": os.path.splitext(name)[0],
+            **extract_sections(path, cache=get_default_cache()),
+        }
+    if os.path.isdir(path):
+        article = {"id": name}
+        for field in ("context", *SECTIONS):
+            field_path = os.path.join(path, f"{field}.txt")
+            if os.path.exists(field_path):
+                with open(field_path, encoding="utf-8") as file:
+                    article[field] = file.read()
+        return article
+    return None
+
+
+def read_articles(path: str) -> Iterator[Dict[str, str]]:
+    # An article that can not be read (e.g. a broken PDF, or pypdf is not installed) is
+    # yielded with its error, to be reported without stopping the batch
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            article_path = os.path.join(path, name)
+            try:
+                article = read_article(article_path, name)
+            except Exception as error:
+                article_id = name if os.path.isdir(article_path) else os.path.splitext(name)[0]
+                article = {"id": article_id, "error": repr(error)}
+            if article is not None:
+                yield article
+        return
+
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                article = json.loads(line)
+                if not isinstance(article, dict):
+                    raise ValueError("An article must be a JSON object.")
+            except ValueError as error:
+                yield {"id": str(line_number), "error": repr(error)}
+            else:
+                yield {"id": str(line_number), **article}
+
+
+def read_checkpoint(path: str, model: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+
+    # The output file is the checkpoint: articles already reviewed without errors are skipped
+    done = set()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get("model") == model and "error" not in result:
+                done.add(str(result["id"]))
+    return done
+
+
+def is_rate_limited(error: Exception) -> bool:
+    # Imported here so that parsing the arguments does not pay for the HTTP clients
+    import aiohttp
+    import openai
+
+    if isinstance(error, (openai.error.RateLimitError, openai.error.ServiceUnavailableError)):
+        return True
+    return isinstance(error, aiohttp.ClientResponseError) and error.status in (429, 503)
+
+
+async def review_article(
+    article: Dict[str, Any], model: str, semaphore: asyncio.Semaphore, retries: int
+) -> Dict[str, Any]:
+    if "error" in article:
+        return {"id": article["id"], "model": model, "error": article["error"]}
+    missing = [section for section in SECTIONS if not article.get(section)]
+    if missing:
+        return {"id": article["id"], "model": model, "error": f"Missing sections: {missing}"}
+
+    prompts = {section: article[section] for section in SECTIONS}
+    attempt = 0
+    while True:
+        try:
+            interface = AVAILABLE_ASYNC_MODELS[model](
+                article.get("context", ""), prompts, semaphore=semaphore
+            )
+            result = await interface.get_result()
+            return {
+                "id": article["id"],
+                "model": model,
+                "response": result.to_response(),
+                "result": result.as_dict(),
+            }
+        except Exception as error:
+            if attempt == retries or not is_rate_limited(error):
+                return {"id": article["id"], "model": model, "error": repr(error)}
+            await asyncio.sleep(2**attempt + random.random())
+            attempt += 1
+
+
+async def run(
+    input_path: str, output_path: str, model: str, concurrency: int, articles: int, retries: int
+) -> None:
+    done = read_checkpoint(output_path, model)
+    semaphore = asyncio.Semaphore(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=articles)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        async def worker() -> None:
+            while True:
+                article = await queue.get()
+                if article is None:
+                    return
+                result = await review_article(article, model, semaphore, retries)
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                status = "error" if "error" in result else "done"
+                print(f"[{status}] {result['id']}", flush=True)
+
+        workers = [asyncio.create_task(worker()) for _ in range(articles)]
+        # Articles are read (PDFs and LaTeX parsed) in a thread, not to stall the reviews
+        articles_read = read_articles(input_path)
+        while True:
+            article = await asyncio.to_thread(lambda: next(articles_read, None))
+            if article is None:
+                break
+            if str(article["id"]) not in done:
+                await queue.put(article)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    from interfaces.llama2 import client
+
+    await client.close_async_session()
+
+
+def main() -> None:
+    load_environment()
+    parser = argparse.ArgumentParser(description="Review many articles with revAIsor.")
+    parser.add_argument("input", help="JSONL file or directory with the articles to review.")
+    parser.add_argument("-o", "--output", default="reviews.jsonl", help="JSONL results file.")
+    parser.add_argument("-m", "--model", default="GPT-3.5", choices=list(AVAILABLE_ASYNC_MODELS))
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=8, help="Maximum in-flight model calls."
+    )
+    parser.add_argument(
+        "-a", "--articles", type=int, default=4, help="Maximum articles reviewed at once."
+    )
+    parser.add_argument(
+        "-r", "--retries", type=int, default=5, help="Retries for rate-limited articles."
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(args.input, args.output, args.model, args.concurrency, args.articles, args.retries)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+
+class MockSettings:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.05,
+        token_rate: float = 500,
+        completion_tokens: int = 150,
+        error_rate: float = 0,
+        error_status: int = 503,
+        requests_per_second: float = 0,
+        seed: Optional[int] = None,
+    ):
+        # Every response costs latency +/- jitter seconds before the first token, then streams
+        # its completion tokens at token_rate tokens per second
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Like the real API, requests over the rate limit are answered with a 429
+        self.requests_per_second = requests_per_second
+        self._window = (0, 0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def first_token_delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def over_rate_limit(self) -> bool:
+        if self.requests_per_second <= 0:
+            return False
+        second = int(time.monotonic())
+        with self._lock:
+            window, count = self._window
+            count = count + 1 if window == second else 1
+            self._window = (second, count)
+            return count > self.requests_per_second
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "token_rate": self.token_rate,
+            "completion_tokens": self.completion_tokens,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+            "requests_per_second": self.requests_per_second,
+        }
+
+
+def generate_tokens(count: int) -> Iterator[str]:
+    for index in range(count):
+        yield "- Suggestion line.\n" if index % 8 == 7 else "word "
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockLLMServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.count("GET " + self.path)
+        self.send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.rstrip("/")
+        self.server.count("POST " + path)
+
+        settings = self.server.settings
+        if settings.over_rate_limit():
+            self.server.count("rate_limited")
+            self.send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"Retry-After": "1"},
+            )
+            return
+        if settings.should_fail():
+            self.server.count("errors")
+            self.send_json(
+                settings.error_status,
+                {"error": {"message": "Injected error", "type": "server_error"}},
+                {"Retry-After": "0"},
+            )
+            return
+
+        if path == "/v1/chat/completions":
+            tokens = min(settings.completion_tokens, body.get("max_tokens") or 1 << 30)
+            prompt_tokens = sum(len(m["content"]) // 4 for m in body.get("messages", []))
+            if body.get("stream"):
+                self.stream_chat(tokens)
+            else:
+                self.respond_chat(tokens, prompt_tokens)
+        elif path == "/generate":
+            tokens = min(settings.completion_tokens, body["parameters"]["max_tokens"])
+            self.respond_generate(tokens)
+        elif path == "/generate_stream":
+            tokens = min(settings.completion_tokens, body["parameters"]["max_tokens"])
+            self.stream_generate(tokens)
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def send_json(
+        self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def wait_for_completion(self, tokens: int) -> str:
+        time.sleep(
+            self.server.settings.first_token_delay() + tokens / self.server.settings.token_rate
+        )
+        return "".join(generate_tokens(tokens))
+
+    def respond_chat(self, tokens: int, prompt_tokens: int) -> None:
+        text = self.wait_for_completion(tokens)
+        self.send_json(
+            200,
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": tokens,
+                    "total_tokens": prompt_tokens + tokens,
+                },
+            },
+        )
+
+    def respond_generate(self, tokens: int) -> None:
+        self.send_json(200, {"generated_text": self.wait_for_completion(tokens)})
+
+    def stream_events(self, events: Iterator[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        time.sleep(self.server.settings.first_token_delay())
+        for event in events:
+            self.wfile.write(event.encode("utf-8"))
+            self.wfile.flush()
+
+    def paced_tokens(self, tokens: int) -> Iterator[str]:
+        for token in generate_tokens(tokens):
+            time.sleep(1 / self.server.settings.token_rate)
+            yield token
+
+    def stream_chat(self, tokens: int) -> None:
+        def events() -> Iterator[str]:
+            for token in self.paced_tokens(tokens):
+                chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        self.stream_events(events())
+
+    def stream_generate(self, tokens: int) -> None:
+        self.stream_events(
+            # Like the real server, non-ASCII text is sent as raw UTF-8
+            f"data:{json.dumps({'token': {'text': token}}, ensure_ascii=False)}\n\n"
+            for token in self.paced_tokens(tokens)
+        )
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of concurrent reviews open connections faster than the default backlog of 5
+    request_queue_size = 1024
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockHandler)
+        self.settings = settings
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode("ascii")
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.requests[name] += 1
+
+    def reset_counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self.requests)
+            self.requests.clear()
+        return counts
+
+    def start(self) -> "MockLLMServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve a stand-in for the OpenAI and LLAMA2 APIs for offline benchmarks."
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--token-rate", type=float, default=500)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=0,
+        help="Answer requests over this rate with 429 (0: no limit)",
+    )
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        requests_per_second=args.requests_per_second,
+    )
+    server = MockLLMServer(settings, port=args.port)
+    print(f"Mock LLM server listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import openai
+
+from benchmarks.mock_server import MockLLMServer, MockSettings
+from interfaces import AVAILABLE_MODELS, metrics
+from interfaces.gpt.interface import GPTInterface
+from interfaces.gpt.limiter import LIMITER, TokenBucket
+from interfaces.jobs import FAILED, JobQueue
+from interfaces.llama2.interface import LLAMA2Interface
+
+SECTION = (
+    "Large language models are increasingly used to support the writing of scientific "
+    "articles. In this work we evaluate how well they review the structure, grammar and "
+    "cohesion of a manuscript before submission. "
+)
+
+
+def article(index: int, words: int) -> Dict[str, str]:
+    # Unique text per review, so neither the response cache nor the summary memo kick in
+    text = " ".join(SECTION.split() * (words // len(SECTION.split()) + 1))[: words * 7]
+    return {
+        "abstract": f"Review {index}. Abstract. {text}",
+        "introduction": f"Review {index}. Introduction. {text}",
+        "conclusion": f"Review {index}. Conclusion. {text}",
+    }
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = percent / 100 * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def review_gpt(index: int, words: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    GPTInterface("Benchmark article.", article(index, words), use_cache=False).get_response()
+    return {"latency": time.perf_counter() - start}
+
+
+def review_llama2(index: int, words: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    LLAMA2Interface("Benchmark article.", article(index, words), use_cache=False).get_response()
+    return {"latency": time.perf_counter() - start}
+
+
+def review_streamlit(model_name: str, queue: JobQueue) -> Callable[[int, int], Dict[str, float]]:
+    def review(index: int, words: int) -> Dict[str, float]:
+        # Same calls as app.second_page: submit a job, then follow its progress to the end
+        start = time.perf_counter()
+        first_chunk = None
+        job_id = queue.submit(
+            AVAILABLE_MODELS[model_name](
+                "Benchmark article.", article(index, words), use_cache=False
+            )
+        )
+        job = queue.get(job_id)
+        if job is None:
+            raise RuntimeError(f"Job {job_id} was evicted.")
+        for _ in job.stream():
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+        snapshot = job.snapshot()
+        if snapshot["status"] == FAILED:
+            raise RuntimeError(snapshot["error"])
+        latency = time.perf_counter() - start
+        return {"latency": latency, "first_chunk": first_chunk or latency}
+
+    return review
+
+
+def run_scenario(
+    name: str,
+    review: Callable[[int, int], Dict[str, float]],
+    server: MockLLMServer,
+    concurrency: int,
+    reviews: int,
+    words: int,
+) -> Dict[str, Any]:
+    calls: List[metrics.CallRecord] = []
+    metrics.add_hook(calls.append)
+    server.reset_counts()
+
+    samples: List[Dict[str, float]] = []
+    errors: Dict[str, int] = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(review, index, words) for index in range(reviews)]
+        for future in futures:
+            try:
+                samples.append(future.result())
+            except Exception as error:
+                errors[type(error).__name__] = errors.get(type(error).__name__, 0) + 1
+    wall_time = time.perf_counter() - start
+    metrics.remove_hook(calls.append)
+
+    latencies = [sample["latency"] for sample in samples]
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "reviews": reviews,
+        "completed": len(samples),
+        "errors": errors,
+        "wall_time": wall_time,
+        "throughput": len(samples) / wall_time,
+        "latency": {
+            "mean": statistics.mean(latencies) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "model_calls": len(calls),
+        "failed_model_calls": sum(1 for call in calls if call.error),
+        "server_requests": server.reset_counts(),
+    }
+    first_chunks = [sample["first_chunk"] for sample in samples if "first_chunk" in sample]
+    if first_chunks:
+        result["first_chunk"] = {
+            "p50": percentile(first_chunks, 50),
+            "p95": percentile(first_chunks, 95),
+            "p99": percentile(first_chunks, 99),
+        }
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the review backends against a local mock LLM server."
+    )
+    parser.add_argument("-o", "--output", help="JSON file for the results")
+    parser.add_argument(
+        "-s",
+        "--scenarios",
+        nargs="+",
+        default=["gpt", "llama2", "streamlit"],
+        choices=["gpt", "llama2", "streamlit"],
+    )
+    parser.add_argument("-c", "--concurrency", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument(
+        "-r", "--rounds", type=int, default=2, help="Reviews per worker at each concurrency"
+    )
+    parser.add_argument("-w", "--words", type=int, default=300, help="Words per section")
+    parser.add_argument("--streamlit-model", default="GPT-3.5", choices=list(AVAILABLE_MODELS))
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--token-rate", type=float, default=500)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=0,
+        help="Answer requests over this rate with 429 (0: no limit)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rpm", type=float, default=0, help="OpenAI requests per minute budget (0: unlimited)"
+    )
+    parser.add_argument(
+        "--tpm", type=float, default=0, help="OpenAI tokens per minute budget (0: unlimited)"
+    )
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_rate=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        requests_per_second=args.requests_per_second,
+        seed=args.seed,
+    )
+    server = MockLLMServer(settings).start()
+    os.environ["OPENAI_API_KEY"] = "mock"
+    os.environ["LLAMA2_API_URL"] = server.url
+    openai.api_base = server.url + "/v1"
+    LIMITER.requests = TokenBucket(args.rpm) if args.rpm > 0 else None
+    LIMITER.tokens = TokenBucket(args.tpm) if args.tpm > 0 else None
+
+    reviewers = {
+        "gpt": review_gpt,
+        "llama2": review_llama2,
+        "streamlit": review_streamlit(
+            args.streamlit_model,
+            JobQueue(workers=max(args.concurrency), history=max(args.concurrency) * args.rounds),
+        ),
+    }
+    results = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            result = run_scenario(
+                scenario,
+                reviewers[scenario],
+                server,
+                concurrency,
+                concurrency * args.rounds,
+                args.words,
+            )
+            results.append(result)
+            print(
+                f"{scenario:>10} x{concurrency:<4} {result['throughput']:8.2f} reviews/s  "
+                f"p50 {result['latency']['p50'] or 0:6.2f}s  "
+                f"p95 {result['latency']['p95'] or 0:6.2f}s  "
+                f"p99 {result['latency']['p99'] or 0:6.2f}s  "
+                f"{result['model_calls']} calls, {sum(result['errors'].values())} failed reviews",
+                file=sys.stderr,
+            )
+    server.shutdown()
+
+    report = {
+        "revision": git_revision(),
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "mock": settings.as_dict(),
+        "words_per_section": args.words,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{report['revision'] or 'latest'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
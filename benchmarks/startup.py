@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.run import git_revision
+
+# Each snippet runs in a fresh interpreter, so module caches never hide an import
+TARGETS = {
+    "list models": "from interfaces import AVAILABLE_MODELS; list(AVAILABLE_MODELS)",
+    "resolve GPT-3.5": "from interfaces import AVAILABLE_MODELS; AVAILABLE_MODELS['GPT-3.5']",
+    "resolve LLAMA2": "from interfaces import AVAILABLE_MODELS; AVAILABLE_MODELS['LLAMA2']",
+    "job queue": "import interfaces.jobs",
+    "batch cli": "import batch",
+}
+
+
+def measure(code: str, runs: int) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the cold start of revAIsor entry points.")
+    parser.add_argument("-o", "--output", help="JSON file for the results")
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = statistics.median(measure("pass", args.runs))
+    results: Dict[str, Dict[str, float]] = {}
+    for name, code in TARGETS.items():
+        timings = measure(code, args.runs)
+        # The interpreter start up is the same for every target and is reported apart
+        results[name] = {
+            "median": statistics.median(timings) - baseline,
+            "min": min(timings) - baseline,
+        }
+        print(f"{name:>16} {results[name]['median'] * 1000:8.1f} ms", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "interpreter": baseline,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"startup-{report['revision'] or 'latest'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
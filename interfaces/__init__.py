@@ -1,8 +1,23 @@
-from collections import defaultdict
+from importlib.util import find_spec
 
-from interfaces.gpt.interface import GPTInterface
-from interfaces.llama2.interface import LLAMA2Interface
+from interfaces.registry import BackendRegistry
 
-AVAILABLE_MODELS = defaultdict(
-    int, {"GPT-3.5": GPTInterface, "LLAMA2": LLAMA2Interface}  # type: ignore
+AVAILABLE_MODELS = BackendRegistry(
+    "revaisor.backends",
+    {
+        "GPT-3.5": "interfaces.gpt.interface:GPTInterface",
+        "LLAMA2": "interfaces.llama2.interface:LLAMA2Interface",
+        "Auto": "interfaces.routing:RoutingInterface",
+    },
+)
+# Only offered where llama-cpp-python is installed (found without importing it)
+if find_spec("llama_cpp") is not None:
+    AVAILABLE_MODELS.register("LLAMA2 (local)", "interfaces.llama2.local:LocalLLAMA2Interface")
+
+AVAILABLE_ASYNC_MODELS = BackendRegistry(
+    "revaisor.async_backends",
+    {
+        "GPT-3.5": "interfaces.gpt.async_interface:AsyncGPTInterface",
+        "LLAMA2": "interfaces.llama2.async_interface:AsyncLLAMA2Interface",
+    },
 )
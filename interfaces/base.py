@@ -1,8 +1,150 @@
+import asyncio
+import hashlib
+import json
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from interfaces import grammar, metrics
+from interfaces.cache import ResponseCache, get_default_cache
+from interfaces.chunking import (
+    chunk_budget,
+    count_prompt_tokens,
+    count_tokens,
+    get_context_window,
+    max_output_tokens,
+    merge_suggestions,
+    split_text,
+)
+from interfaces.coalescing import IN_FLIGHT, Abandoned, Flight
+from interfaces.results import ReviewResult
+
+EvaluationFutures = Dict[str, Union[Dict[str, Future], Future]]
+Response = Dict[str, Union[Dict[str, str], str]]
+Cell = Tuple[str, Optional[str]]
+
+_backend_slots: Dict[type, threading.BoundedSemaphore] = {}
+_backend_slots_lock = threading.Lock()
+
+
+def backend_slots(backend: Type["BaseInterface"]) -> threading.BoundedSemaphore:
+    # Calls in flight to a backend, shared by every review, chunk and summary of the process:
+    # the executors only fan the work out, this is what bounds the load on the model
+    with _backend_slots_lock:
+        if backend not in _backend_slots:
+            _backend_slots[backend] = threading.BoundedSemaphore(backend.max_concurrency)
+        return _backend_slots[backend]
+
+
+def semantic_namespace(*parts: Any) -> str:
+    # Only inputs sharing everything but the compared text (backend, model, evaluation,
+    # article context, temperature) may answer for each other
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def build_request(prompt: Any, temperature: float, max_tokens: int, top_p: float) -> Dict[str, Any]:
+    return {
+        "prompt": prompt,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": top_p,
+    }
+
+
+def section_hashes(
+    backend: str, model: Optional[str], context: str, prompts: Dict[str, str]
+) -> Dict[str, str]:
+    # The context is part of every prompt, so changing it invalidates every section
+    return {
+        prompt_name: hashlib.sha256(
+            json.dumps([backend, model, context, prompt_text]).encode("utf-8")
+        ).hexdigest()
+        for prompt_name, prompt_text in prompts.items()
+    }
+
+
+def carried_over_cells(
+    evaluations: List[Dict[str, Any]],
+    hashes: Dict[str, str],
+    previous_response: Optional[Response],
+    previous_hashes: Optional[Dict[str, str]],
+) -> Dict[Cell, str]:
+    # Results of a previous review whose inputs did not change and can be reused as they are
+    if not previous_response or not previous_hashes:
+        return {}
+
+    unchanged = [name for name, digest in hashes.items() if previous_hashes.get(name) == digest]
+    # Cross-section evaluations (e.g. cohesion) read every section, so any change reruns them
+    all_unchanged = len(unchanged) == len(hashes) and set(previous_hashes) == set(hashes)
+
+    cells: Dict[Cell, str] = {}
+    for evaluation in evaluations:
+        title = evaluation["title"]
+        previous = previous_response.get(title)
+        if evaluation.get("per_section"):
+            if isinstance(previous, dict):
+                for prompt_name in unchanged:
+                    if isinstance(previous.get(prompt_name), str):
+                        cells[(title, prompt_name)] = previous[prompt_name]
+        elif all_unchanged and isinstance(previous, str):
+            cells[(title, None)] = previous
+    return cells
+
+
+def count_usage(
+    record: metrics.CallRecord, prompt: Any, response: str, model: Optional[str]
+) -> None:
+    # Backends that do not report usage (streams, LLAMA2) get the local estimate, calls
+    # answered by the cache or by another in-flight call cost nothing
+    if record.cache_hit or record.coalesced or record.prompt_tokens is not None:
+        return
+    record.prompt_tokens = count_prompt_tokens(prompt, model)
+    record.completion_tokens = count_tokens(response, model)
+
+
+def semantic_hit(backend: str, model: Optional[str]) -> metrics.CallRecord:
+    # The call a semantic cache hit stands for, so the results count it as answered by a cache
+    record = metrics.CallRecord(backend, model)
+    record.cache_hit = True
+    record.finish()
+    metrics.emit(record)
+    return record
+
+
+def parse_fused_response(
+    text: str, evaluations: List[Dict[str, Any]], prompts: Dict[str, str]
+) -> Optional[Dict[str, Union[Dict[str, str], str]]]:
+    # Models often wrap the JSON in prose or code fences, so only the outermost object is parsed
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        parsed = json.loads(text[start : end + 1])
+    except ValueError:
+        return None
+
+    evaluation_results: Dict[str, Union[Dict[str, str], str]] = {}
+    for evaluation in evaluations:
+        result = parsed.get(evaluation["title"]) if isinstance(parsed, dict) else None
+        if evaluation.get("per_section"):
+            if not isinstance(result, dict) or not all(
+                isinstance(result.get(prompt_name), str) for prompt_name in prompts
+            ):
+                return None
+            evaluation_results[evaluation["title"]] = {
+                prompt_name: result[prompt_name] for prompt_name in prompts
+            }
+        elif isinstance(result, str):
+            evaluation_results[evaluation["title"]] = result
+        else:
+            return None
+    return evaluation_results
 
 
 class BaseInterface(ABC):
+    max_concurrency: int = 4
+    default_context_window: Optional[int] = None
+
     def __init__(
         self,
         context: str,
@@ -11,6 +153,11 @@ class BaseInterface(ABC):
         evaluations: List[Dict[str, Any]],
         max_tokens: int = 10000,
         temperature: float = 0.5,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
     ):
         self.context = context
         self.prompts = prompts
@@ -18,18 +165,589 @@ class BaseInterface(ABC):
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.evaluations = evaluations
-        self.response = self.get_response()
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        self.context_window = self.default_context_window or get_context_window(model)
+        self.cache = get_default_cache() if use_cache else None
+        self.fused = fused
+        # Keep section_hashes with the response to pass both back when the text is edited
+        self.section_hashes = section_hashes(type(self).__name__, model, context, prompts)
+        self.carried_over = carried_over_cells(
+            evaluations, self.section_hashes, previous_response, previous_hashes
+        )
+        # Every model call made by this review, attributed to its (evaluation, section)
+        self.records: List[metrics.CallRecord] = []
+        self._response: Optional[Dict[str, Union[Dict[str, str], str]]] = None
+        self._stream = threading.local()
+
+    @property
+    def response(self) -> Dict[str, Union[Dict[str, str], str]]:
+        if self._response is None:
+            self._response = self.get_response()
+        return self._response
+
+    def get_result(self) -> ReviewResult:
+        return ReviewResult.build(
+            type(self).__name__,
+            self.model,
+            self.response,
+            self.records,
+            self.carried_over,
+            self.section_hashes,
+        )
 
     @abstractmethod
     def validate_initialization(self):
         pass
 
-    def get_response(self) -> Dict[str, Dict[str, str]]:
+    @abstractmethod
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        pass
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        yield self._call_model(request)
+
+    def fused_prompt(self) -> Optional[Any]:
+        return None
+
+    def evaluate_fused(self) -> Optional[Dict[str, Union[Dict[str, str], str]]]:
+        prompt = self.fused_prompt()
+        # All sections in one request must still leave room for an answer covering all of them
+        if prompt is None or count_prompt_tokens(prompt, self.model) > self.context_window // 2:
+            return None
+
+        text = self.call_model(
+            prompt=prompt, temperature=0, max_tokens=self.max_tokens, stream=False
+        )
+        return parse_fused_response(text, self.evaluations, self.prompts)
+
+    def call_model(
+        self,
+        prompt: Any,
+        temperature: float,
+        max_tokens: int,
+        top_p: float = 0.5,
+        stream: bool = True,
+    ) -> str:
+        # Never ask for more output than what is left of the model context window
+        max_tokens = max_output_tokens(prompt, self.model, self.context_window, max_tokens)
+        request = build_request(prompt, temperature, max_tokens, top_p)
+        # Only calls made from a streaming evaluation have a sink to forward chunks to
+        sink: Optional[Callable[[str], None]] = getattr(self._stream, "sink", None)
+        if not stream:
+            sink = None
+
+        record = metrics.CallRecord(type(self).__name__, self.model)
+        token = metrics.current_call.set(record)
+        try:
+            response = self._complete(request, sink, record)
+        except Exception as error:
+            record.finish(error)
+            raise
+        else:
+            record.finish()
+            count_usage(record, prompt, response, self.model)
+            return response
+        finally:
+            metrics.current_call.reset(token)
+            self.records.append(record)
+            metrics.emit(record)
+
+    def _complete(
+        self,
+        request: Dict[str, Any],
+        sink: Optional[Callable[[str], None]],
+        record: metrics.CallRecord,
+    ) -> str:
+        key = ResponseCache.key(type(self).__name__, self.model, request)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                record.cache_hit = True
+                if sink is not None:
+                    sink(cached)
+                return cached
+
+        # An identical call already in flight (e.g. another session reviewing the same text)
+        # is awaited instead of sent again, and its chunks are replayed to this sink
+        flight, leader = IN_FLIGHT.join(key, streaming=sink is not None)
+        if not leader:
+            record.coalesced = True
+            return flight.wait(sink)
+
+        try:
+            with backend_slots(type(self)):
+                if sink is None:
+                    response = self._call_model(request)
+                else:
+                    flight.subscribe(sink)
+                    chunks = []
+                    for chunk in self._stream_model(request):
+                        record.first_token()
+                        chunks.append(chunk)
+                        flight.publish(chunk)
+                    response = "".join(chunks)
+
+            if self.cache is not None:
+                self.cache.set(key, response)
+        except BaseException as error:
+            IN_FLIGHT.finish(key, flight, error=error)
+            raise
+        IN_FLIGHT.finish(key, flight, response)
+        return response
+
+    def evaluate_in_chunks(
+        self,
+        text: str,
+        build_prompt: Callable[[str], Any],
+        temperature: float,
+        top_p: float = 0.5,
+        stream: bool = True,
+        reserved_tokens: int = 0,
+    ) -> str:
+        budget = chunk_budget(build_prompt(""), self.model, self.context_window, reserved_tokens)
+        chunks = split_text(text, budget, self.model)
+        if len(chunks) == 1:
+            return self.call_model(
+                prompt=build_prompt(text),
+                temperature=temperature,
+                max_tokens=self.max_tokens,
+                top_p=top_p,
+                stream=stream,
+            )
+
+        def evaluate_chunk(chunk: str) -> str:
+            return self.call_model(
+                prompt=build_prompt(chunk),
+                temperature=temperature,
+                max_tokens=self.max_tokens,
+                top_p=top_p,
+                stream=False,
+            )
+
+        # Chunk calls are attributed to the evaluation that spawned them
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.max_concurrency)) as executor:
+            futures = [
+                executor.submit(metrics.in_context(evaluate_chunk), chunk) for chunk in chunks
+            ]
+            response = merge_suggestions([future.result() for future in futures])
+
+        sink = getattr(self._stream, "sink", None)
+        if stream and sink is not None:
+            sink(response)
+        return response
+
+    def semantic_cache(self) -> Optional[Any]:
+        # numpy is only imported once a review looks something up in the semantic cache
+        from interfaces.semantic_cache import get_default_semantic_cache
+
+        return get_default_semantic_cache() if self.cache is not None else None
+
+    def evaluate_similar(self, evaluation: str, text: str, evaluate: Callable[[], str]) -> str:
+        # A near duplicate of a past input (e.g. a section resubmitted with a comma changed)
+        # is answered with the review stored for it. This runs before the calls reach the
+        # response cache, so exact duplicates are answered here too
+        cache = self.semantic_cache()
+        if cache is None:
+            return evaluate()
+
+        namespace = semantic_namespace(
+            type(self).__name__, self.model, evaluation, self.context, self.temperature
+        )
+        labels = {"backend": type(self).__name__, "evaluation": evaluation}
+        match = cache.get(namespace, text)
+        if match is not None:
+            metrics.REGISTRY.increment("revaisor_semantic_cache_total", {**labels, "result": "hit"})
+            self.records.append(semantic_hit(type(self).__name__, self.model))
+            sink = getattr(self._stream, "sink", None)
+            if sink is not None:
+                sink(match[1])
+            return match[1]
+
+        metrics.REGISTRY.increment("revaisor_semantic_cache_total", {**labels, "result": "miss"})
+        response = evaluate()
+        cache.set(namespace, text, response)
+        return response
+
+    def evaluate_grammar(
+        self, text: str, build_prompt: Callable[[str], Any], temperature: float
+    ) -> str:
+        if not grammar.PREPASS_ENABLED:
+            return self.evaluate_in_chunks(text, build_prompt, temperature=temperature)
+
+        if grammar.SKIP_CLEAN and not grammar.GrammarCheck(text).findings:
+            sink = getattr(self._stream, "sink", None)
+            if sink is not None:
+                sink(grammar.NO_FINDINGS)
+            return grammar.NO_FINDINGS
+
+        # Every chunk is sized with room for its hints, so they never push the prompt past the
+        # context window
+        reserved = grammar.hint_budget(self.context_window)
+        return self.evaluate_in_chunks(
+            text,
+            grammar.with_hints(build_prompt, reserved, self.model),
+            temperature=temperature,
+            reserved_tokens=reserved,
+        )
+
+    def _run_evaluation(
+        self,
+        method: Callable[..., str],
+        title: str,
+        section: Optional[str],
+        events: Optional[Queue],
+        *args: str,
+    ) -> str:
+        if events is not None:
+            self._stream.sink = lambda chunk: events.put((title, section, chunk))
+        token = metrics.current_evaluation.set((title, section))
+        try:
+            return method(*args)
+        finally:
+            metrics.current_evaluation.reset(token)
+            if events is not None:
+                self._stream.sink = None
+                events.put((title, section, None))
+
+    def _submit_evaluations(
+        self, executor: ThreadPoolExecutor, events: Optional[Queue] = None
+    ) -> EvaluationFutures:
+        # Fan out every (evaluation x section) call, bounded by the backend concurrency limit
+        def submit(
+            method: Callable[..., str], title: str, section: Optional[str], *args: str
+        ) -> Future:
+            if (title, section) not in self.carried_over:
+                return executor.submit(self._run_evaluation, method, title, section, events, *args)
+
+            future: Future = Future()
+            future.set_result(self.carried_over[(title, section)])
+            if events is not None:
+                events.put((title, section, future.result()))
+                events.put((title, section, None))
+            return future
+
+        futures: EvaluationFutures = {}
+        for evaluation in self.evaluations:
+            title = evaluation["title"]
+            if evaluation.get("per_section"):
+                futures[title] = {
+                    prompt_name: submit(evaluation["method"], title, prompt_name, prompt_text)
+                    for prompt_name, prompt_text in self.prompts.items()
+                }
+            else:
+                futures[title] = submit(evaluation["method"], title, None)
+        return futures
+
+    @staticmethod
+    def _collect_evaluations(futures: EvaluationFutures) -> Dict[str, Union[Dict[str, str], str]]:
+        evaluation_results: Dict[str, Union[Dict[str, str], str]] = {}
+        for title, future in futures.items():
+            if isinstance(future, dict):
+                evaluation_results[title] = {
+                    prompt_name: section_future.result()
+                    for prompt_name, section_future in future.items()
+                }
+            else:
+                evaluation_results[title] = future.result()
+        return evaluation_results
+
+    def get_response(self) -> Dict[str, Union[Dict[str, str], str]]:
+        self.validate_initialization()
+
+        # A fused call recomputes every cell, so it is only worth it when nothing carries over
+        if self.fused and not self.carried_over:
+            fused_response = self.evaluate_fused()
+            if fused_response is not None:
+                return fused_response
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return self._collect_evaluations(self._submit_evaluations(executor))
+
+    def stream_response(self) -> Iterator[Tuple[str, Optional[str], str]]:
         self.validate_initialization()
 
-        # Execute each evaluation method and store the results
-        evaluation_results = {}
+        # A fused call recomputes every cell, so it is only worth it when nothing carries over
+        if self.fused and not self.carried_over:
+            fused_response = self.evaluate_fused()
+            if fused_response is not None:
+                for title, result in fused_response.items():
+                    if isinstance(result, dict):
+                        for prompt_name, text in result.items():
+                            yield title, prompt_name, text
+                    else:
+                        yield title, None, result
+                self._response = fused_response
+                return
+
+        # Yields (evaluation title, section or None, text chunk) as soon as the backend emits it
+        events: Queue = Queue()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            futures = self._submit_evaluations(executor, events)
+            pending = sum(len(f) if isinstance(f, dict) else 1 for f in futures.values())
+            while pending:
+                title, section, chunk = events.get()
+                if chunk is None:
+                    pending -= 1
+                else:
+                    yield title, section, chunk
+
+            self._response = self._collect_evaluations(futures)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncBaseInterface(ABC):
+    max_concurrency: int = 4
+    default_context_window: Optional[int] = None
+
+    def __init__(
+        self,
+        context: str,
+        prompts: Dict[str, str],
+        model: Optional[str],
+        evaluations: List[Dict[str, Any]],
+        max_tokens: int = 10000,
+        temperature: float = 0.5,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
+        self.context = context
+        self.prompts = prompts
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.evaluations = evaluations
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        self.context_window = self.default_context_window or get_context_window(model)
+        self.cache = get_default_cache() if use_cache else None
+        self.fused = fused
+        self.section_hashes = section_hashes(type(self).__name__, model, context, prompts)
+        self.carried_over = carried_over_cells(
+            evaluations, self.section_hashes, previous_response, previous_hashes
+        )
+        self.records: List[metrics.CallRecord] = []
+        # A shared semaphore lets several reviews honour one global concurrency limit
+        self._semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+
+    async def get_result(self) -> ReviewResult:
+        return ReviewResult.build(
+            type(self).__name__,
+            self.model,
+            await self.get_response(),
+            self.records,
+            self.carried_over,
+            self.section_hashes,
+        )
+
+    @abstractmethod
+    async def validate_initialization(self):
+        pass
+
+    @abstractmethod
+    async def _call_model(self, request: Dict[str, Any]) -> str:
+        pass
+
+    def fused_prompt(self) -> Optional[Any]:
+        return None
+
+    async def evaluate_fused(self) -> Optional[Dict[str, Union[Dict[str, str], str]]]:
+        prompt = self.fused_prompt()
+        if prompt is None or count_prompt_tokens(prompt, self.model) > self.context_window // 2:
+            return None
+
+        text = await self.call_model(prompt=prompt, temperature=0, max_tokens=self.max_tokens)
+        return parse_fused_response(text, self.evaluations, self.prompts)
+
+    async def call_model(
+        self, prompt: Any, temperature: float, max_tokens: int, top_p: float = 0.5
+    ) -> str:
+        # Never ask for more output than what is left of the model context window
+        max_tokens = max_output_tokens(prompt, self.model, self.context_window, max_tokens)
+        request = build_request(prompt, temperature, max_tokens, top_p)
+
+        record = metrics.CallRecord(type(self).__name__, self.model)
+        token = metrics.current_call.set(record)
+        try:
+            response = await self._complete(request, record)
+        except Exception as error:
+            record.finish(error)
+            raise
+        else:
+            record.finish()
+            count_usage(record, prompt, response, self.model)
+            return response
+        finally:
+            metrics.current_call.reset(token)
+            self.records.append(record)
+            metrics.emit(record)
+
+    async def _complete(self, request: Dict[str, Any], record: metrics.CallRecord) -> str:
+        key = ResponseCache.key(type(self).__name__, self.model, request)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                record.cache_hit = True
+                return cached
+
+        while True:
+            flight, leader = IN_FLIGHT.join(key)
+            record.coalesced = not leader
+            if leader:
+                # The call runs as its own task, so cancelling the review that started it does
+                # not fail the other reviews waiting for the same response
+                task = asyncio.ensure_future(self._lead(key, flight, request))
+                loop = asyncio.get_running_loop()
+                flight.cancel = lambda: loop.call_soon_threadsafe(task.cancel)
+            try:
+                return await flight.wait_async()
+            except Abandoned:
+                continue
+            finally:
+                IN_FLIGHT.leave(key, flight)
+
+    async def _lead(self, key: str, flight: Flight, request: Dict[str, Any]) -> None:
+        try:
+            # The limit bounds model calls, so nested calls (e.g. summaries) never deadlock
+            async with self._semaphore:
+                response = await self._call_model(request)
+
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.set, key, response)
+        except asyncio.CancelledError:
+            IN_FLIGHT.finish(key, flight, error=Abandoned())
+            raise
+        except Exception as error:
+            # Raised to every waiter through the flight
+            IN_FLIGHT.finish(key, flight, error=error)
+        else:
+            IN_FLIGHT.finish(key, flight, response)
+
+    async def evaluate_in_chunks(
+        self,
+        text: str,
+        build_prompt: Callable[[str], Any],
+        temperature: float,
+        top_p: float = 0.5,
+        reserved_tokens: int = 0,
+    ) -> str:
+        budget = chunk_budget(build_prompt(""), self.model, self.context_window, reserved_tokens)
+        chunks = split_text(text, budget, self.model)
+
+        responses = await asyncio.gather(
+            *(
+                self.call_model(
+                    prompt=build_prompt(chunk),
+                    temperature=temperature,
+                    max_tokens=self.max_tokens,
+                    top_p=top_p,
+                )
+                for chunk in chunks
+            )
+        )
+        return responses[0] if len(responses) == 1 else merge_suggestions(list(responses))
+
+    def semantic_cache(self) -> Optional[Any]:
+        from interfaces.semantic_cache import get_default_semantic_cache
+
+        return get_default_semantic_cache() if self.cache is not None else None
+
+    async def evaluate_similar(
+        self, evaluation: str, text: str, evaluate: Callable[[], Awaitable[str]]
+    ) -> str:
+        cache = self.semantic_cache()
+        if cache is None:
+            return await evaluate()
+
+        namespace = semantic_namespace(
+            type(self).__name__, self.model, evaluation, self.context, self.temperature
+        )
+        labels = {"backend": type(self).__name__, "evaluation": evaluation}
+        # Embedding the text and reading SQLite would block the event loop
+        match = await asyncio.to_thread(cache.get, namespace, text)
+        if match is not None:
+            metrics.REGISTRY.increment("revaisor_semantic_cache_total", {**labels, "result": "hit"})
+            self.records.append(semantic_hit(type(self).__name__, self.model))
+            return match[1]
+
+        metrics.REGISTRY.increment("revaisor_semantic_cache_total", {**labels, "result": "miss"})
+        response = await evaluate()
+        await asyncio.to_thread(cache.set, namespace, text, response)
+        return response
+
+    async def evaluate_grammar(
+        self, text: str, build_prompt: Callable[[str], Any], temperature: float
+    ) -> str:
+        if not grammar.PREPASS_ENABLED:
+            return await self.evaluate_in_chunks(text, build_prompt, temperature=temperature)
+
+        if grammar.SKIP_CLEAN and not grammar.GrammarCheck(text).findings:
+            return grammar.NO_FINDINGS
+
+        reserved = grammar.hint_budget(self.context_window)
+        return await self.evaluate_in_chunks(
+            text,
+            grammar.with_hints(build_prompt, reserved, self.model),
+            temperature=temperature,
+            reserved_tokens=reserved,
+        )
+
+    @staticmethod
+    async def _run_evaluation(
+        method: Callable[..., Awaitable[str]], title: str, section: Optional[str], *args: str
+    ) -> str:
+        # Every task runs in its own context copy, so there is nothing to reset afterwards
+        metrics.current_evaluation.set((title, section))
+        return await method(*args)
+
+    async def get_response(self) -> Dict[str, Union[Dict[str, str], str]]:
+        await self.validate_initialization()
+
+        if self.fused and not self.carried_over:
+            fused_response = await self.evaluate_fused()
+            if fused_response is not None:
+                return fused_response
+
+        def submit(
+            method: Callable[..., Awaitable[str]], title: str, section: Optional[str], *args: str
+        ) -> asyncio.Future:
+            if (title, section) not in self.carried_over:
+                return asyncio.create_task(self._run_evaluation(method, title, section, *args))
+
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(self.carried_over[(title, section)])
+            return future
+
+        tasks: Dict[str, Union[Dict[str, asyncio.Future], asyncio.Future]] = {}
         for evaluation in self.evaluations:
-            evaluation_results[evaluation["title"]] = evaluation["method"]()
+            title = evaluation["title"]
+            if evaluation.get("per_section"):
+                tasks[title] = {
+                    prompt_name: submit(evaluation["method"], title, prompt_name, prompt_text)
+                    for prompt_name, prompt_text in self.prompts.items()
+                }
+            else:
+                tasks[title] = submit(evaluation["method"], title, None)
+
+        evaluation_results: Dict[str, Union[Dict[str, str], str]] = {}
+        try:
+            for title, task in tasks.items():
+                if isinstance(task, dict):
+                    evaluation_results[title] = {
+                        prompt_name: await section_task
+                        for prompt_name, section_task in task.items()
+                    }
+                else:
+                    evaluation_results[title] = await task
+        finally:
+            for task in tasks.values():
+                for pending in task.values() if isinstance(task, dict) else [task]:
+                    pending.cancel()
 
         return evaluation_results
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def key(backend: str, model: Optional[str], request: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {
+                "backend": backend,
+                "model": model,
+                "prompt": request["prompt"],
+                "temperature": request["temperature"],
+                "max_tokens": request["max_tokens"],
+                "top_p": request["top_p"],
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now, now)
+            )
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float) -> None:
+        self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        self._connection.execute(
+            """DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    global _default_cache
+
+    if os.getenv("REVAISOR_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.getenv("REVAISOR_CACHE_PATH", ".cache/responses.sqlite3"),
+                max_entries=int(os.getenv("REVAISOR_CACHE_MAX_ENTRIES", "10000")),
+                ttl=float(os.getenv("REVAISOR_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        return _default_cache
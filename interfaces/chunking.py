@@ -0,0 +1,158 @@
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is optional
+    tiktoken = None
+
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Tokens reserved for the chat format overhead and rounding errors of the estimate
+MESSAGE_OVERHEAD_TOKENS = 4
+SAFETY_MARGIN_TOKENS = 64
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]) -> Any:
+    if tiktoken is None or model is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        # Conservative estimate for tokenizers we can not load locally (e.g. LLAMA2)
+        return math.ceil(len(text) / 3)
+    return len(encoding.encode(text))
+
+
+def count_prompt_tokens(prompt: Any, model: Optional[str] = None) -> int:
+    if isinstance(prompt, str):
+        return count_tokens(prompt, model)
+    messages: List[Dict[str, str]] = prompt
+    return sum(
+        count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS for message in messages
+    )
+
+
+def get_context_window(model: Optional[str]) -> int:
+    return CONTEXT_WINDOWS.get(model or "", DEFAULT_CONTEXT_WINDOW)
+
+
+def max_output_tokens(prompt: Any, model: Optional[str], window: int, limit: int) -> int:
+    remaining = window - count_prompt_tokens(prompt, model) - SAFETY_MARGIN_TOKENS
+    # Sent anyway, the call would fail at the provider or be cut to a token
+    if remaining < 1:
+        raise ValueError(
+            f"The prompt leaves no room for an answer in the {window}-token context window"
+            f" of {model or 'the model'}."
+        )
+    return min(limit, remaining)
+
+
+def chunk_budget(empty_prompt: Any, model: Optional[str], window: int, reserved: int = 0) -> int:
+    # Split what the fixed part of the prompt (and the reserved tokens, e.g. for the grammar
+    # hints added to each chunk) leaves evenly between the chunk and the answer
+    overhead = count_prompt_tokens(empty_prompt, model) + reserved
+    return max(1, (window - overhead - SAFETY_MARGIN_TOKENS) // 2)
+
+
+def _split_oversized(text: str, budget: int, model: Optional[str]) -> List[str]:
+    pieces: List[str] = []
+    current: List[str] = []
+    for word in text.split():
+        if current and count_tokens(" ".join(current + [word]), model) > budget:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_text(text: str, budget: int, model: Optional[str] = None) -> List[str]:
+    if count_tokens(text, model) <= budget:
+        return [text]
+
+    # Prefer paragraph boundaries, then sentences, then plain words
+    units: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph, model) <= budget:
+            units.append(paragraph)
+            continue
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph):
+            if count_tokens(sentence, model) <= budget:
+                units.append(sentence)
+            else:
+                units.extend(_split_oversized(sentence, budget, model))
+
+    chunks: List[str] = []
+    current = ""
+    for unit in units:
+        candidate = f"{current}\n\n{unit}" if current else unit
+        if current and count_tokens(candidate, model) > budget:
+            chunks.append(current)
+            candidate = unit
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _is_header(line: str) -> bool:
+    # "## Suggestions", "**Grammar**" or "Suggestions:", but not a list item ending with ":"
+    if line.startswith("#") or (line.startswith("**") and line.endswith("**")):
+        return True
+    return line.endswith(":") and not re.match(r"([-*+•]|\d+[.)])\s", line)
+
+
+def merge_suggestions(results: List[str]) -> str:
+    # Chunks of the same section answer with the same headers: their lines are merged under
+    # the first occurrence of each header, and a line repeated under the same header (usually
+    # a general remark) is only kept once
+    sections: Dict[str, Tuple[Optional[str], List[str], Set[str]]] = {}
+    for result in results:
+        _, lines, seen = sections.setdefault("", (None, [], set()))
+        blank = False
+        for line in result.strip().splitlines():
+            stripped = line.strip()
+            if stripped and _is_header(stripped):
+                key = stripped.strip("#*: ").lower() or stripped
+                _, lines, seen = sections.setdefault(key, (line, [], set()))
+                blank = False
+            elif not stripped:
+                # Paragraph breaks are kept between lines of the same section only
+                blank = bool(lines)
+            elif stripped.lower() not in seen:
+                seen.add(stripped.lower())
+                if blank:
+                    lines.append("")
+                lines.append(line)
+                blank = False
+
+    parts = []
+    for header, lines, _ in sections.values():
+        body = "\n".join(lines)
+        if header is None:
+            parts.append(body)
+        elif body:
+            parts.append(f"{header}\n{body}")
+    return "\n\n".join(part for part in parts if part)
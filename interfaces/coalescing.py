@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Abandoned(Exception):
+    # The call was cancelled before it finished: whoever still waits for it makes it again
+    pass
+
+
+class Flight:
+    def __init__(self, streaming: bool):
+        self.future: Future = Future()
+        self.streaming = streaming
+        self.chunks: List[str] = []
+        self.sinks: List[Callable[[str], None]] = []
+        # The callers waiting for the response, and how to cancel the call once none is left
+        self.waiters = 0
+        self.cancel: Optional[Callable[[], Any]] = None
+        self._lock = threading.Lock()
+
+    def publish(self, chunk: str) -> None:
+        # Sinks only enqueue, so calling them under the lock keeps every subscriber in order
+        with self._lock:
+            self.chunks.append(chunk)
+            for sink in self.sinks:
+                sink(chunk)
+
+    def subscribe(self, sink: Callable[[str], None]) -> None:
+        # Late subscribers first replay what was already streamed
+        with self._lock:
+            for chunk in self.chunks:
+                sink(chunk)
+            self.sinks.append(sink)
+
+    def wait(self, sink: Optional[Callable[[str], None]] = None) -> str:
+        if sink is not None and self.streaming:
+            self.subscribe(sink)
+        response = self.future.result()
+        if sink is not None and not self.streaming:
+            sink(response)
+        return response
+
+    async def wait_async(self) -> str:
+        # Cancelling the waiter does not cancel the call, which other waiters may still need
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+
+        def settle(future: Future) -> None:
+            if waiter.done():
+                return
+            error = future.exception()
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(future.result())
+
+        def done(future: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(settle, future)
+            except RuntimeError:
+                # The loop of a waiter that gave up is already closed
+                pass
+
+        self.future.add_done_callback(done)
+        return await waiter
+
+
+class InFlightCalls:
+    def __init__(self):
+        self.coalesced = 0
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str, streaming: bool = False) -> Tuple[Flight, bool]:
+        # Returns the flight for the key and whether the caller leads it (has to make the call)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                flight.waiters += 1
+                return flight, False
+            flight = self._flights[key] = Flight(streaming)
+            flight.waiters += 1
+            return flight, True
+
+    def leave(self, key: str, flight: Flight) -> None:
+        # The call belongs to no single caller: it is only cancelled when the last one leaves
+        # before it finished, and later callers start a new one
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done() or flight.cancel is None:
+                return
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.cancel()
+
+    def finish(
+        self,
+        key: str,
+        flight: Flight,
+        response: Optional[str] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(response)
+
+
+# Identical calls from every session and review in the process share one request
+IN_FLIGHT = InFlightCalls()
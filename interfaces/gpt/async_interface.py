@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import openai
+
+from interfaces import metrics
+from interfaces.base import AsyncBaseInterface, Response
+from interfaces.chunking import count_prompt_tokens
+from interfaces.gpt.interface import cohesion_fits, completion_parameters, configure_api_key
+from interfaces.gpt.limiter import LIMITER
+from interfaces.gpt.prompts import (
+    cohesion_prompt,
+    fused_prompt,
+    grammar_prompt,
+    summarize_prompt,
+    theme_prompt,
+)
+
+
+class AsyncGPTInterface(AsyncBaseInterface):
+    max_concurrency = int(os.getenv("GPT_MAX_CONCURRENCY", "7"))
+
+    def __init__(
+        self,
+        context: str,
+        prompts: Dict[str, str],
+        model: str = "gpt-3.5-turbo-16k",
+        max_tokens: int = 10000,
+        temperature: float = 0.5,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
+        self.evaluations = [
+            {
+                "title": "Theme",
+                "description": "Evaluate the text by theme.",
+                "method": self.evaluate_prompt_by_theme,
+                "per_section": True,
+            },
+            {
+                "title": "Grammar",
+                "description": "Evaluate the text by grammar.",
+                "method": self.evaluate_prompt_by_grammar,
+                "per_section": True,
+            },
+            {
+                "title": "Cohesion",
+                "description": "Evaluate the text by cohesion.",
+                "method": self.evaluate_prompt_by_cohesion,
+            },
+        ]
+
+        super().__init__(
+            context=context,
+            prompts=prompts,
+            model=model,
+            evaluations=self.evaluations,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            fused=fused,
+            previous_response=previous_response,
+            previous_hashes=previous_hashes,
+            semaphore=semaphore,
+        )
+
+    async def validate_initialization(self) -> None:
+        self.api_key = configure_api_key()
+
+    async def _call_model(self, request: Dict[str, Any]) -> str:
+        response = await LIMITER.acall(
+            count_prompt_tokens(request["prompt"], self.model),
+            lambda: openai.ChatCompletion.acreate(**completion_parameters(self.model, request)),
+        )
+        usage = response.get("usage")
+        if usage:
+            metrics.report_usage(usage["prompt_tokens"], usage["completion_tokens"])
+            LIMITER.consume(usage["completion_tokens"])
+        return response["choices"][0]["message"]["content"]
+
+    def fused_prompt(self) -> List[Dict[str, str]]:
+        return fused_prompt(self.context, self.prompts)
+
+    async def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        return await self.evaluate_similar(
+            "theme",
+            prompt,
+            lambda: self.evaluate_in_chunks(
+                prompt,
+                lambda chunk: theme_prompt(self.context, chunk),
+                temperature=self.temperature,
+            ),
+        )
+
+    async def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        return await self.evaluate_grammar(
+            prompt,
+            lambda chunk: grammar_prompt(self.context, chunk),
+            temperature=0,
+        )
+
+    async def evaluate_prompt_by_cohesion(self) -> str:
+        return await self.evaluate_similar(
+            "cohesion", json.dumps(self.prompts, sort_keys=True), self.evaluate_cohesion
+        )
+
+    async def summarize_sections(self) -> Dict[str, str]:
+        summaries = await asyncio.gather(
+            *(
+                self.evaluate_in_chunks(text, summarize_prompt, temperature=0)
+                for text in self.prompts.values()
+            )
+        )
+        return dict(zip(self.prompts, summaries))
+
+    async def evaluate_cohesion(self) -> str:
+        # Sections too long to be read together are summarized (in chunks if needed) first,
+        # and the summaries are compared instead
+        prompts = self.prompts
+        if not cohesion_fits(self.context, prompts, self.model, self.context_window):
+            prompts = await self.summarize_sections()
+        return await self.call_model(
+            prompt=cohesion_prompt(self.context, prompts),
+            temperature=0,
+            max_tokens=self.max_tokens,
+            top_p=0.5,
+        )
@@ -0,0 +1,201 @@
+import asyncio
+import email.utils
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+from interfaces import metrics
+
+T = TypeVar("T")
+
+# Seconds between checks of an async waiter, which can not block on the shared condition
+POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.available = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.refill(now)
+        # A request larger than the whole bucket only has to wait for a full bucket
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        self.refill(now)
+        self.available -= amount
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return isinstance(error, (openai.error.RateLimitError, openai.error.ServiceUnavailableError))
+
+
+def retry_after(error: object) -> Optional[float]:
+    # Seconds to wait from the Retry-After header of an error or a response, given either in
+    # seconds or as an HTTP date
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        initial_in_flight: int,
+        max_in_flight: int,
+        max_retries: int = 5,
+        backoff: float = 1,
+    ):
+        # Non-positive budgets disable the corresponding bucket
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_in_flight = max_in_flight
+        self.limit = float(min(initial_in_flight, max_in_flight))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._condition = threading.Condition()
+
+    def _reserve(self, tokens: int) -> Optional[float]:
+        # Returns 0 once the call may start, the seconds to wait for the budget to refill, or
+        # None when it has to wait for another call to finish
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+        self.in_flight += 1
+        return 0
+
+    def acquire(self, tokens: int) -> float:
+        with self._condition:
+            while True:
+                wait = self._reserve(tokens)
+                if wait == 0:
+                    return time.monotonic()
+                self._condition.wait(wait)
+
+    async def aacquire(self, tokens: int) -> float:
+        while True:
+            with self._condition:
+                wait = self._reserve(tokens)
+            if wait == 0:
+                return time.monotonic()
+            await asyncio.sleep(min(wait or POLL_INTERVAL, POLL_INTERVAL))
+
+    def release(
+        self,
+        rate_limited: bool = False,
+        retry_after: Optional[float] = None,
+        started: Optional[float] = None,
+    ) -> None:
+        with self._condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if rate_limited:
+                # Multiplicative decrease, but only once for all the calls that were already in
+                # flight when the limit last went down, so a burst of 429s halves it once
+                if started is None or started >= self.decreased_at:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.decreased_at = now
+                self.paused_until = max(self.paused_until, now + (retry_after or self.backoff))
+            else:
+                # Additive increase of roughly one slot per limit's worth of successful calls
+                self.limit = min(float(self.max_in_flight), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def consume(self, tokens: int) -> None:
+        # Completion tokens are only known afterwards, so they are charged once the call returns
+        if self.tokens is None or tokens <= 0:
+            return
+        with self._condition:
+            self.tokens.take(tokens, time.monotonic())
+
+    def _backoff(self, error: BaseException, attempt: int) -> Optional[float]:
+        if not is_rate_limited(error):
+            return None
+        return retry_after(error) or self.backoff * 2**attempt
+
+    def call(self, tokens: int, request: Callable[[], T], hold: bool = False) -> T:
+        # With hold=True the slot stays taken on success (e.g. while a stream is consumed) and
+        # the caller has to release it
+        for attempt in range(self.max_retries + 1):
+            started = self.acquire(tokens)
+            try:
+                result = request()
+            except Exception as error:
+                delay = self._backoff(error, attempt)
+                self.release(rate_limited=delay is not None, retry_after=delay, started=started)
+                if delay is None or attempt == self.max_retries:
+                    raise
+                metrics.report_retries(1)
+            else:
+                if not hold:
+                    self.release()
+                return result
+        raise AssertionError("unreachable")
+
+    async def acall(self, tokens: int, request: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            started = await self.aacquire(tokens)
+            try:
+                result = await request()
+            except Exception as error:
+                delay = self._backoff(error, attempt)
+                self.release(rate_limited=delay is not None, retry_after=delay, started=started)
+                if delay is None or attempt == self.max_retries:
+                    raise
+                metrics.report_retries(1)
+            else:
+                self.release()
+                return result
+        raise AssertionError("unreachable")
+
+
+# Shared by every GPT interface in the process, sync and async alike
+LIMITER = RateLimiter(
+    requests_per_minute=float(os.getenv("GPT_RPM_LIMIT", "3500")),
+    tokens_per_minute=float(os.getenv("GPT_TPM_LIMIT", "180000")),
+    initial_in_flight=int(os.getenv("GPT_INITIAL_IN_FLIGHT", "32")),
+    max_in_flight=int(os.getenv("GPT_MAX_IN_FLIGHT", "256")),
+    max_retries=int(os.getenv("GPT_MAX_RETRIES", "5")),
+    backoff=float(os.getenv("GPT_RETRY_BACKOFF", "1")),
+)
@@ -0,0 +1,283 @@
+import json
+from typing import Dict, List
+
+from interfaces.templates import Messages, PromptTemplate, compact, register_template
+
+
+def _compact_messages(messages: Messages) -> Messages:
+    return tuple({**message, "content": compact(message["content"])} for message in messages)
+
+
+THEME_PREFIX = _compact_messages(
+    (
+        {
+            "role": "system",
+            "content": """You are a scientific article revisor and you are a specialist
+                    in every theme mentioned in the text. Provide suggestions to the author to 
+                    enhance readability and emphasize key points in the article.\n\nSuggested 
+                    categories of improvements:\n- Enhance References\n- Address Theme Violations
+                    \n- Include Missing Related Works (if applicable)\n- Fill in Missing 
+                    Information\n- Clarify Explanations\n- Add Limitations Section (if necessary)
+                    \n- Any Other Suggestions\n\nPlease provide clear and specific guidance on 
+                    where changes should be made. Also, check if the document adheres to the DoCO 
+                    (Document Components Ontology).""",
+        },
+        {
+            "role": "user",
+            "content": """The ideation and construction of CryptoComponent involved 
+                    eliciting requirements for its operation. Given the restrictive nature of IoT 
+                    devices, it was necessary to identify suitable encryption algorithms to 
+                    enhance data security during transmission. Among various encryption 
+                    algorithms, such as Elephant [Beyne et al. 2020], Pyjamask [Goudarzi et al. 
+                    2020], SPARKLE [Beierle et al. 2020], and SPECK [Beaulieu et al. 2015], SPECK 
+                    was chosen for its compatibility with low-power devices like IoT sensors. It 
+                    is easy to use, requiring only a unique key and an arbitrary message for 
+                    encryption. Authentication is not needed. Additionally, SPECK is simple to 
+                    implement, offers evaluated security, and has low computational resource 
+                    consumption. An XOR algorithm was also implemented for building the SPECK 
+                    algorithm.\n\nFunctional and non-functional requirements for CryptoComponent 
+                    were specified, including its ability to encrypt data before transmission and 
+                    decrypt data upon reception, ensuring end-to-end encryption. Table 1 presents 
+                    a summary of these requirements, and the full list is available at bit.ly/
+                    cryptocomponentlistofrequirements.\n\nProject decisions aimed at code reuse, 
+                    resource optimization, and ease of use. CryptoComponent was coded in C++ to 
+                    cater to IoT devices, offering encryption/decryption via an API for various 
+                    programming languages. Communication between IoT devices and the software 
+                    system is achieved through a broker using MQTT protocol, ensuring secure 
+                    data transmission.\n\nThe availability of the CryptoComponent API ensures 
+                    data encryption/decryption throughout the message flow. Data is securely 
+                    transmitted over the public network using MQTT, and applications consuming 
+                    this data run in K3S, a low-cost Kubernetes, guaranteeing private network 
+                    usage for added security.""",
+        },
+        {
+            "role": "assistant",
+            "content": """The article is well-written and clear. However, some 
+                    improvements can be made:\n\nEnhance References:\n- Define MQTT protocol and 
+                    provide references.\n- Elaborate on K3S for replication purposes with 
+                    references.\n- Clarify the importance of the API in relation to encryption/
+                    decryption on IoT devices.\n- Explain the role of the Engineering Software Lab 
+                    and why systems need the API.\n\nTheme Violations:\n- Authors may lack 
+                    cryptography expertise, and there may be potential security risks with the 
+                    chosen algorithms.\n- Critical issues exist, such as the use of potentially 
+                    insecure algorithms.\n- The use of the repeating-key XOR algorithm raises 
+                    security concerns.\n- Discuss the secure mode of operation for the Speck 
+                    cipher.\n\nMissing Information:\n- Explain the XOR and SPECK algorithms in 
+                    detail.\n\nConfusing Explanation:\n- Clarify the importance of the API and 
+                    the role of the Engineering Software Lab.""",
+        },
+    )
+)
+
+GRAMMAR_PREFIX = _compact_messages(
+    (
+        {
+            "role": "system",
+            "content": """You are a scientific article revisor, and part of your role 
+                    involves suggesting improvements for grammar and clarity. Please provide 
+                    suggestions for word or sentence changes in the text. Your suggestions should 
+                    focus on Correctness (grammar and spelling), Clarity (conciseness, full-
+                    sentence rewrites, and formatting), Engagement (word choice and sentence 
+                    variety), and Delivery (formal writing).\n\nAvoid suggesting changes that 
+                    are already present in the text. Aim to provide at least two suggestions for 
+                    each category.""",
+        },
+        {
+            "role": "user",
+            "content": """IoT software systems have made great strides since the new 
+                    industrial revolution known as Industry 4.0. Their usage has been growing over 
+                    the years, and research reports indicate exponential growth related to the 
+                    utilization of these devices, with a forecast of surpassing 30 billion devices 
+                    by 2024.\n\nAs a result, organizations frequently list the most common security 
+                    risks, including secure data transfer and storage of information in IoT 
+                    software devices, among the top 10 most recurrent problems in these 
+                    devices.\n\nThus, this project presents a cryptographic component designed to 
+                    enable secure data transmission in low-power computing devices, preventing data 
+                    leaks. This work describes the details of the developed component, including 
+                    the hardware systems to which it was applied and the approach used for 
+                    implementation.""",
+        },
+        {
+            "role": "assistant",
+            "content": '''Grammar and Clarity Suggestions:\n1. Remove "known as" in the 
+                    sentence: "[...] industrial revolution known as Industry 4.0."\n2. Remove "in 
+                    which it was" in the sentence: "[...] hardware systems to which it was applied 
+                    [...]"''',
+        },
+        {
+            "role": "user",
+            "content": """The simulation itself is a code snippet that runs the 
+                    simulation according to the desired data volume. In our case, we conducted 
+                    three scenarios, each sending and consuming 80 messages from the broker, while 
+                    measuring their time. We conducted the experiment in three scenarios to 
+                    observe standard deviation and average values.""",
+        },
+        {
+            "role": "assistant",
+            "content": '''Conciseness Suggestion:\nReplace "runs the simulation according 
+                    to the desired data volume" with "simulates the desired data volume" in the 
+                    sentence: "[...] is a code snippet that runs the simulation according to the 
+                    desired data volume."''',
+        },
+        {
+            "role": "user",
+            "content": "We have to encrypted data",
+        },
+        {
+            "role": "assistant",
+            "content": """Grammar Suggestion:\nReplace "encrypted" with "encrypt" in the 
+                    sentence: "We have to encrypted data" to correct the verb form.""",
+        },
+    )
+)
+
+COHESION_PREFIX = _compact_messages(
+    (
+        {
+            "role": "system",
+            "content": """You are a scientific article revisor tasked with 
+                    evaluating the coherence between the abstract, introduction, and 
+                    conclusion of the article. Your objective is to determine if these 
+                    sections make sense together. If there are inconsistencies or lack of 
+                    cohesion, please point them out to the user. Additionally, provide 
+                    suggestions on how the writer can improve cohesiveness between these 
+                    sections.""",
+        },
+    )
+)
+
+SUMMARIZE_PREFIX = _compact_messages(
+    (
+        {
+            "role": "system",
+            "content": """You are a scientific article reviewer tasked with summarizing a
+                    section of an article. Keep its aims, claims, methods and results, which
+                    are needed to judge if it is consistent with the other sections.""",
+        },
+    )
+)
+
+SUMMARIZE_TEMPLATE = register_template(
+    "gpt",
+    PromptTemplate(
+        "summarize",
+        SUMMARIZE_PREFIX,
+        lambda text: [{"role": "user", "content": f"Summarize the following text: {text}"}],
+    ),
+)
+
+THEME_TEMPLATE = register_template(
+    "gpt",
+    PromptTemplate(
+        "theme",
+        THEME_PREFIX,
+        lambda context, prompt: [
+            {
+                "role": "system",
+                "content": f"The user has provided context for evaluation: {context}",
+            },
+            {"role": "user", "content": f"This is my prompt: {prompt}"},
+        ],
+    ),
+)
+
+GRAMMAR_TEMPLATE = register_template(
+    "gpt",
+    PromptTemplate(
+        "grammar",
+        GRAMMAR_PREFIX,
+        lambda context, prompt: [
+            {
+                "role": "system",
+                "content": f"The user has provided context about the article: {context}",
+            },
+            {"role": "user", "content": f"This is my prompt: {prompt}"},
+        ],
+    ),
+)
+
+COHESION_TEMPLATE = register_template(
+    "gpt",
+    PromptTemplate(
+        "cohesion",
+        COHESION_PREFIX,
+        lambda context, prompts: [
+            {
+                "role": "system",
+                "content": "You can also consider the context provided by the user when "
+                f"evaluating the text: {context}",
+            },
+            {
+                "role": "user",
+                "content": "These are my prompts:\n"
+                f"---\nAbstract:{prompts['abstract']}\n"
+                f"---\nIntroduction:{prompts['introduction']}\n"
+                f"---\nConclusion:{prompts['conclusion']}\n"
+                "---",
+            },
+        ],
+    ),
+)
+
+
+def summarize_prompt(text: str) -> List[Dict[str, str]]:
+    return SUMMARIZE_TEMPLATE.render(text=text)
+
+
+def theme_prompt(context: str, prompt: str) -> List[Dict[str, str]]:
+    return THEME_TEMPLATE.render(context=context, prompt=prompt)
+
+
+def grammar_prompt(context: str, prompt: str) -> List[Dict[str, str]]:
+    return GRAMMAR_TEMPLATE.render(context=context, prompt=prompt)
+
+
+def cohesion_prompt(context: str, prompts: Dict[str, str]) -> List[Dict[str, str]]:
+    return COHESION_TEMPLATE.render(context=context, prompts=prompts)
+
+
+FUSED_PREFIX = _compact_messages(
+    (
+        {
+            "role": "system",
+            "content": """You are a scientific article revisor and you are a specialist in
+                    every theme mentioned in the text. You will receive the abstract,
+                    introduction and conclusion of an article and must review all of them in a
+                    single answer:
+                    - Theme: for each section, provide suggestions to enhance readability and
+                    emphasize key points (enhance references, address theme violations, include
+                    missing related works, fill in missing information, clarify explanations,
+                    add limitations) and check if it adheres to the DoCO (Document Components
+                    Ontology).
+                    - Grammar: for each section, suggest word or sentence changes focusing on
+                    Correctness, Clarity, Engagement and Delivery. Avoid suggesting changes that
+                    are already present in the text.
+                    - Cohesion: determine if the three sections make sense together, point out
+                    inconsistencies and suggest how to improve cohesiveness between them.
+
+                    Answer only with a JSON object, without any other text, in the format:
+                    {"Theme": {"abstract": "...", "introduction": "...", "conclusion": "..."},
+                    "Grammar": {"abstract": "...", "introduction": "...", "conclusion": "..."},
+                    "Cohesion": "..."}""",
+        },
+    )
+)
+
+FUSED_TEMPLATE = register_template(
+    "gpt",
+    PromptTemplate(
+        "fused",
+        FUSED_PREFIX,
+        lambda context, prompts: [
+            {
+                "role": "system",
+                "content": f"The user has provided context for evaluation: {context}",
+            },
+            {"role": "user", "content": json.dumps(prompts, ensure_ascii=False)},
+        ],
+    ),
+)
+
+
+def fused_prompt(context: str, prompts: Dict[str, str]) -> List[Dict[str, str]]:
+    return FUSED_TEMPLATE.render(context=context, prompts=prompts)
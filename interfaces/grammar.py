@@ -0,0 +1,153 @@
+import os
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+from interfaces.chunking import count_tokens
+
+# The findings of the local checks are added to the grammar prompt as hints. The model still
+# reviews the whole text: the checks miss errors and flag some correct sentences.
+PREPASS_ENABLED = os.getenv("REVAISOR_GRAMMAR_PREPASS", "1").lower() not in ("0", "false", "no")
+# Sections the checks find nothing in are not sent to the model. The checks miss some errors,
+# so turning this off sends every section
+SKIP_CLEAN = os.getenv("REVAISOR_GRAMMAR_SKIP_CLEAN", "1").lower() not in ("0", "false", "no")
+# Room kept for the hints in every grammar prompt, the findings past it are left out
+HINT_TOKENS = int(os.getenv("REVAISOR_GRAMMAR_HINT_TOKENS", "300"))
+LONG_SENTENCE_WORDS = int(os.getenv("REVAISOR_GRAMMAR_LONG_SENTENCE_WORDS", "45"))
+
+NO_FINDINGS = "The automatic checks found no grammar issues in this section."
+
+HINTS_HEADER = (
+    "Hints from automatic checks (they are not part of the text, may be wrong and do not "
+    "cover every issue):"
+)
+
+ABBREVIATIONS = ("et al.", "e.g.", "i.e.", "etc.", "vs.", "Fig.", "Figs.", "Eq.", "Sec.", "No.")
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# Words whose sound does not match their first letter, for the a/an check
+VOWEL_SOUND_CONSONANTS = ("hour", "honest", "honor", "honour", "heir")
+# Only the "uni" words read as "you" ("a unit", but "an unimportant")
+CONSONANT_SOUND_VOWELS = (
+    *("unic", "unif", "unil", "unio", "uniq", "unis", "unit", "univ"),
+    *("use", "usu", "user", "one", "once", "euro", "eu", "ubiq", "utili"),
+)
+# "does it have" and "can this are" are questions or infinitives, not agreement errors
+NOT_AFTER_AUXILIARY = "".join(
+    rf"(?<!\b{auxiliary} )"
+    for auxiliary in ("do", "does", "did", "can", "could", "will", "would", "should", "may")
+    + ("might", "must", "shall", "to", "let", "make", "makes", "made", "help", "helps")
+)
+
+Finding = Tuple[int, str]
+
+RULES: List[Tuple[re.Pattern, str]] = [
+    # "that that" and "had had" can be correct
+    (re.compile(r"\b(?!(?:that|had)\b)([A-Za-z]+)\s+\1\b", re.IGNORECASE), 'Repeated word "{0}".'),
+    (re.compile(r"\s+([,.;:!?])(?!\d)"), 'Remove the space before "{0}".'),
+    (re.compile(r"(?<=[a-z])([,;])(?=[A-Za-z])"), 'Add a space after "{0}".'),
+    (re.compile(r"\w( {2,})\w"), "Remove the extra spaces."),
+    (re.compile(r"\b((?:could|should|would|must) of)\b", re.IGNORECASE), 'Use "have" in "{0}".'),
+    (re.compile(r"\b(alot|it's own|their's|your's)\b", re.IGNORECASE), 'Misspelled "{0}".'),
+    (
+        re.compile(
+            NOT_AFTER_AUXILIARY + r"\b((?:he|she|it|this) (?:have|are|were|do|don't))\b",
+            re.IGNORECASE,
+        ),
+        'Subject and verb do not agree in "{0}".',
+    ),
+    (
+        re.compile(r"\b((?:we|they|you|these|those) (?:has|is|was|does|doesn't))\b", re.IGNORECASE),
+        'Subject and verb do not agree in "{0}".',
+    ),
+    (
+        re.compile(r"\b(a|an|the) (?!\1\b)(a|an|the)\b", re.IGNORECASE),
+        'Double article "{0} {1}".',
+    ),
+]
+ARTICLE = re.compile(r"\b(a|an) ([A-Za-z][\w-]*)", re.IGNORECASE)
+
+
+def split_sentences(text: str) -> List[str]:
+    # Abbreviations are masked, so "et al. 2020" does not end a sentence
+    masked = text
+    for abbreviation in ABBREVIATIONS:
+        masked = masked.replace(abbreviation, abbreviation.replace(".", "\0"))
+    sentences = []
+    for paragraph in masked.split("\n"):
+        for sentence in SENTENCE_END.split(paragraph):
+            sentence = sentence.replace("\0", ".").strip()
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def article_issue(article: str, word: str) -> bool:
+    lowered = word.lower()
+    if word.isupper() or lowered[0].isdigit():
+        # Acronyms ("an LLM", "a URL") are read letter by letter, let the model judge them
+        return False
+    vowel_sound = lowered[0] in "aeiou" and not lowered.startswith(CONSONANT_SOUND_VOWELS)
+    vowel_sound = vowel_sound or lowered.startswith(VOWEL_SOUND_CONSONANTS)
+    return (article.lower() == "a") == vowel_sound
+
+
+def check_sentence(sentence: str) -> List[str]:
+    messages = []
+    for pattern, message in RULES:
+        for match in pattern.finditer(sentence):
+            messages.append(message.format(*match.groups()))
+    for match in ARTICLE.finditer(sentence):
+        if article_issue(*match.groups()):
+            messages.append(f'Check the article in "{match.group(0)}".')
+    if sentence[0].islower():
+        messages.append("The sentence should start with a capital letter.")
+    for opening, closing in (("(", ")"), ("[", "]")):
+        if sentence.count(opening) != sentence.count(closing):
+            messages.append(f'Unbalanced "{opening}{closing}".')
+    if sentence.count('"') % 2:
+        messages.append("Unbalanced quotation marks.")
+    if len(sentence.split()) > LONG_SENTENCE_WORDS:
+        messages.append("Very long sentence, consider splitting it.")
+    return messages
+
+
+class GrammarCheck:
+    def __init__(self, text: str):
+        self.text = text
+        self.sentences = split_sentences(text)
+        self.findings: List[Finding] = [
+            (index, message)
+            for index, sentence in enumerate(self.sentences)
+            for message in check_sentence(sentence)
+        ]
+
+    def hints(self, max_tokens: Optional[int] = None, model: Optional[str] = None) -> str:
+        # Without max_tokens every finding is listed, otherwise only the first ones that fit
+        # (with the blank line that separates them from the text)
+        lines = [HINTS_HEADER]
+        for index, message in self.findings:
+            sentence = self.sentences[index]
+            quoted = sentence if len(sentence) <= 80 else sentence[:77] + "..."
+            line = f'- "{quoted}": {message}'
+            if max_tokens is not None:
+                if count_tokens("\n\n" + "\n".join(lines + [line]), model) > max_tokens:
+                    break
+            lines.append(line)
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def hint_budget(window: int) -> int:
+    return min(HINT_TOKENS, window // 8)
+
+
+def with_hints(
+    build_prompt: Callable[[str], Any],
+    max_tokens: Optional[int] = None,
+    model: Optional[str] = None,
+) -> Callable[[str], Any]:
+    # Builds the grammar prompt of a text (or chunk) followed by the hints found in it
+    def build(text: str) -> Any:
+        hints = GrammarCheck(text).hints(max_tokens, model) if text.strip() else ""
+        return build_prompt(f"{text}\n\n{hints}" if hints else text)
+
+    return build
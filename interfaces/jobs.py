@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from interfaces.base import BaseInterface, Cell
+from interfaces.results import ReviewResult
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Event = Tuple[str, Optional[str], str]
+
+
+class Job:
+    def __init__(self, interface: BaseInterface):
+        self.id = uuid.uuid4().hex
+        self.status = PENDING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.response: Optional[Dict[str, Union[Dict[str, str], str]]] = None
+        self.result: Optional[ReviewResult] = None
+        # Every (evaluation, section) cell the review will fill, in display order
+        self.cells: List[Cell] = [
+            (evaluation["title"], prompt_name)
+            for evaluation in interface.evaluations
+            for prompt_name in (interface.prompts if evaluation.get("per_section") else [None])
+        ]
+        self.partial: Dict[Cell, str] = {cell: "" for cell in self.cells}
+        self.section_hashes = interface.section_hashes
+        self.events: List[Event] = []
+        self._interface: Optional[BaseInterface] = interface
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def run(self) -> None:
+        interface = self._interface
+        if interface is None:
+            # Already run
+            return
+        with self._condition:
+            self.status = RUNNING
+        try:
+            for title, section, chunk in interface.stream_response():
+                with self._condition:
+                    self.events.append((title, section, chunk))
+                    self.partial[(title, section)] += chunk
+                    self._condition.notify_all()
+            result = interface.get_result()
+        except Exception as error:
+            self._finish(FAILED, error=str(error))
+        else:
+            self._finish(DONE, result=result)
+
+    def _finish(
+        self,
+        status: str,
+        result: Optional[ReviewResult] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._condition:
+            self.status = status
+            self.result = result
+            self.response = result.to_response() if result is not None else None
+            self.error = error
+            self.finished_at = time.time()
+            # The interface (and the article text it holds) is not needed once the job is over
+            self._interface = None
+            self._condition.notify_all()
+
+    def events_since(self, start: int, timeout: Optional[float] = None) -> Tuple[List[Event], bool]:
+        # The events from index start on, waiting up to timeout for one, and whether the job
+        # is over (so no event will follow)
+        with self._condition:
+            if start >= len(self.events) and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[start:], self.finished
+
+    def stream(self, start: int = 0, timeout: Optional[float] = None) -> Iterator[Event]:
+        # Yields the events from index start on, blocking for new ones until the job finishes
+        position = start
+        while True:
+            events, finished = self.events_since(position, timeout)
+            if not events and not finished:
+                return
+            yield from events
+            position += len(events)
+            if finished and position >= len(self.events):
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self.finished, timeout)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._condition:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                # [evaluation, section, text] rows, so the snapshot can be sent as JSON
+                "partial": [
+                    [title, section, text] for (title, section), text in self.partial.items()
+                ],
+                "response": self.response,
+                "result": self.result.as_dict() if self.result is not None else None,
+                "section_hashes": self.section_hashes,
+            }
+
+
+class JobQueue:
+    def __init__(self, workers: int = 4, history: int = 100):
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="review")
+
+    def submit(self, interface: BaseInterface) -> str:
+        job = Job(interface)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self._executor.submit(job.run)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self) -> None:
+        # Forget the oldest finished jobs, never the ones still waiting or running
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_queue: Optional[JobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_default_queue() -> JobQueue:
+    global _default_queue
+
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(
+                workers=int(os.getenv("REVAISOR_JOB_WORKERS", "4")),
+                history=int(os.getenv("REVAISOR_JOB_HISTORY", "100")),
+            )
+        return _default_queue
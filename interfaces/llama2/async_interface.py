@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional
+
+from interfaces.base import AsyncBaseInterface, Response
+from interfaces.llama2 import client
+from interfaces.llama2.interface import SUMMARIES
+from interfaces.llama2.prompts import (
+    cohesion_prompt,
+    fused_prompt,
+    grammar_prompt,
+    summarize_prompt,
+    theme_prompt,
+)
+from utils import should_have_all_defined
+
+
+class AsyncLLAMA2Interface(AsyncBaseInterface):
+    max_concurrency = int(os.getenv("LLAMA2_MAX_CONCURRENCY", "4"))
+    default_context_window = int(os.getenv("LLAMA2_CONTEXT_WINDOW", "3500"))
+
+    def __init__(
+        self,
+        context: str,
+        prompts: Dict[str, str],
+        max_tokens: int = 10000,
+        temperature: float = 0,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
+        should_have_all_defined(["LLAMA2_API_URL"])
+
+        self.ngrok_url = os.environ["LLAMA2_API_URL"]
+
+        self.evaluations = [
+            {
+                "title": "Grammar",
+                "description": "Grammar suggestions for your text.",
+                "method": self.evaluate_prompt_by_grammar,
+                "per_section": True,
+            },
+            {
+                "title": "Theme",
+                "description": "Theme suggestions for your text.",
+                "method": self.evaluate_prompt_by_theme,
+                "per_section": True,
+            },
+            {
+                "title": "Cohesion",
+                "description": "Evaluate the text by cohesion.",
+                "method": self.evaluate_prompt_by_cohesion,
+            },
+        ]
+
+        super().__init__(
+            context=context,
+            prompts=prompts,
+            model=None,
+            evaluations=self.evaluations,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            fused=fused,
+            previous_response=previous_response,
+            previous_hashes=previous_hashes,
+            semaphore=semaphore,
+        )
+
+    async def validate_initialization(self) -> None:
+        if not await client.ais_healthy(self.ngrok_url):
+            raise ValueError("Ngrok is not running. Please, run it and try again.")
+
+    async def _call_model(self, request: Dict[str, Any]) -> str:
+        response = await client.arequest(
+            "POST", self.ngrok_url + "/generate", json=client.generate_payload(request)
+        )
+        return response["generated_text"]
+
+    def fused_prompt(self) -> str:
+        return fused_prompt(self.context, self.prompts)
+
+    async def summarize(self, text: str) -> str:
+        key = SUMMARIES.key(
+            self.model, text, self.temperature, self.max_tokens, self.context_window
+        )
+        summary = SUMMARIES.get(key)
+        if summary is None:
+            summary = await self.evaluate_in_chunks(
+                text,
+                summarize_prompt,
+                temperature=self.temperature,
+            )
+            SUMMARIES.set(key, summary)
+        return summary
+
+    async def summarize_sections(self) -> Dict[str, str]:
+        summaries = await asyncio.gather(*(self.summarize(text) for text in self.prompts.values()))
+        return dict(zip(self.prompts, summaries))
+
+    async def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        return await self.evaluate_similar(
+            "theme",
+            prompt,
+            lambda: self.evaluate_in_chunks(
+                prompt,
+                theme_prompt,
+                temperature=self.temperature,
+            ),
+        )
+
+    async def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        return await self.evaluate_grammar(
+            prompt,
+            lambda chunk: grammar_prompt(self.context, chunk),
+            temperature=self.temperature,
+        )
+
+    async def evaluate_prompt_by_cohesion(self) -> str:
+        return await self.evaluate_similar(
+            "cohesion", json.dumps(self.prompts, sort_keys=True), self.evaluate_cohesion
+        )
+
+    async def evaluate_cohesion(self) -> str:
+        summaries = await self.summarize_sections()
+
+        return await self.call_model(
+            prompt=cohesion_prompt(
+                self.context,
+                summaries["abstract"],
+                summaries["introduction"],
+                summaries["conclusion"],
+            ),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=0.5,
+        )
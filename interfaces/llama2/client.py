@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from interfaces import metrics
+from interfaces.gpt.limiter import retry_after
+
+if TYPE_CHECKING:
+    import aiohttp
+
+POOL_SIZE = int(os.getenv("LLAMA2_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("LLAMA2_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("LLAMA2_READ_TIMEOUT", "600"))
+MAX_RETRIES = int(os.getenv("LLAMA2_MAX_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("LLAMA2_RETRY_BACKOFF", "0.5"))
+HEALTH_CHECK_TTL = float(os.getenv("LLAMA2_HEALTH_CHECK_TTL", "30"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+_health_checks: Dict[str, Tuple[bool, float]] = {}
+
+
+def generate_payload(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "inputs": request["prompt"],
+        "parameters": {
+            "temperature": request["temperature"],
+            "max_tokens": request["max_tokens"],
+            "top_p": request["top_p"],
+            "frequency_penalty": 0,
+            "presence_penalty": 0,
+        },
+    }
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    response = get_session().request(method, url, **kwargs)
+    retries = getattr(response.raw, "retries", None)
+    if retries is not None:
+        metrics.report_retries(len(retries.history))
+    return response
+
+
+def is_healthy(url: str) -> bool:
+    now = time.monotonic()
+    cached = _health_checks.get(url)
+    if cached is not None and now - cached[1] < HEALTH_CHECK_TTL:
+        return cached[0]
+
+    try:
+        healthy = request("GET", url, timeout=(CONNECT_TIMEOUT, CONNECT_TIMEOUT)).ok
+    except requests.RequestException:
+        healthy = False
+
+    _health_checks[url] = (healthy, now)
+    return healthy
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    # aiohttp is only imported by the async interface, the sync one does not pay for it
+    import aiohttp
+
+    # aiohttp sessions are bound to the event loop that created them
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+        )
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session() -> None:
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def arequest(method: str, url: str, **kwargs: Any) -> Any:
+    import aiohttp
+
+    session = get_async_session()
+    for attempt in range(MAX_RETRIES + 1):
+        delay = RETRY_BACKOFF * 2**attempt
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    metrics.report_retries(attempt)
+                    response.raise_for_status()
+                    return await response.json()
+                wait = retry_after(response)
+                if wait is not None:
+                    delay = wait
+        except aiohttp.ClientConnectionError:
+            if attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(delay)
+
+
+async def ais_healthy(url: str) -> bool:
+    import aiohttp
+
+    now = time.monotonic()
+    cached = _health_checks.get(url)
+    if cached is not None and now - cached[1] < HEALTH_CHECK_TTL:
+        return cached[0]
+
+    try:
+        async with get_async_session().get(
+            url, timeout=aiohttp.ClientTimeout(total=CONNECT_TIMEOUT)
+        ) as response:
+            healthy = response.ok
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        healthy = False
+
+    _health_checks[url] = (healthy, now)
+    return healthy
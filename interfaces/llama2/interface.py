@@ -1,30 +1,55 @@
+import json
 import os
-from typing import Dict
-
-import requests
-
-from interfaces.base import BaseInterface
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+from interfaces import metrics
+from interfaces.base import BaseInterface, Response
+from interfaces.llama2 import client
+from interfaces.llama2.prompts import (
+    cohesion_prompt,
+    fused_prompt,
+    grammar_prompt,
+    summarize_prompt,
+    theme_prompt,
+)
 from utils import should_have_all_defined
+from utils.cache import LRUCache
+
+# Section summaries shared by every LLAMA2 review in the process, keyed by content hash
+SUMMARIES = LRUCache(int(os.getenv("LLAMA2_SUMMARY_CACHE_SIZE", "256")))
 
 
 class LLAMA2Interface(BaseInterface):
+    max_concurrency = int(os.getenv("LLAMA2_MAX_CONCURRENCY", "4"))
+    default_context_window = int(os.getenv("LLAMA2_CONTEXT_WINDOW", "3500"))
+
     def __init__(
-        self, context: str, prompts: Dict[str, str], max_tokens: int = 10000, temperature: float = 0
+        self,
+        context: str,
+        prompts: Dict[str, str],
+        max_tokens: int = 10000,
+        temperature: float = 0,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
     ):
-        should_have_all_defined(["LLAMA2_API_URL"])
-
-        self.ngrok_url = os.environ["LLAMA2_API_URL"]
+        self.ngrok_url = self.server_url()
 
         self.evaluations = [
             {
                 "title": "Grammar",
                 "description": "Grammar suggestions for your text.",
-                "method": self.evaluate_prompts_by_grammar,
+                "method": self.evaluate_prompt_by_grammar,
+                "per_section": True,
             },
             {
                 "title": "Theme",
                 "description": "Theme suggestions for your text.",
-                "method": self.evaluate_prompts_by_theme,
+                "method": self.evaluate_prompt_by_theme,
+                "per_section": True,
             },
             {
                 "title": "Cohesion",
@@ -40,161 +65,106 @@ class LLAMA2Interface(BaseInterface):
             evaluations=self.evaluations,
             max_tokens=max_tokens,
             temperature=temperature,
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            fused=fused,
+            previous_response=previous_response,
+            previous_hashes=previous_hashes,
         )
 
+    def server_url(self) -> str:
+        should_have_all_defined(["LLAMA2_API_URL"])
+        return os.environ["LLAMA2_API_URL"]
+
     def validate_initialization(self) -> None:
-        if not requests.get(self.ngrok_url).ok:
+        if not client.is_healthy(self.ngrok_url):
             raise ValueError("Ngrok is not running. Please, run it and try again.")
 
-    def __summarize_text(self, text: str) -> str:
-        input = f"""[INST] <<SYS>>
-            You are a scientific article reviewer tasked with summarizing a given text.
-            <</SYS>>
-
-            Summarize the following text: {text}
-
-            [/INST]
-        """
-        return requests.post(
-            self.ngrok_url + "/generate",
-            json={
-                "inputs": input,
-                "parameters": {
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                    "top_p": 0.5,
-                    "frequency_penalty": 0,
-                    "presence_penalty": 0,
-                },
-            },
-        ).json()["generated_text"]
-
-    def evaluate_prompt_by_theme(self, prompt: str) -> Dict[str, str]:
-        input = f"""[INST] <<SYS>>
-            As a scientific article reviewer with expertise in various themes, your role 
-            is to provide valuable feedback to the author for better emphasis and 
-            readability of the text. Your suggestions may fall into categories such as:
-            
-            - Improve References
-            - Address Theme Violations
-            - Identify Missing Related Works (if any)
-            - Point Out Missing Information
-            - Clarify Confusing Explanations
-            - Address Missing Limitations
-            - Suggest Other Improvements
-            
-            You can also create additional categories if needed. Ensure that your feedback 
-            is clear and specific, indicating the sections of the text that require changes.
-
-            Utilize the context provided by the user to evaluate the article effectively.
-            <</SYS>>
-      
-            {prompt}
-
-            [/INST]
-        """
-
-
-        return requests.post(
-            self.ngrok_url + "/generate",
-            json={
-                "inputs": input,
-                "parameters": {
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                    "top_p": 0.5,
-                    "frequency_penalty": 0,
-                    "presence_penalty": 0,
-                },
-            },
-        ).json()["generated_text"]
-
-    def evaluate_prompt_by_grammar(self, prompt: str) -> Dict[str, str]:
-        input = f"""[INST] <<SYS>>
-            You are a scientific article reviewer tasked with grammar suggestions. 
-            Additionally, check if the document follows DoCO, the Document Components 
-            Ontology, which provides a structured vocabulary for document components, both 
-            structural (e.g., block, inline, paragraph, section) and rhetorical (e.g., 
-            introduction, discussion, acknowledgments, reference list). This ontology 
-            enables these components and documents composed of them to be described in RDF.
-
-            The user has also provided you with context about the article, which you can 
-            use to evaluate the text effectively: {self.context}
-            <</SYS>>  
-      
-            {prompt}
-
-            [/INST]
-        """
-
-        return requests.post(
-            self.ngrok_url + "/generate",
-            json={
-                "inputs": input,
-                "parameters": {
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                    "top_p": 0.5,
-                    "frequency_penalty": 0,
-                    "presence_penalty": 0,
-                },
-            },
-        ).json()["generated_text"]
-
-    def evaluate_prompt_by_cohesion(self) -> Dict[str, str]:
-        abstract = self.__summarize_text(self.prompts["abstract"])
-        introduction = self.__summarize_text(self.prompts["introduction"])
-        conclusion = self.__summarize_text(self.prompts["conclusion"])
-
-        input = f"""[INST] <<SYS>>
-            You are a scientific article reviewer tasked with evaluating the coherence 
-            between the sections of the provided article. Your role is to assess whether 
-            the "Abstract," "Introduction," and "Conclusion" align in terms of their 
-            content and messaging. If there are inconsistencies, please provide feedback 
-            to the user.
-
-            Your objective is to determine if these sections make sense together. For 
-            instance, if the abstract discusses one topic, but the introduction talks 
-            about something entirely different, please flag this as a potential issue. 
-            Similarly, if the introduction and conclusion have opposing statements, point 
-            that out. And if the three sections are consistent, acknowledge their 
-            cohesion.
-
-            The user has also provided you with context about the article, which you can 
-            use to evaluate the text effectively: {self.context}
-            <</SYS>>            
-
-            Abstract:{abstract}
-            Introduction:{introduction}
-            Conclusion:{conclusion}
-            
-            [/INST]
-        """
-
-        return requests.post(
-            self.ngrok_url + "/generate",
-            json={
-                "inputs": input,
-                "parameters": {
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                    "top_p": 0.5,
-                    "frequency_penalty": 0,
-                    "presence_penalty": 0,
-                },
-            },
-        ).json()["generated_text"]
-
-    def evaluate_prompts_by_theme(self) -> Dict[str, str]:
-        results = {}
-        for prompt_name, prompt_text in self.prompts.items():
-            result = self.evaluate_prompt_by_theme(prompt_text)
-            results[prompt_name] = result
-        return results  # type: ignore
-
-    def evaluate_prompts_by_grammar(self) -> Dict[str, str]:
-        results = {}
-        for prompt_name, prompt_text in self.prompts.items():
-            result = self.evaluate_prompt_by_grammar(prompt_text)
-            results[prompt_name] = result
-        return results  # type: ignore
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        response = client.request(
+            "POST", self.ngrok_url + "/generate", json=client.generate_payload(request)
+        )
+        response.raise_for_status()
+        return response.json()["generated_text"]
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        with client.request(
+            "POST",
+            self.ngrok_url + "/generate_stream",
+            json=client.generate_payload(request),
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            # Decoded here: the server sends UTF-8 without a charset, which requests would
+            # decode as ISO-8859-1
+            for raw_line in response.iter_lines():
+                line = raw_line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                text = json.loads(line[len("data:") :])["token"]["text"]
+                if text:
+                    yield text
+
+    def fused_prompt(self) -> str:
+        return fused_prompt(self.context, self.prompts)
+
+    def summarize(self, text: str) -> str:
+        key = SUMMARIES.key(
+            self.model, text, self.temperature, self.max_tokens, self.context_window
+        )
+        summary = SUMMARIES.get(key)
+        if summary is None:
+            summary = self.evaluate_in_chunks(
+                text,
+                summarize_prompt,
+                temperature=self.temperature,
+                stream=False,
+            )
+            SUMMARIES.set(key, summary)
+        return summary
+
+    def summarize_sections(self) -> Dict[str, str]:
+        with ThreadPoolExecutor(max_workers=len(self.prompts)) as executor:
+            futures = {
+                prompt_name: executor.submit(metrics.in_context(self.summarize), text)
+                for prompt_name, text in self.prompts.items()
+            }
+            return {prompt_name: future.result() for prompt_name, future in futures.items()}
+
+    def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        return self.evaluate_similar(
+            "theme",
+            prompt,
+            lambda: self.evaluate_in_chunks(
+                prompt,
+                theme_prompt,
+                temperature=self.temperature,
+            ),
+        )
+
+    def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        return self.evaluate_grammar(
+            prompt,
+            lambda chunk: grammar_prompt(self.context, chunk),
+            temperature=self.temperature,
+        )
+
+    def evaluate_prompt_by_cohesion(self) -> str:
+        return self.evaluate_similar(
+            "cohesion", json.dumps(self.prompts, sort_keys=True), self.evaluate_cohesion
+        )
+
+    def evaluate_cohesion(self) -> str:
+        summaries = self.summarize_sections()
+
+        return self.call_model(
+            prompt=cohesion_prompt(
+                self.context,
+                summaries["abstract"],
+                summaries["introduction"],
+                summaries["conclusion"],
+            ),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=0.5,
+        )
@@ -0,0 +1,110 @@
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from llama_cpp import Llama, LlamaRAMCache
+except ImportError:  # pragma: no cover - llama-cpp-python is optional
+    Llama = None
+
+from interfaces import metrics
+from interfaces.llama2.interface import LLAMA2Interface
+from interfaces.templates import TEMPLATES
+from utils import should_have_all_defined
+
+# The model context, which also bounds the prompts and answers of the local interface
+CONTEXT_WINDOW = int(os.getenv("LLAMA2_LOCAL_CONTEXT", "4096"))
+
+_model: Optional["Llama"] = None
+_model_lock = threading.Lock()
+# A llama.cpp context is not thread safe, so every session takes turns on the shared model
+_generate_lock = threading.Lock()
+
+
+def completion_parameters(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "prompt": request["prompt"],
+        "temperature": request["temperature"],
+        "max_tokens": request["max_tokens"],
+        "top_p": request["top_p"],
+        "frequency_penalty": 0,
+        "presence_penalty": 0,
+    }
+
+
+def prime_prefixes(model: "Llama") -> None:
+    # Evaluate the static part of every prompt template once and keep its KV state, so each
+    # call only has to process its own variable suffix
+    for template in TEMPLATES.get("llama2", {}).values():
+        if not isinstance(template.prefix, str):
+            continue
+        tokens = model.tokenize(template.prefix.encode("utf-8"))
+        model.reset()
+        model.eval(tokens)
+        model.cache[tokens] = model.save_state()
+
+
+def load_model() -> "Llama":
+    global _model
+
+    with _model_lock:
+        if _model is None:
+            if Llama is None:
+                raise ValueError(
+                    "llama-cpp-python is not installed. Please, refer to the README.md file."
+                )
+            should_have_all_defined(["LLAMA2_MODEL_PATH"])
+
+            # Weights are memory mapped, so the OS page cache shares them between processes
+            model = Llama(
+                model_path=os.environ["LLAMA2_MODEL_PATH"],
+                n_ctx=CONTEXT_WINDOW,
+                n_threads=int(os.getenv("LLAMA2_LOCAL_THREADS", str(os.cpu_count() or 4))),
+                n_batch=int(os.getenv("LLAMA2_LOCAL_BATCH", "512")),
+                use_mmap=True,
+                use_mlock=os.getenv("LLAMA2_LOCAL_MLOCK", "").lower() in ("1", "true", "yes"),
+                verbose=False,
+            )
+            model.set_cache(
+                LlamaRAMCache(
+                    capacity_bytes=int(os.getenv("LLAMA2_LOCAL_KV_CACHE_BYTES", str(2 << 30)))
+                )
+            )
+            prime_prefixes(model)
+            _model = model
+        return _model
+
+
+class LocalLLAMA2Interface(LLAMA2Interface):
+    # Calls are serialized on the shared model, more workers would only wait for the lock
+    max_concurrency = int(os.getenv("LLAMA2_LOCAL_MAX_CONCURRENCY", "1"))
+    default_context_window = CONTEXT_WINDOW
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Keeps cached responses and summaries apart from the remote model and other files
+        self.model = os.path.basename(os.getenv("LLAMA2_MODEL_PATH", "")) or None
+
+    def server_url(self) -> str:
+        # No server, the model runs in this process
+        return ""
+
+    def validate_initialization(self) -> None:
+        load_model()
+
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        llm = load_model()
+        with _generate_lock:
+            completion = llm.create_completion(**completion_parameters(request))
+        usage = completion.get("usage")
+        if usage:
+            metrics.report_usage(usage["prompt_tokens"], usage["completion_tokens"])
+        return completion["choices"][0]["text"]
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        llm = load_model()
+        with _generate_lock:
+            for chunk in llm.create_completion(stream=True, **completion_parameters(request)):
+                text = chunk["choices"][0]["text"]
+                if text:
+                    yield text
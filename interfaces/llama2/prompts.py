@@ -0,0 +1,153 @@
+import json
+from typing import Dict
+
+from interfaces.templates import PromptTemplate, compact, register_template
+
+SUMMARIZE_PREFIX = compact(
+    """[INST] <<SYS>>
+            You are a scientific article reviewer tasked with summarizing a given text.
+            <</SYS>>
+
+            Summarize the following text:"""
+)
+
+THEME_PREFIX = compact(
+    """[INST] <<SYS>>
+            As a scientific article reviewer with expertise in various themes, your role 
+            is to provide valuable feedback to the author for better emphasis and 
+            readability of the text. Your suggestions may fall into categories such as:
+            
+            - Improve References
+            - Address Theme Violations
+            - Identify Missing Related Works (if any)
+            - Point Out Missing Information
+            - Clarify Confusing Explanations
+            - Address Missing Limitations
+            - Suggest Other Improvements
+            
+            You can also create additional categories if needed. Ensure that your feedback 
+            is clear and specific, indicating the sections of the text that require changes.
+
+            Utilize the context provided by the user to evaluate the article effectively.
+            <</SYS>>"""
+)
+
+GRAMMAR_PREFIX = compact(
+    """[INST] <<SYS>>
+            You are a scientific article reviewer tasked with grammar suggestions. 
+            Additionally, check if the document follows DoCO, the Document Components 
+            Ontology, which provides a structured vocabulary for document components, both 
+            structural (e.g., block, inline, paragraph, section) and rhetorical (e.g., 
+            introduction, discussion, acknowledgments, reference list). This ontology 
+            enables these components and documents composed of them to be described in RDF.
+
+            The user has also provided you with context about the article, which you can 
+            use to evaluate the text effectively:"""
+)
+
+COHESION_PREFIX = compact(
+    """[INST] <<SYS>>
+            You are a scientific article reviewer tasked with evaluating the coherence 
+            between the sections of the provided article. Your role is to assess whether 
+            the "Abstract," "Introduction," and "Conclusion" align in terms of their 
+            content and messaging. If there are inconsistencies, please provide feedback 
+            to the user.
+
+            Your objective is to determine if these sections make sense together. For 
+            instance, if the abstract discusses one topic, but the introduction talks 
+            about something entirely different, please flag this as a potential issue. 
+            Similarly, if the introduction and conclusion have opposing statements, point 
+            that out. And if the three sections are consistent, acknowledge their 
+            cohesion.
+
+            The user has also provided you with context about the article, which you can 
+            use to evaluate the text effectively:"""
+)
+
+SUMMARIZE_TEMPLATE = register_template(
+    "llama2",
+    PromptTemplate("summarize", SUMMARIZE_PREFIX + " ", lambda text: f"{text}\n\n[/INST]\n"),
+)
+
+THEME_TEMPLATE = register_template(
+    "llama2",
+    PromptTemplate("theme", THEME_PREFIX + "\n\n", lambda prompt: f"{prompt}\n\n[/INST]\n"),
+)
+
+GRAMMAR_TEMPLATE = register_template(
+    "llama2",
+    PromptTemplate(
+        "grammar",
+        GRAMMAR_PREFIX + " ",
+        lambda context, prompt: f"{context}\n<</SYS>>\n\n{prompt}\n\n[/INST]\n",
+    ),
+)
+
+COHESION_TEMPLATE = register_template(
+    "llama2",
+    PromptTemplate(
+        "cohesion",
+        COHESION_PREFIX + " ",
+        lambda context, abstract, introduction, conclusion: (
+            f"{context}\n<</SYS>>\n\n"
+            f"Abstract:{abstract}\nIntroduction:{introduction}\nConclusion:{conclusion}\n\n"
+            "[/INST]\n"
+        ),
+    ),
+)
+
+
+def summarize_prompt(text: str) -> str:
+    return SUMMARIZE_TEMPLATE.render(text=text)
+
+
+def theme_prompt(prompt: str) -> str:
+    return THEME_TEMPLATE.render(prompt=prompt)
+
+
+def grammar_prompt(context: str, prompt: str) -> str:
+    return GRAMMAR_TEMPLATE.render(context=context, prompt=prompt)
+
+
+def cohesion_prompt(context: str, abstract: str, introduction: str, conclusion: str) -> str:
+    return COHESION_TEMPLATE.render(
+        context=context, abstract=abstract, introduction=introduction, conclusion=conclusion
+    )
+
+
+FUSED_PREFIX = compact(
+    """[INST] <<SYS>>
+            You are a scientific article reviewer with expertise in various themes. You will
+            receive the abstract, introduction and conclusion of an article and must review
+            all of them in a single answer:
+            - Theme: for each section, give clear and specific feedback for better emphasis
+            and readability (references, theme violations, missing related works, missing
+            information, confusing explanations, missing limitations, other improvements).
+            - Grammar: for each section, give grammar suggestions and check if it follows
+            DoCO, the Document Components Ontology.
+            - Cohesion: assess whether the three sections align in content and messaging,
+            and flag any inconsistencies between them.
+
+            Answer only with a JSON object, without any other text, in the format:
+            {"Grammar": {"abstract": "...", "introduction": "...", "conclusion": "..."},
+            "Theme": {"abstract": "...", "introduction": "...", "conclusion": "..."},
+            "Cohesion": "..."}
+
+            The user has also provided you with context about the article, which you can
+            use to evaluate the text effectively:"""
+)
+
+FUSED_TEMPLATE = register_template(
+    "llama2",
+    PromptTemplate(
+        "fused",
+        FUSED_PREFIX + " ",
+        lambda context, prompts: (
+            f"{context}\n<</SYS>>\n\n{json.dumps(prompts, ensure_ascii=False)}\n\n[/INST]\n"
+        ),
+    ),
+)
+
+
+def fused_prompt(context: str, prompts: Dict[str, str]) -> str:
+    return FUSED_TEMPLATE.render(context=context, prompts=prompts)
@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger("revaisor.metrics")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# USD per 1000 (prompt, completion) tokens; self-hosted models have no per-call cost
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-3.5-turbo-16k": (0.003, 0.004),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+}
+
+# The (evaluation, section) being computed and the model call in progress, for the current
+# thread or asyncio task
+current_evaluation: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar(
+    "current_evaluation", default=(None, None)
+)
+current_call: ContextVar[Optional["CallRecord"]] = ContextVar("current_call", default=None)
+
+T = TypeVar("T")
+
+
+def in_context(function: Callable[..., T]) -> Callable[..., T]:
+    # Binds the function to a copy of the current context, for work handed to another thread
+    context = copy_context()
+    return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+
+class CallRecord:
+    def __init__(self, backend: str, model: Optional[str]):
+        self.backend = backend
+        self.model = model
+        self.evaluation, self.section = current_evaluation.get()
+        self.started_at = time.time()
+        self.wall_time: Optional[float] = None
+        self.time_to_first_token: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.retries = 0
+        self.cache_hit = False
+        self.coalesced = False
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def first_token(self) -> None:
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._start
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.wall_time = time.perf_counter() - self._start
+        if self.time_to_first_token is None:
+            self.time_to_first_token = self.wall_time
+        if error is not None:
+            self.error = repr(error)
+
+    @property
+    def cost(self) -> float:
+        prompt_price, completion_price = MODEL_PRICES.get(self.model or "", (0, 0))
+        return (
+            (self.prompt_tokens or 0) * prompt_price
+            + (self.completion_tokens or 0) * completion_price
+        ) / 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "model": self.model,
+            "evaluation": self.evaluation,
+            "section": self.section,
+            "started_at": self.started_at,
+            "wall_time": self.wall_time,
+            "time_to_first_token": self.time_to_first_token,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+            "retries": self.retries,
+            "cache_hit": self.cache_hit,
+            "coalesced": self.coalesced,
+            "error": self.error,
+        }
+
+
+def report_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    record = current_call.get()
+    if record is not None:
+        record.prompt_tokens = prompt_tokens
+        record.completion_tokens = completion_tokens
+
+
+def report_retries(retries: int) -> None:
+    record = current_call.get()
+    if record is not None:
+        record.retries += retries
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[index] += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self.histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+
+    def increment(self, name: str, labels: Dict[str, str], value: float = 1) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            series.setdefault(key, Histogram()).observe(value)
+
+    def record(self, record: CallRecord) -> None:
+        labels = {
+            "backend": record.backend,
+            "evaluation": record.evaluation or "",
+            "cache": "hit" if record.cache_hit else "coalesced" if record.coalesced else "miss",
+        }
+        status = "error" if record.error else "ok"
+        self.increment("revaisor_model_calls_total", {**labels, "status": status})
+        self.increment("revaisor_model_retries_total", labels, record.retries)
+        self.increment("revaisor_prompt_tokens_total", labels, record.prompt_tokens or 0)
+        self.increment("revaisor_completion_tokens_total", labels, record.completion_tokens or 0)
+        self.increment("revaisor_cost_dollars_total", labels, record.cost)
+        if record.wall_time is not None:
+            self.observe("revaisor_model_call_seconds", labels, record.wall_time)
+        if record.time_to_first_token is not None:
+            self.observe("revaisor_time_to_first_token_seconds", labels, record.time_to_first_token)
+
+    def export_prometheus(self) -> str:
+        def format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+            pairs = [f'{name}="{value}"' for name, value in key]
+            if extra:
+                pairs.append(extra)
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{format_labels(key)} {value}")
+            for name, histograms in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in histograms.items():
+                    buckets = [*zip(histogram.buckets, histogram.counts), ("+Inf", histogram.count)]
+                    for bucket, count in buckets:
+                        bucket_labels = format_labels(key, f'le="{bucket}"')
+                        lines.append(f"{name}_bucket{bucket_labels} {count}")
+                    lines.append(f"{name}_sum{format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def log_record(record: CallRecord) -> None:
+    logger.info(json.dumps(record.as_dict()))
+
+
+_hooks: List[Callable[[CallRecord], None]] = [REGISTRY.record, log_record]
+
+
+def add_hook(hook: Callable[[CallRecord], None]) -> None:
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[CallRecord], None]) -> None:
+    _hooks.remove(hook)
+
+
+def emit(record: CallRecord) -> None:
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception:
+            logger.exception("Instrumentation hook %r failed", hook)
@@ -0,0 +1,65 @@
+import importlib
+import threading
+from collections.abc import Mapping
+from importlib.metadata import EntryPoint, entry_points
+from typing import Any, Dict, Iterator, Optional, Union
+
+from utils import load_environment
+
+Target = Union[str, EntryPoint, Any]
+
+
+def resolve(target: Target) -> Any:
+    if isinstance(target, EntryPoint):
+        return target.load()
+    if not isinstance(target, str):
+        return target
+    # "package.module:Class" (or "package.module.Class")
+    module_name, _, attribute = target.partition(":")
+    if not attribute:
+        module_name, _, attribute = target.rpartition(".")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class BackendRegistry(Mapping):
+    def __init__(self, group: str, backends: Optional[Dict[str, Target]] = None):
+        # Backends are only imported the first time they are looked up, so listing the
+        # available models does not pay for openai, aiohttp or requests
+        self.group = group
+        self._targets: Dict[str, Target] = dict(backends or {})
+        self._resolved: Dict[str, Any] = {}
+        self._entry_points_loaded = False
+        self._lock = threading.RLock()
+
+    def register(self, name: str, backend: Target) -> None:
+        with self._lock:
+            self._targets[name] = backend
+            self._resolved.pop(name, None)
+
+    def _load_entry_points(self) -> None:
+        # Installed packages can add backends under this entry point group, e.g.
+        # [tool.poetry.plugins."revaisor.backends"] "My model" = "my_package.interface:MyInterface"
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            for entry_point in entry_points(group=self.group):
+                self._targets.setdefault(entry_point.name, entry_point)
+            self._entry_points_loaded = True
+
+    def __getitem__(self, name: str) -> Any:
+        self._load_entry_points()
+        with self._lock:
+            if name not in self._resolved:
+                target = self._targets[name]
+                # Backends read their settings from the environment when they are imported
+                load_environment()
+                self._resolved[name] = resolve(target)
+            return self._resolved[name]
+
+    def __iter__(self) -> Iterator[str]:
+        self._load_entry_points()
+        return iter(list(self._targets))
+
+    def __len__(self) -> int:
+        self._load_entry_points()
+        return len(self._targets)
@@ -0,0 +1,230 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+from interfaces.metrics import CallRecord
+
+# Bumped whenever a field changes meaning or goes away; new fields are appended at the end
+SCHEMA_VERSION = 1
+
+HIT = "hit"
+MISS = "miss"
+PARTIAL = "partial"
+CARRIED = "carried"
+
+FIELDS = (
+    "evaluation",
+    "section",
+    "text",
+    "started_at",
+    "wall_time",
+    "time_to_first_token",
+    "prompt_tokens",
+    "completion_tokens",
+    "calls",
+    "cached_calls",
+    "cache_status",
+)
+
+
+def add_tokens(total: Optional[int], tokens: Optional[int]) -> Optional[int]:
+    if tokens is None:
+        return total
+    return (total or 0) + tokens
+
+
+class SectionResult:
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        evaluation: str,
+        section: Optional[str],
+        text: str,
+        started_at: Optional[float] = None,
+        wall_time: Optional[float] = None,
+        time_to_first_token: Optional[float] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        calls: int = 0,
+        cached_calls: int = 0,
+        cache_status: str = MISS,
+    ):
+        self.evaluation = evaluation
+        self.section = section
+        self.text = text
+        self.started_at = started_at
+        self.wall_time = wall_time
+        self.time_to_first_token = time_to_first_token
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.calls = calls
+        self.cached_calls = cached_calls
+        self.cache_status = cache_status
+
+    @classmethod
+    def from_records(
+        cls, evaluation: str, section: Optional[str], text: str, records: List[CallRecord]
+    ) -> "SectionResult":
+        result = cls(evaluation, section, text)
+        if not records:
+            return result
+
+        # A cell may take several calls (chunks, summaries), timed from the first to the last
+        result.started_at = min(record.started_at for record in records)
+        result.wall_time = (
+            max(record.started_at + (record.wall_time or 0) for record in records)
+            - result.started_at
+        )
+        result.time_to_first_token = (
+            min(record.started_at + (record.time_to_first_token or 0) for record in records)
+            - result.started_at
+        )
+        for record in records:
+            result.prompt_tokens = add_tokens(result.prompt_tokens, record.prompt_tokens)
+            result.completion_tokens = add_tokens(
+                result.completion_tokens, record.completion_tokens
+            )
+        result.calls = len(records)
+        result.cached_calls = sum(record.cache_hit or record.coalesced for record in records)
+        if result.cached_calls == result.calls:
+            result.cache_status = HIT
+        elif result.cached_calls:
+            result.cache_status = PARTIAL
+        return result
+
+    def as_row(self) -> List[Any]:
+        return [getattr(self, field) for field in FIELDS]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self) -> str:
+        return f"SectionResult({self.evaluation!r}, {self.section!r}, {self.cache_status!r})"
+
+
+class ReviewResult:
+    __slots__ = ("backend", "model", "section_hashes", "sections")
+
+    def __init__(
+        self,
+        backend: str,
+        model: Optional[str],
+        sections: List[SectionResult],
+        section_hashes: Optional[Dict[str, str]] = None,
+    ):
+        self.backend = backend
+        self.model = model
+        self.sections = sections
+        self.section_hashes = section_hashes or {}
+
+    @classmethod
+    def build(
+        cls,
+        backend: str,
+        model: Optional[str],
+        response: Dict[str, Union[Dict[str, str], str]],
+        records: Iterable[CallRecord],
+        carried_over: Optional[Dict[Tuple[str, Optional[str]], str]] = None,
+        section_hashes: Optional[Dict[str, str]] = None,
+    ) -> "ReviewResult":
+        by_cell: Dict[Tuple[Optional[str], Optional[str]], List[CallRecord]] = {}
+        for record in records:
+            by_cell.setdefault((record.evaluation, record.section), []).append(record)
+        # A fused review answers every cell with one call made outside of any evaluation
+        fused = by_cell.get((None, None), [])
+
+        sections = []
+        fused_counted = False
+        for evaluation, result in response.items():
+            texts = result.items() if isinstance(result, dict) else [(None, result)]
+            for section, text in texts:
+                if carried_over and (evaluation, section) in carried_over:
+                    sections.append(SectionResult(evaluation, section, text, cache_status=CARRIED))
+                    continue
+                cell_records = by_cell.get((evaluation, section))
+                if cell_records:
+                    sections.append(
+                        SectionResult.from_records(evaluation, section, text, cell_records)
+                    )
+                    continue
+                cell = SectionResult.from_records(evaluation, section, text, fused)
+                # Every cell shares the timing and cache status of the fused call, but only the
+                # first one counts its calls and tokens, so totals over the cells are right
+                if fused_counted:
+                    cell.prompt_tokens = cell.completion_tokens = None
+                    cell.calls = cell.cached_calls = 0
+                fused_counted = fused_counted or bool(fused)
+                sections.append(cell)
+        return cls(backend, model, sections, section_hashes)
+
+    def __iter__(self) -> Iterator[SectionResult]:
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def get(self, evaluation: str, section: Optional[str] = None) -> Optional[SectionResult]:
+        for result in self.sections:
+            if result.evaluation == evaluation and result.section == section:
+                return result
+        return None
+
+    def to_response(self) -> Dict[str, Union[Dict[str, str], str]]:
+        # The nested shape returned by get_response
+        response: Dict[str, Union[Dict[str, str], str]] = {}
+        for result in self.sections:
+            if result.section is None:
+                response[result.evaluation] = result.text
+                continue
+            texts = response.setdefault(result.evaluation, {})
+            if isinstance(texts, dict):
+                texts[result.section] = result.text
+        return response
+
+    def as_dict(self) -> Dict[str, Any]:
+        # Sections are rows in FIELDS order, so the field names are not repeated per section
+        return {
+            "schema": SCHEMA_VERSION,
+            "backend": self.backend,
+            "model": self.model,
+            "section_hashes": self.section_hashes,
+            "fields": list(FIELDS),
+            "sections": [result.as_row() for result in self.sections],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReviewResult":
+        if data.get("schema") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported result schema {data.get('schema')!r}")
+        # Rows are read by field name, so results written by a newer version still load
+        fields = data["fields"]
+        sections = []
+        for row in data["sections"]:
+            values = dict(zip(fields, row))
+            sections.append(
+                SectionResult(**{field: values[field] for field in FIELDS if field in values})
+            )
+        return cls(data["backend"], data["model"], sections, data.get("section_hashes"))
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "ReviewResult":
+        return cls.from_dict(json.loads(data))
+
+    def to_msgpack(self) -> bytes:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed. Please, refer to the README.md file.")
+        return msgpack.packb(self.as_dict(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, data: bytes) -> "ReviewResult":
+        if msgpack is None:
+            raise ValueError("msgpack is not installed. Please, refer to the README.md file.")
+        return cls.from_dict(msgpack.unpackb(data, raw=False))
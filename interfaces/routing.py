@@ -0,0 +1,441 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from queue import Queue
+from typing import Any, Callable, Deque, Dict, List, Optional, Protocol, Tuple, TypeVar, cast
+
+from interfaces import AVAILABLE_MODELS, metrics
+from interfaces.base import BaseInterface, Response
+
+T = TypeVar("T")
+
+BACKENDS = [
+    name.strip()
+    for name in os.getenv("REVAISOR_ROUTING_BACKENDS", "GPT-3.5,LLAMA2").split(",")
+    if name.strip()
+]
+# Samples older than this are forgotten, so a backend that was slow or failing gets traffic
+# again once it had time to recover
+WINDOW_SECONDS = float(os.getenv("REVAISOR_ROUTING_WINDOW", "600"))
+WINDOW_SIZE = int(os.getenv("REVAISOR_ROUTING_WINDOW_SIZE", "100"))
+MIN_SAMPLES = int(os.getenv("REVAISOR_ROUTING_MIN_SAMPLES", "3"))
+MAX_ERROR_RATE = float(os.getenv("REVAISOR_ROUTING_MAX_ERROR_RATE", "0.5"))
+HEDGE_PERCENTILE = float(os.getenv("REVAISOR_ROUTING_HEDGE_PERCENTILE", "0.95"))
+# Until a backend has enough samples its p95 is unknown, and the hedge waits this long
+HEDGE_DELAY = float(os.getenv("REVAISOR_ROUTING_HEDGE_DELAY", "10"))
+MIN_HEDGE_DELAY = float(os.getenv("REVAISOR_ROUTING_MIN_HEDGE_DELAY", "0.5"))
+# An attempt still running after this long counts as failed: a hung backend never ends its
+# attempts, and would never be measured otherwise
+ATTEMPT_TIMEOUT = float(os.getenv("REVAISOR_ROUTING_ATTEMPT_TIMEOUT", "300"))
+
+# (backend, evaluation, streamed): streamed cells are timed to their first model output,
+# the others to their result
+LatencyKey = Tuple[str, str, bool]
+
+
+class Backend(Protocol):
+    # What routing needs from a backend: the evaluations are not declared by BaseInterface,
+    # but every backend names them the same
+    records: List[metrics.CallRecord]
+    _stream: threading.local
+
+    def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        ...
+
+    def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        ...
+
+    def evaluate_prompt_by_cohesion(self) -> str:
+        ...
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class RoutingStats:
+    # Rolling latencies per backend and evaluation, and outcomes per backend, shared by every
+    # review of the process
+    def __init__(self, window_seconds: float = 600, window_size: int = 100):
+        self.window_seconds = window_seconds
+        self.window_size = window_size
+        self._latencies: Dict[LatencyKey, Deque[Tuple[float, float]]] = {}
+        self._outcomes: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, samples: Deque[Tuple[float, Any]]) -> List[Any]:
+        oldest = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < oldest:
+            samples.popleft()
+        return [value for _, value in samples]
+
+    def record(
+        self,
+        backend: str,
+        ok: bool,
+        key: Optional[LatencyKey] = None,
+        latency: Optional[float] = None,
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            outcomes = self._outcomes.setdefault(backend, deque(maxlen=self.window_size))
+            outcomes.append((now, ok))
+            if key is not None and latency is not None:
+                latencies = self._latencies.setdefault(key, deque(maxlen=self.window_size))
+                latencies.append((now, latency))
+
+    def latencies(self, key: LatencyKey) -> List[float]:
+        with self._lock:
+            samples = self._latencies.get(key)
+            return self._recent(samples) if samples is not None else []
+
+    def error_rate(self, backend: str) -> float:
+        with self._lock:
+            samples = self._outcomes.get(backend)
+            outcomes = self._recent(samples) if samples is not None else []
+        if len(outcomes) < MIN_SAMPLES:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def healthy(self, backend: str) -> bool:
+        return self.error_rate(backend) <= MAX_ERROR_RATE
+
+    def rank(self, backends: List[str], evaluation: str, streamed: bool) -> List[str]:
+        # Healthy backends first, then by expected latency (the median, inflated by the error
+        # rate). A backend without enough samples is expected to answer within the hedge
+        # delay: it comes after the ones measured faster, and gets measured when hedged to.
+        def score(backend: str) -> Tuple[bool, float]:
+            latencies = self.latencies((backend, evaluation, streamed))
+            expected = percentile(latencies, 0.5) if len(latencies) >= MIN_SAMPLES else HEDGE_DELAY
+            return not self.healthy(backend), expected / max(0.01, 1 - self.error_rate(backend))
+
+        return sorted(backends, key=score)
+
+    def hedge_delay(self, key: LatencyKey) -> float:
+        latencies = self.latencies(key)
+        if len(latencies) < MIN_SAMPLES:
+            return HEDGE_DELAY
+        return max(MIN_HEDGE_DELAY, percentile(latencies, HEDGE_PERCENTILE))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latencies.clear()
+            self._outcomes.clear()
+
+
+class AttemptPool:
+    # Runs attempts on at most max_workers threads, like a ThreadPoolExecutor, but on daemon
+    # threads: an attempt stuck on a hung backend must not keep the process from exiting
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: "Queue[Tuple[Future, Callable[[], Any]]]" = Queue()
+        self._threads: List[threading.Thread] = []
+        self._idle = threading.Semaphore(0)
+        self._lock = threading.Lock()
+
+    def run(self, future: "Future[T]", function: Callable[..., T], *args: Any) -> None:
+        self._queue.put((future, lambda: function(*args)))
+        # A new thread only when none is idle
+        if self._idle.acquire(blocking=False):
+            return
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _work(self) -> None:
+        while True:
+            future, function = self._queue.get()
+            # Attempts given up on before they started are dropped
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = function()
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            self._idle.release()
+
+
+STATS = RoutingStats(WINDOW_SECONDS, WINDOW_SIZE)
+# Attempts run here, so a losing attempt can finish in the background after its cell is done
+ATTEMPTS = AttemptPool(
+    max_workers=int(os.getenv("REVAISOR_ROUTING_MAX_ATTEMPTS", "32")),
+    thread_name_prefix="routing",
+)
+
+
+class Attempt:
+    def __init__(self, backend: str, interface: Backend):
+        self.backend = backend
+        self.interface = interface
+        self.started_at = time.time()
+        # Set once the attempt leaves the pool queue
+        self.started: Optional[float] = None
+        self.answered_at: Optional[float] = None
+        # Whether the outcome of the attempt is already in the stats
+        self.settled = False
+        self.buffer: List[str] = []
+        self.future: "Future[str]" = Future()
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+
+    def elapsed(self) -> Optional[float]:
+        return time.perf_counter() - self.started if self.started is not None else None
+
+    def records(
+        self, evaluation: Optional[str], section: Optional[str]
+    ) -> List[metrics.CallRecord]:
+        # The calls this attempt made, a backend only runs one attempt of a cell at a time
+        return [
+            record
+            for record in list(self.interface.records)
+            if (record.evaluation, record.section) == (evaluation, section)
+            and record.started_at >= self.started_at
+        ]
+
+
+class Race:
+    # The attempts at one (evaluation, section). The first to answer wins: when streaming,
+    # the first with model output, otherwise the first with a result. Only the winner's text
+    # reaches the sink, so the streamed text is always the text of the result.
+    def __init__(self, evaluation: str, sink: Optional[Callable[[str], None]]):
+        self.evaluation = evaluation
+        self.sink = sink
+        self.winner: Optional[Attempt] = None
+        self.attempts: List[Attempt] = []
+        self.changed = threading.Condition()
+
+    def key(self, attempt: Attempt) -> LatencyKey:
+        return attempt.backend, self.evaluation, self.sink is not None
+
+    def answer(self, attempt: Attempt) -> float:
+        with self.changed:
+            if attempt.answered_at is None:
+                attempt.answered_at = time.perf_counter()
+            if self.winner is None:
+                self.winner = attempt
+                if self.sink is not None:
+                    for chunk in attempt.buffer:
+                        self.sink(chunk)
+                self.changed.notify_all()
+            attempt.buffer = []
+            return attempt.answered_at
+
+    def relay(self, attempt: Attempt, sink: Callable[[str], None]) -> Callable[[str], None]:
+        def emit(chunk: str) -> None:
+            with self.changed:
+                # Text written before any model call (e.g. the grammar report) is not an answer
+                if metrics.current_call.get() is not None:
+                    self.answer(attempt)
+                if self.winner is attempt:
+                    sink(chunk)
+                elif self.winner is None:
+                    attempt.buffer.append(chunk)
+
+        return emit
+
+    def settle(self, attempt: Attempt, ok: bool, latency: Optional[float] = None) -> None:
+        # Every attempt counts once: when it ends, or when it times out
+        with self.changed:
+            if attempt.settled:
+                return
+            attempt.settled = True
+        STATS.record(attempt.backend, ok, self.key(attempt), latency)
+
+    def time_out(self, attempt: Attempt) -> None:
+        # Losing the race says nothing about the backend, only running past ATTEMPT_TIMEOUT
+        # does. Until then the attempt settles with its real outcome when it ends.
+        elapsed = attempt.elapsed()
+        if elapsed is not None and not attempt.future.done():
+            self.settle(attempt, False, elapsed)
+
+    def notify(self, _: Future) -> None:
+        with self.changed:
+            self.changed.notify_all()
+
+
+class RoutingInterface(BaseInterface):
+    max_concurrency = int(os.getenv("REVAISOR_ROUTING_MAX_CONCURRENCY", "7"))
+
+    def __init__(
+        self,
+        context: str,
+        prompts: Dict[str, str],
+        max_tokens: int = 10000,
+        temperature: float = 0.5,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
+    ):
+        self.backends: Dict[str, Backend] = {}
+
+        self.evaluations = [
+            {
+                "title": "Theme",
+                "description": "Evaluate the text by theme.",
+                "method": self.evaluate_prompt_by_theme,
+                "per_section": True,
+            },
+            {
+                "title": "Grammar",
+                "description": "Evaluate the text by grammar.",
+                "method": self.evaluate_prompt_by_grammar,
+                "per_section": True,
+            },
+            {
+                "title": "Cohesion",
+                "description": "Evaluate the text by cohesion.",
+                "method": self.evaluate_prompt_by_cohesion,
+            },
+        ]
+
+        super().__init__(
+            context=context,
+            prompts=prompts,
+            model=None,
+            evaluations=self.evaluations,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            fused=fused,
+            previous_response=previous_response,
+            previous_hashes=previous_hashes,
+        )
+
+    def validate_initialization(self) -> None:
+        # Backends that are not configured or not reachable (e.g. the LLAMA2 tunnel is down)
+        # are left out of this review
+        if self.backends:
+            return
+        errors = []
+        for name in BACKENDS:
+            backend = AVAILABLE_MODELS.get(name)
+            if backend is None:
+                errors.append(f"{name}: unknown model.")
+                continue
+            try:
+                interface = backend(self.context, self.prompts, use_cache=self.cache is not None)
+                interface.validate_initialization()
+            except ValueError as error:
+                errors.append(f"{name}: {error}")
+            else:
+                self.backends[name] = cast(Backend, interface)
+        if not self.backends:
+            raise ValueError(" ".join(["No backend is available.", *errors]))
+
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        raise NotImplementedError("Model calls are made by the routed backends.")
+
+    def _attempt(self, race: Race, attempt: Attempt, evaluate: Callable[[Backend], str]) -> str:
+        attempt.start()
+        timeout = threading.Timer(ATTEMPT_TIMEOUT, race.time_out, (attempt,))
+        timeout.daemon = True
+        timeout.start()
+        if race.sink is not None:
+            attempt.interface._stream.sink = race.relay(attempt, race.sink)
+        try:
+            text = evaluate(attempt.interface)
+        except Exception:
+            race.settle(attempt, ok=False)
+            raise
+        finally:
+            timeout.cancel()
+            attempt.interface._stream.sink = None
+        answered_at = race.answer(attempt)
+
+        # Answers from the cache say nothing about the backend latency
+        records = attempt.records(*metrics.current_evaluation.get())
+        if any(not record.cache_hit for record in records) and attempt.started is not None:
+            race.settle(attempt, True, answered_at - attempt.started)
+        else:
+            race.settle(attempt, ok=True)
+        return text
+
+    def route(self, evaluation: str, evaluate: Callable[[Backend], str]) -> str:
+        # Sends the evaluation to the fastest healthy backend. If it has not answered by its
+        # p95 latency (or failed), the next backend gets the same evaluation, and whichever
+        # answers first is kept.
+        sink: Optional[Callable[[str], None]] = getattr(self._stream, "sink", None)
+        candidates = STATS.rank(list(self.backends), evaluation, sink is not None)
+        race = Race(evaluation, sink)
+
+        def launch() -> float:
+            name = candidates[len(race.attempts)]
+            attempt = Attempt(name, self.backends[name])
+            race.attempts.append(attempt)
+            attempt.future.add_done_callback(race.notify)
+            ATTEMPTS.run(attempt.future, metrics.in_context(self._attempt), race, attempt, evaluate)
+            return time.monotonic() + STATS.hedge_delay(race.key(attempt))
+
+        with race.changed:
+            deadline = launch()
+            while True:
+                if race.winner is not None:
+                    if race.winner.future.done():
+                        break
+                    race.changed.wait()
+                    continue
+                running = [attempt for attempt in race.attempts if not attempt.future.done()]
+                following = candidates[len(race.attempts) :]
+                if not running and not following:
+                    break
+                if not running:
+                    deadline = launch()
+                    continue
+                # Unhealthy backends only get an evaluation once every other attempt failed
+                if not following or not STATS.healthy(following[0]):
+                    race.changed.wait()
+                    continue
+                if time.monotonic() >= deadline:
+                    deadline = launch()
+                    continue
+                race.changed.wait(max(0, deadline - time.monotonic()))
+
+            # The losers still queued are dropped, the ones still running are left to finish
+            # and settle with their own outcome
+            for attempt in race.attempts:
+                if attempt is not race.winner:
+                    attempt.future.cancel()
+
+        winner = race.winner
+        if winner is None:
+            # Every backend failed, the error of the first (the fastest) one is reported
+            race.attempts[0].future.result()
+            raise ValueError("No backend answered.")
+        text = winner.future.result()
+
+        self.records.extend(winner.records(*metrics.current_evaluation.get()))
+        metrics.REGISTRY.increment(
+            "revaisor_routed_evaluations_total",
+            {
+                "evaluation": evaluation,
+                "backend": winner.backend,
+                "hedged": "true" if len(race.attempts) > 1 else "false",
+            },
+        )
+        return text
+
+    def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        return self.route("Theme", lambda backend: backend.evaluate_prompt_by_theme(prompt))
+
+    def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        return self.route("Grammar", lambda backend: backend.evaluate_prompt_by_grammar(prompt))
+
+    def evaluate_prompt_by_cohesion(self) -> str:
+        return self.route("Cohesion", lambda backend: backend.evaluate_prompt_by_cohesion())
@@ -0,0 +1,256 @@
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy comes with streamlit, but the cache is optional
+    np = None  # type: ignore[assignment]
+
+WORD = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    # Word and word-pair counts hashed into a fixed number of dimensions: no model to download,
+    # and texts that differ by punctuation or a few words land next to each other
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, text: str) -> "np.ndarray":
+        words = WORD.findall(text.lower())
+        features = Counter(words)
+        features.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in features.items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            # The sign bit keeps colliding features from always adding up
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign * (1 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ValueError(
+                "sentence-transformers is not installed. Please, refer to the README.md file."
+            )
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, text: str) -> "np.ndarray":
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        path: Optional[str],
+        embedder: Any,
+        threshold: float = 0.98,
+        max_entries: int = 2000,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Preallocated slots: the index never grows past max_entries vectors
+        self._vectors = np.zeros((max_entries, embedder.dimensions), dtype=np.float32)
+        self._namespaces = np.full(max_entries, -1, dtype=np.int64)
+        self._accessed_at = np.zeros(max_entries, dtype=np.float64)
+        self._values: List[Optional[str]] = [None] * max_entries
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._slots: Dict[str, int] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self._next_namespace_id = 0
+
+        # Rows are keyed by a hash of their namespace and text, so the server workers sharing
+        # the file add entries next to each other's instead of over them. The id tells which
+        # rows were written since this process last read the file.
+        self._connection: Optional[sqlite3.Connection] = None
+        self._last_id = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS semantic_entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    namespace TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    value TEXT NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._connection.commit()
+            with self._lock:
+                self._load(self._connection)
+
+    @staticmethod
+    def key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespace_ids:
+            self._namespace_ids[namespace] = self._next_namespace_id
+            self._next_namespace_id += 1
+        return self._namespace_ids[namespace]
+
+    def _forget_namespace(self, namespace_id: int) -> None:
+        # Namespaces whose last entry was evicted are forgotten too, to keep memory bounded
+        if namespace_id >= 0 and not np.any(self._namespaces == namespace_id):
+            for namespace, known_id in list(self._namespace_ids.items()):
+                if known_id == namespace_id:
+                    del self._namespace_ids[namespace]
+
+    def _store(
+        self, key: str, namespace: str, vector: "np.ndarray", value: str, accessed_at: float
+    ) -> None:
+        # The entry takes its own slot back, then a free one, then the least recently used one
+        slot = self._slots.get(key)
+        if slot is None:
+            free = np.flatnonzero(self._namespaces < 0)
+            slot = int(free[0]) if len(free) else int(np.argmin(self._accessed_at))
+        evicted = int(self._namespaces[slot])
+        evicted_key = self._keys[slot]
+        if evicted_key is not None:
+            del self._slots[evicted_key]
+        self._vectors[slot] = vector
+        self._namespaces[slot] = self._namespace_id(namespace)
+        self._accessed_at[slot] = accessed_at
+        self._values[slot] = value
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._forget_namespace(evicted)
+
+    def _load(self, connection: sqlite3.Connection) -> None:
+        # Reads the rows written since the last load (by this or another process), most
+        # recently used last so they are the ones kept when they do not all fit
+        rows = connection.execute(
+            """SELECT id, key, namespace, vector, value, accessed_at FROM semantic_entries
+            WHERE id > ? ORDER BY accessed_at""",
+            (self._last_id,),
+        ).fetchall()
+        for row_id, key, namespace, vector, value, accessed_at in rows:
+            self._last_id = max(self._last_id, row_id)
+            vector = np.frombuffer(vector, dtype=np.float32)
+            # Entries of another embedder do not fit
+            if vector.shape[0] == self.embedder.dimensions:
+                self._store(key, namespace, vector, value, accessed_at)
+
+    def get(self, namespace: str, text: str) -> Optional[Tuple[float, str]]:
+        # Returns the similarity and the stored review of the closest past input, if close enough
+        namespace = f"{self.embedder.name}:{namespace}"
+        vector = self.embedder.embed(text)
+        with self._lock:
+            if self._connection is not None:
+                self._load(self._connection)
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is not None:
+                slots = np.flatnonzero(self._namespaces == namespace_id)
+                similarities = self._vectors[slots] @ vector
+                best = int(np.argmax(similarities))
+                slot = int(slots[best])
+                value = self._values[slot]
+                if similarities[best] >= self.threshold and value is not None:
+                    self._accessed_at[slot] = time.time()
+                    self.hits += 1
+                    if self._connection is not None:
+                        self._connection.execute(
+                            "UPDATE semantic_entries SET accessed_at = ? WHERE key = ?",
+                            (self._accessed_at[slot], self._keys[slot]),
+                        )
+                        self._connection.commit()
+                    return float(similarities[best]), value
+            self.misses += 1
+            return None
+
+    def set(self, namespace: str, text: str, value: str) -> None:
+        namespace = f"{self.embedder.name}:{namespace}"
+        key = self.key(namespace, text)
+        vector = self.embedder.embed(text)
+        now = time.time()
+        with self._lock:
+            self._store(key, namespace, vector, value, now)
+            if self._connection is None:
+                return
+            self._connection.execute(
+                """INSERT OR REPLACE INTO semantic_entries (key, namespace, vector, value,
+                accessed_at) VALUES (?, ?, ?, ?, ?)""",
+                (key, namespace, vector.tobytes(), value, now),
+            )
+            # The file keeps as many entries as the index, the least recently used go first
+            self._connection.execute(
+                """DELETE FROM semantic_entries WHERE id IN (
+                    SELECT id FROM semantic_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._namespaces >= 0))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._namespaces[:] = -1
+            self._values = [None] * self.max_entries
+            self._keys = [None] * self.max_entries
+            self._slots.clear()
+            self._namespace_ids.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM semantic_entries")
+                self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+
+_default_cache: Optional[SemanticCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_semantic_cache() -> Optional[SemanticCache]:
+    global _default_cache
+
+    disabled = ("1", "true", "yes")
+    if (
+        np is None
+        or os.getenv("REVAISOR_CACHE_DISABLED", "").lower() in disabled
+        or os.getenv("REVAISOR_SEMANTIC_CACHE_DISABLED", "").lower() in disabled
+    ):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            model_name = os.getenv("REVAISOR_EMBEDDING_MODEL")
+            if model_name:
+                embedder: Any = SentenceTransformerEmbedder(model_name)
+            else:
+                embedder = HashingEmbedder(int(os.getenv("REVAISOR_EMBEDDING_DIMENSIONS", "1024")))
+            _default_cache = SemanticCache(
+                path=os.getenv("REVAISOR_SEMANTIC_CACHE_PATH", ".cache/semantic.sqlite3"),
+                embedder=embedder,
+                threshold=float(os.getenv("REVAISOR_SEMANTIC_CACHE_THRESHOLD", "0.98")),
+                max_entries=int(os.getenv("REVAISOR_SEMANTIC_CACHE_MAX_ENTRIES", "2000")),
+            )
+        return _default_cache
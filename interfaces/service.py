@@ -0,0 +1,96 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from interfaces import AVAILABLE_MODELS
+from interfaces.base import BaseInterface, Response
+from interfaces.jobs import get_default_queue
+from utils.ingestion import SECTIONS
+
+Snapshot = Dict[str, Any]
+
+CONNECT_TIMEOUT = float(os.getenv("REVAISOR_API_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("REVAISOR_API_READ_TIMEOUT", "60"))
+
+
+def create_interface(
+    model: str,
+    context: str,
+    prompts: Dict[str, str],
+    fused: bool = False,
+    previous_response: Optional[Response] = None,
+    previous_hashes: Optional[Dict[str, str]] = None,
+) -> BaseInterface:
+    backend = AVAILABLE_MODELS.get(model)
+    if backend is None:
+        raise ValueError(f"Unknown model {model!r}.")
+    if not isinstance(context, str):
+        raise ValueError("The context must be a string.")
+    if (
+        not isinstance(prompts, dict)
+        or not prompts
+        or not all(isinstance(text, str) and text for text in prompts.values())
+    ):
+        raise ValueError("The prompts must map every section name to its text.")
+    if sorted(prompts) != sorted(SECTIONS):
+        raise ValueError(f"The prompts must have exactly the sections {', '.join(SECTIONS)}.")
+    return backend(
+        context,
+        prompts,
+        fused=bool(fused),
+        previous_response=previous_response,
+        previous_hashes=previous_hashes,
+    )
+
+
+class LocalReviewService:
+    # Reviews run in this process, in the background job queue
+    def models(self) -> List[str]:
+        return list(AVAILABLE_MODELS)
+
+    def submit(self, model: str, context: str, prompts: Dict[str, str], **options: Any) -> str:
+        return get_default_queue().submit(create_interface(model, context, prompts, **options))
+
+    def snapshot(self, review_id: str) -> Optional[Snapshot]:
+        job = get_default_queue().get(review_id)
+        return job.snapshot() if job is not None else None
+
+
+class RemoteReviewService:
+    # Reviews run by the HTTP service in server.py, possibly on other machines
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        return self.session.request(method, self.url + path, **kwargs)
+
+    def models(self) -> List[str]:
+        response = self._request("GET", "/models")
+        response.raise_for_status()
+        return response.json()["models"]
+
+    def submit(self, model: str, context: str, prompts: Dict[str, str], **options: Any) -> str:
+        response = self._request(
+            "POST",
+            "/reviews",
+            json={"model": model, "context": context, "prompts": prompts, **options},
+        )
+        if response.status_code == 400:
+            raise ValueError(response.json()["error"])
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def snapshot(self, review_id: str) -> Optional[Snapshot]:
+        response = self._request("GET", f"/reviews/{review_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+
+def get_review_service() -> Any:
+    url = os.getenv("REVAISOR_API_URL")
+    return RemoteReviewService(url) if url else LocalReviewService()
@@ -0,0 +1,46 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from interfaces.chunking import count_prompt_tokens
+
+Messages = Tuple[Dict[str, str], ...]
+
+TEMPLATES: Dict[str, Dict[str, "PromptTemplate"]] = {}
+
+
+def compact(text: str) -> str:
+    # Drop the source code indentation that multi-line literals carry into the prompt
+    return "\n".join(line.strip() for line in text.strip().splitlines())
+
+
+class PromptTemplate:
+    def __init__(self, name: str, prefix: Union[str, Messages], suffix: Callable[..., Any]):
+        # The prefix is built once and is identical for every call, so it always comes first:
+        # that is what lets provider prefix caching and the llama.cpp KV cache reuse it.
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self._prefix_tokens: Dict[Optional[str], int] = {}
+
+    def render(self, **variables: Any) -> Any:
+        suffix = self.suffix(**variables)
+        if isinstance(self.prefix, str):
+            return self.prefix + suffix
+        return [*self.prefix, *suffix]
+
+    def prefix_tokens(self, model: Optional[str] = None) -> int:
+        if model not in self._prefix_tokens:
+            prefix = self.prefix if isinstance(self.prefix, str) else list(self.prefix)
+            self._prefix_tokens[model] = count_prompt_tokens(prefix, model)
+        return self._prefix_tokens[model]
+
+    def token_count(self, model: Optional[str] = None, **variables: Any) -> int:
+        return count_prompt_tokens(self.render(**variables), model)
+
+
+def register_template(backend: str, template: PromptTemplate) -> PromptTemplate:
+    TEMPLATES.setdefault(backend, {})[template.name] = template
+    return template
+
+
+def template_token_counts(backend: str, model: Optional[str] = None) -> Dict[str, int]:
+    return {name: template.prefix_tokens(model) for name, template in TEMPLATES[backend].items()}
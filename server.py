@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import tornado.httpserver
+import tornado.iostream
+import tornado.netutil
+import tornado.process
+import tornado.web
+
+from interfaces.base import BaseInterface
+from interfaces.jobs import DONE, FAILED, PENDING, RUNNING, Event
+from utils import load_environment
+
+# Seconds between checks for new events of a streamed review, and between keep-alive comments
+EVENTS_POLL_INTERVAL = float(os.getenv("REVAISOR_SERVER_POLL_INTERVAL", "0.1"))
+KEEP_ALIVE_INTERVAL = 15
+# Streamed chunks are written to the store in batches, not one row per token
+FLUSH_INTERVAL = float(os.getenv("REVAISOR_SERVER_FLUSH_INTERVAL", "0.1"))
+
+
+class ReviewStore:
+    # Reviews and their streamed events, in a SQLite file shared by every worker process, so
+    # any of them can answer for a review started by another one
+    def __init__(self, path: str, history: int = 100):
+        self.history = history
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS reviews (
+                id TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                cells TEXT NOT NULL,
+                section_hashes TEXT NOT NULL,
+                result TEXT
+            )"""
+        )
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS events (
+                review_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                evaluation TEXT NOT NULL,
+                section TEXT,
+                chunk TEXT NOT NULL,
+                PRIMARY KEY (review_id, position)
+            )"""
+        )
+        self._connection.commit()
+
+    def create(self, review_id: str, model: str, interface: BaseInterface) -> None:
+        cells = [
+            [evaluation["title"], prompt_name]
+            for evaluation in interface.evaluations
+            for prompt_name in (interface.prompts if evaluation.get("per_section") else [None])
+        ]
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO reviews (id, model, status, created_at, cells, section_hashes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    review_id,
+                    model,
+                    PENDING,
+                    time.time(),
+                    json.dumps(cells),
+                    json.dumps(interface.section_hashes),
+                ),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def set_status(self, review_id: str, status: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE reviews SET status = ? WHERE id = ?", (status, review_id)
+            )
+            self._connection.commit()
+
+    def append_events(self, review_id: str, start: int, events: List[Event]) -> None:
+        with self._lock:
+            self._connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+                [
+                    (review_id, start + offset, title, section, chunk)
+                    for offset, (title, section, chunk) in enumerate(events)
+                ],
+            )
+            self._connection.commit()
+
+    def finish(
+        self, review_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE reviews SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, result, error, time.time(), review_id),
+            )
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        # Forget the oldest finished reviews, never the ones still waiting or running
+        stale = self._connection.execute(
+            "SELECT id FROM reviews WHERE status IN (?, ?) ORDER BY created_at DESC "
+            "LIMIT -1 OFFSET ?",
+            (DONE, FAILED, self.history),
+        ).fetchall()
+        for (review_id,) in stale:
+            self._connection.execute("DELETE FROM events WHERE review_id = ?", (review_id,))
+            self._connection.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
+
+    def status(self, review_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT status, error FROM reviews WHERE id = ?", (review_id,)
+            ).fetchone()
+
+    def events_since(self, review_id: str, start: int) -> List[Event]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT evaluation, section, chunk FROM events "
+                "WHERE review_id = ? AND position >= ? ORDER BY position",
+                (review_id, start),
+            ).fetchall()
+
+    def snapshot(self, review_id: str) -> Optional[Dict[str, Any]]:
+        # The same shape as interfaces.jobs.Job.snapshot
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, error, created_at, finished_at, cells, section_hashes, result "
+                "FROM reviews WHERE id = ?",
+                (review_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, error, created_at, finished_at, cells, section_hashes, result = row
+
+        partial = {(title, section): "" for title, section in json.loads(cells)}
+        for title, section, chunk in self.events_since(review_id, 0):
+            partial[(title, section)] = partial.get((title, section), "") + chunk
+        result = json.loads(result) if result else None
+        return {
+            "id": review_id,
+            "status": status,
+            "created_at": created_at,
+            "finished_at": finished_at,
+            "error": error,
+            "partial": [[title, section, text] for (title, section), text in partial.items()],
+            "response": result["response"] if result else None,
+            "section_hashes": json.loads(section_hashes),
+            "result": result["result"] if result else None,
+        }
+
+
+def run_review(store: ReviewStore, review_id: str, interface: BaseInterface) -> None:
+    store.set_status(review_id, RUNNING)
+    position = 0
+    pending: List[Event] = []
+    flushed_at = time.monotonic()
+    try:
+        for event in interface.stream_response():
+            pending.append(event)
+            if time.monotonic() - flushed_at >= FLUSH_INTERVAL:
+                store.append_events(review_id, position, pending)
+                position += len(pending)
+                pending = []
+                flushed_at = time.monotonic()
+        store.append_events(review_id, position, pending)
+        result = interface.get_result()
+    except Exception as error:
+        store.finish(review_id, FAILED, error=str(error))
+    else:
+        payload = {"response": result.to_response(), "result": result.as_dict()}
+        store.finish(review_id, DONE, result=json.dumps(payload, ensure_ascii=False))
+
+
+def last_event_id(value: Optional[str]) -> int:
+    # A missing or malformed header replays the stream from the start
+    try:
+        return max(int(value or ""), -1)
+    except ValueError:
+        return -1
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, store: ReviewStore, executor: ThreadPoolExecutor):
+        self.store = store
+        self.executor = executor
+
+    def write_json(self, payload: Any, status: int = 200) -> None:
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload, ensure_ascii=False))
+
+    def write_error(self, status_code: int, **kwargs: Any) -> None:
+        self.write_json({"error": self._reason}, status_code)
+
+    async def query(self, method: Callable[..., Any], *args: Any) -> Any:
+        # SQLite calls wait for the writes of the other workers, so they leave the IOLoop. They
+        # go to the default executor: the review executor may be full of running reviews
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+
+class HealthHandler(BaseHandler):
+    def get(self) -> None:
+        self.write_json({"status": "ok", "pid": os.getpid()})
+
+
+class ModelsHandler(BaseHandler):
+    def get(self) -> None:
+        from interfaces import AVAILABLE_MODELS
+
+        self.write_json({"models": list(AVAILABLE_MODELS)})
+
+
+class ReviewsHandler(BaseHandler):
+    async def post(self) -> None:
+        from interfaces.service import create_interface
+
+        try:
+            body = json.loads(self.request.body or b"{}")
+            interface = create_interface(
+                body.get("model"),
+                body.get("context", ""),
+                body.get("prompts"),
+                fused=body.get("fused", False),
+                previous_response=body.get("previous_response"),
+                previous_hashes=body.get("previous_hashes"),
+            )
+        except (ValueError, AttributeError) as error:
+            self.write_json({"error": str(error)}, 400)
+            return
+
+        review_id = uuid.uuid4().hex
+        await self.query(self.store.create, review_id, body["model"], interface)
+        self.executor.submit(run_review, self.store, review_id, interface)
+        self.set_header("Location", f"/reviews/{review_id}")
+        self.write_json({"id": review_id, "status": PENDING}, 202)
+
+
+class ReviewHandler(BaseHandler):
+    async def get(self, review_id: str) -> None:
+        snapshot = await self.query(self.store.snapshot, review_id)
+        if snapshot is None:
+            self.write_json({"error": "Review not found."}, 404)
+        else:
+            self.write_json(snapshot)
+
+
+class ReviewEventsHandler(BaseHandler):
+    async def get(self, review_id: str) -> None:
+        if await self.query(self.store.status, review_id) is None:
+            self.write_json({"error": "Review not found."}, 404)
+            return
+
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        # Reverse proxies must not buffer the stream
+        self.set_header("X-Accel-Buffering", "no")
+        # A reconnecting client resumes after the last event it received
+        position = last_event_id(self.request.headers.get("Last-Event-ID")) + 1
+        written_at = time.monotonic()
+        try:
+            while True:
+                # The status is read first: once finished, the events read after it are all
+                review = await self.query(self.store.status, review_id)
+                if review is None:
+                    # Evicted by another worker, there is nothing left to send
+                    return
+                status, error = review
+                events = await self.query(self.store.events_since, review_id, position)
+                for title, section, chunk in events:
+                    data = json.dumps({"evaluation": title, "section": section, "text": chunk})
+                    self.write(f"id: {position}\nevent: chunk\ndata: {data}\n\n")
+                    position += 1
+                if status in (DONE, FAILED):
+                    data = json.dumps({"status": status, "error": error})
+                    self.write(f"event: done\ndata: {data}\n\n")
+                    await self.flush()
+                    return
+                if events or time.monotonic() - written_at >= KEEP_ALIVE_INTERVAL:
+                    if not events:
+                        self.write(": keep-alive\n\n")
+                    await self.flush()
+                    written_at = time.monotonic()
+                await asyncio.sleep(EVENTS_POLL_INTERVAL)
+        except tornado.iostream.StreamClosedError:
+            # The client went away, the review itself goes on
+            return
+
+
+def make_app(store: ReviewStore, executor: ThreadPoolExecutor) -> tornado.web.Application:
+    options = {"store": store, "executor": executor}
+    return tornado.web.Application(
+        [
+            (r"/health", HealthHandler, options),
+            (r"/models", ModelsHandler, options),
+            (r"/reviews", ReviewsHandler, options),
+            (r"/reviews/([0-9a-f]+)", ReviewHandler, options),
+            (r"/reviews/([0-9a-f]+)/events", ReviewEventsHandler, options),
+        ]
+    )
+
+
+def share_rate_limits(workers: int) -> None:
+    # Every worker process gets its part of the OpenAI budgets, so together they stay within
+    # them. Backends are imported after the fork, so they read the adjusted values.
+    defaults = {
+        "GPT_RPM_LIMIT": "3500",
+        "GPT_TPM_LIMIT": "180000",
+        "GPT_INITIAL_IN_FLIGHT": "32",
+        "GPT_MAX_IN_FLIGHT": "256",
+    }
+    for name, default in defaults.items():
+        value = float(os.getenv(name, default)) / workers
+        os.environ[name] = str(max(1, int(value)) if "IN_FLIGHT" in name else value)
+
+
+async def serve(sockets: List[Any], database: str, review_workers: int, history: int) -> None:
+    store = ReviewStore(database, history)
+    executor = ThreadPoolExecutor(max_workers=review_workers, thread_name_prefix="review")
+    server = tornado.httpserver.HTTPServer(make_app(store, executor))
+    server.add_sockets(sockets)
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    load_environment()
+    parser = argparse.ArgumentParser(description="Serve revAIsor reviews over HTTP.")
+    parser.add_argument("--host", default=os.getenv("REVAISOR_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "-p", "--port", type=int, default=int(os.getenv("REVAISOR_SERVER_PORT", "8000"))
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=int(os.getenv("REVAISOR_SERVER_WORKERS", "0")),
+        help="Worker processes (0: one per CPU).",
+    )
+    parser.add_argument(
+        "--database",
+        default=os.getenv("REVAISOR_SERVER_DATABASE", ".cache/reviews.sqlite3"),
+        help="SQLite file with the reviews, shared by the workers.",
+    )
+    args = parser.parse_args()
+
+    review_workers = int(os.getenv("REVAISOR_JOB_WORKERS", "4"))
+    history = int(os.getenv("REVAISOR_JOB_HISTORY", "100"))
+    sockets = tornado.netutil.bind_sockets(args.port, args.host)
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1:
+        # The listening socket is shared, the kernel spreads the connections between workers
+        tornado.process.fork_processes(workers)
+    share_rate_limits(workers)
+    asyncio.run(serve(sockets, args.database, review_workers, history))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from typing import Iterator
+
+import pytest
+
+from benchmarks.mock_server import MockLLMServer, MockSettings
+
+
+@pytest.fixture(autouse=True)
+def no_persistent_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Tests never read or write the caches in the .cache directory of the checkout
+    monkeypatch.setenv("REVAISOR_CACHE_DISABLED", "1")
+
+
+@pytest.fixture
+def mock_server() -> Iterator[MockLLMServer]:
+    settings = MockSettings(latency=0.01, jitter=0, token_rate=100000, completion_tokens=16, seed=0)
+    server = MockLLMServer(settings).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+from interfaces.base import BaseInterface, Response
+
+
+class EchoInterface(BaseInterface):
+    # Answers every call with "<evaluation> of <text>", streamed word by word
+    def __init__(
+        self,
+        prompts: Dict[str, str],
+        fail_on: Optional[str] = None,
+        fused: bool = False,
+        previous_response: Optional[Response] = None,
+        previous_hashes: Optional[Dict[str, str]] = None,
+    ):
+        self.fail_on = fail_on
+        self.requests: List[Dict[str, Any]] = []
+        evaluations = [
+            {"title": "Theme", "method": self.evaluate_theme, "per_section": True},
+            {"title": "Cohesion", "method": self.evaluate_cohesion},
+        ]
+        super().__init__(
+            "context",
+            prompts,
+            "echo",
+            evaluations,
+            max_tokens=100,
+            use_cache=False,
+            fused=fused,
+            previous_response=previous_response,
+            previous_hashes=previous_hashes,
+        )
+
+    def validate_initialization(self) -> None:
+        pass
+
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        return "".join(self._stream_model(request))
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        self.requests.append(request)
+        if self.fail_on is not None and self.fail_on in request["prompt"]:
+            raise ValueError(f"Failed on {self.fail_on}.")
+        for word in request["prompt"].split():
+            yield word + " "
+
+    def evaluate_theme(self, prompt: str) -> str:
+        return self.call_model(f"Theme of {prompt}", temperature=0, max_tokens=100)
+
+    def evaluate_cohesion(self) -> str:
+        text = " ".join(self.prompts.values())
+        return self.call_model(f"Cohesion of {text}", temperature=0, max_tokens=100)
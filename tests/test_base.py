@@ -0,0 +1,125 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from interfaces.base import parse_fused_response
+from tests.fakes import EchoInterface
+
+PROMPTS = {"abstract": "first text", "introduction": "second text", "conclusion": "third text"}
+
+
+class CountingEcho(EchoInterface):
+    # Keeps the peak number of calls in flight over every review of the class
+    max_concurrency = 2
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(0.02)
+            yield from super()._stream_model(request)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+def test_max_concurrency_bounds_the_calls_of_every_review() -> None:
+    # Different texts, so no call is coalesced with another review's
+    def review(index: int) -> Dict[str, Any]:
+        prompts = {name: f"{text} {index}" for name, text in PROMPTS.items()}
+        return CountingEcho(prompts).get_response()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = list(executor.map(review, range(3)))
+
+    assert responses[2]["Cohesion"] == "Cohesion of first text 2 second text 2 third text 2 "
+    assert CountingEcho.peak == 2
+
+
+EVALUATIONS: List[Dict[str, Any]] = [{"title": "Theme", "per_section": True}, {"title": "Cohesion"}]
+SECTIONS = {"abstract": "first text", "conclusion": "second text"}
+FUSED = '{"Theme": {"abstract": "a", "conclusion": "c"}, "Cohesion": "ok"}'
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        FUSED,
+        f"Here is the review:\n```json\n{FUSED}\n```\nHope it helps!",
+        "{\n" + FUSED[1:-1] + ', "Grammar": {}\n}',
+    ],
+)
+def test_parse_fused_response_reads_the_outermost_object(text: str) -> None:
+    assert parse_fused_response(text, EVALUATIONS, SECTIONS) == {
+        "Theme": {"abstract": "a", "conclusion": "c"},
+        "Cohesion": "ok",
+    }
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"Theme": {"abstract": "a"}, "Cohesion": "ok"}',
+        '{"Theme": {"abstract": "a", "conclusion": ["c"]}, "Cohesion": "ok"}',
+        '{"Theme": {"abstract": "a", "conclusion": "c"}, "Cohesion": {"all": "ok"}}',
+        '{"Theme": "a", "Cohesion": "ok"}',
+        '["Theme", "Cohesion"]',
+        "The sections are cohesive.",
+        '{"Theme": {"abstract": "a", "conclusion": "c"}, "Cohesion": "ok"',
+    ],
+)
+def test_parse_fused_response_rejects_incomplete_answers(text: str) -> None:
+    assert parse_fused_response(text, EVALUATIONS, SECTIONS) is None
+
+
+class FusedEcho(EchoInterface):
+    # Answers the fused prompt with the given text, every other call with the echo
+    def __init__(self, prompts: Dict[str, str], answer: str):
+        super().__init__(prompts, fused=True)
+        self.answer = answer
+
+    def fused_prompt(self) -> Optional[Any]:
+        return "Fused review of " + " ".join(self.prompts.values())
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        if request["prompt"].startswith("Fused review"):
+            self.requests.append(request)
+            yield self.answer
+        else:
+            yield from super()._stream_model(request)
+
+
+def test_fused_review_answers_every_cell_with_one_call() -> None:
+    interface = FusedEcho(SECTIONS, FUSED)
+
+    assert interface.response == {"Theme": {"abstract": "a", "conclusion": "c"}, "Cohesion": "ok"}
+    assert len(interface.requests) == 1
+
+
+def test_unparseable_fused_answers_fall_back_to_one_call_per_cell() -> None:
+    interface = FusedEcho(SECTIONS, "Sorry, I can not answer in JSON.")
+
+    assert interface.response["Theme"] == {
+        "abstract": "Theme of first text ",
+        "conclusion": "Theme of second text ",
+    }
+    assert len(interface.requests) == 4
+
+
+def test_fused_prompts_over_half_the_window_fall_back_to_one_call_per_cell() -> None:
+    long = {name: text + " word" * 700 for name, text in SECTIONS.items()}
+    interface = FusedEcho(long, FUSED)
+    interface.context_window = 4000
+
+    assert str(interface.response["Cohesion"]).startswith("Cohesion of first text word")
+    # Only the per-cell calls were sent
+    assert all(not request["prompt"].startswith("Fused") for request in interface.requests)
+    assert len(interface.requests) == 3
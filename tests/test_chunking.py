@@ -0,0 +1,53 @@
+import pytest
+
+from interfaces.chunking import count_tokens, max_output_tokens, merge_suggestions, split_text
+
+
+def test_split_text_keeps_chunks_within_budget() -> None:
+    text = "\n\n".join(f"Paragraph {index}. " + "word " * 40 for index in range(10))
+
+    chunks = split_text(text, budget=50)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_split_text_returns_short_text_as_is() -> None:
+    assert split_text("A short section.", budget=100) == ["A short section."]
+
+
+def test_merge_suggestions_merges_lines_under_their_header() -> None:
+    first = "Grammar:\n- Fix the typo in line 1.\n- Use the active voice.\n\nStyle:\n- Be concise."
+    second = "Grammar:\n- use the active voice.\n- Fix the typo in line 9.\n\nStyle:\n- Be concise."
+
+    assert merge_suggestions([first, second]) == (
+        "Grammar:\n- Fix the typo in line 1.\n- Use the active voice.\n- Fix the typo in line 9."
+        "\n\nStyle:\n- Be concise."
+    )
+
+
+def test_merge_suggestions_only_dedupes_within_the_same_header() -> None:
+    first = "## Theme\n- Add more references."
+    second = "## Cohesion\n- Add more references.\n\n## Theme\n- Define the acronyms."
+
+    assert merge_suggestions([first, second]) == (
+        "## Theme\n- Add more references.\n- Define the acronyms."
+        "\n\n## Cohesion\n- Add more references."
+    )
+
+
+def test_merge_suggestions_does_not_take_list_items_for_headers() -> None:
+    first = "- Consider the following:\n- Shorter sentences."
+    second = "- Consider the following:\n- Fewer acronyms."
+
+    assert merge_suggestions([first, second]) == (
+        "- Consider the following:\n- Shorter sentences.\n- Fewer acronyms."
+    )
+
+
+def test_max_output_tokens_fails_when_nothing_is_left_of_the_window() -> None:
+    assert max_output_tokens("word " * 100, None, window=1000, limit=10000) == 1000 - 167 - 64
+    assert max_output_tokens("word", None, window=1000, limit=10) == 10
+    with pytest.raises(ValueError, match="1000-token context window"):
+        max_output_tokens("word " * 3000, None, window=1000, limit=10)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from interfaces.base import AsyncBaseInterface, BaseInterface
+from interfaces.coalescing import IN_FLIGHT
+
+
+class SlowInterface(BaseInterface):
+    def __init__(self, release: threading.Event, calls: List[str]):
+        self.release = release
+        self.calls = calls
+        super().__init__("context", {"abstract": "text"}, "model", [], use_cache=False)
+
+    def validate_initialization(self) -> None:
+        pass
+
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        self.calls.append(request["prompt"])
+        self.release.wait(5)
+        return "response"
+
+
+class AsyncSlowInterface(AsyncBaseInterface):
+    def __init__(self, release: asyncio.Event, calls: List[str]):
+        self.release = release
+        self.calls = calls
+        super().__init__("context", {"abstract": "text"}, "model", [], use_cache=False)
+
+    async def validate_initialization(self) -> None:
+        pass
+
+    async def _call_model(self, request: Dict[str, Any]) -> str:
+        self.calls.append(request["prompt"])
+        await self.release.wait()
+        return "response"
+
+
+def test_identical_calls_share_one_request() -> None:
+    release = threading.Event()
+    calls: List[str] = []
+    interfaces = [SlowInterface(release, calls) for _ in range(3)]
+    results: List[str] = []
+    threads = [
+        threading.Thread(
+            target=lambda i=i: results.append(i.call_model("same prompt", 0, 100, stream=False))
+        )
+        for i in interfaces
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and sum(f.waiters for f in IN_FLIGHT._flights.values()) < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["response"] * 3
+    assert calls == ["same prompt"]
+    assert sorted(record.coalesced for i in interfaces for record in i.records) == [
+        False,
+        True,
+        True,
+    ]
+
+
+def test_cancelled_leader_does_not_fail_the_followers() -> None:
+    async def main() -> None:
+        release = asyncio.Event()
+        calls: List[str] = []
+        leader = AsyncSlowInterface(release, calls)
+        follower = AsyncSlowInterface(release, calls)
+
+        leading = asyncio.create_task(leader.call_model("same prompt", 0, 100))
+        await asyncio.sleep(0.01)
+        following = asyncio.create_task(follower.call_model("same prompt", 0, 100))
+        await asyncio.sleep(0.01)
+
+        leading.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leading
+        release.set()
+
+        assert await following == "response"
+        assert calls == ["same prompt"]
+        assert follower.records[0].coalesced and follower.records[0].error is None
+
+    asyncio.run(main())
+
+
+def test_call_is_cancelled_when_every_waiter_left() -> None:
+    async def main() -> None:
+        release = asyncio.Event()
+        calls: List[str] = []
+        interfaces = [AsyncSlowInterface(release, calls) for _ in range(2)]
+        tasks = [asyncio.create_task(i.call_model("same prompt", 0, 100)) for i in interfaces]
+        await asyncio.sleep(0.01)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert not IN_FLIGHT._flights
+
+        # A later call starts over instead of waiting for the cancelled one
+        release.set()
+        assert await interfaces[0].call_model("same prompt", 0, 100) == "response"
+        assert calls == ["same prompt", "same prompt"]
+
+    asyncio.run(main())
+
+
+def test_waiters_in_other_loops_take_over_an_abandoned_call() -> None:
+    calls: List[str] = []
+    started, results = threading.Event(), []
+
+    async def lead() -> None:
+        release = asyncio.Event()
+        task = asyncio.create_task(AsyncSlowInterface(release, calls).call_model("prompt", 0, 100))
+        await asyncio.sleep(0.01)
+        started.set()
+        await asyncio.sleep(0.05)
+        # The review gives up: asyncio.run cancels its calls on the way out
+        task.cancel()
+
+    async def follow() -> None:
+        release = asyncio.Event()
+        release.set()
+        results.append(await AsyncSlowInterface(release, calls).call_model("prompt", 0, 100))
+
+    leader = threading.Thread(target=lambda: asyncio.run(lead()))
+    leader.start()
+    started.wait(5)
+    asyncio.run(follow())
+    leader.join(5)
+
+    assert results == ["response"]
+    assert calls == ["prompt", "prompt"]
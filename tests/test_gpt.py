@@ -0,0 +1,46 @@
+from typing import Any, Dict, Iterator, List
+
+from interfaces.gpt.interface import GPTInterface
+
+SHORT = {"abstract": "A method.", "introduction": "Reviews are slow.", "conclusion": "It works."}
+
+
+class FakeGPT(GPTInterface):
+    # Answers every call with the same sentence, without the API
+    def __init__(self, prompts: Dict[str, str], context_window: int):
+        super().__init__("context", prompts, use_cache=False)
+        self.context_window = context_window
+        self.requests: List[Dict[str, Any]] = []
+
+    def validate_initialization(self) -> None:
+        pass
+
+    def _call_model(self, request: Dict[str, Any]) -> str:
+        self.requests.append(request)
+        return "A short answer."
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        yield self._call_model(request)
+
+
+def test_cohesion_reads_the_sections_together_when_they_fit() -> None:
+    interface = FakeGPT(SHORT, context_window=16384)
+
+    interface.evaluate_cohesion()
+
+    assert len(interface.requests) == 1
+    assert "Conclusion:It works." in interface.requests[0]["prompt"][-1]["content"]
+
+
+def test_cohesion_compares_summaries_of_long_sections() -> None:
+    long = {name: f"{text} " + "More details. " * 400 for name, text in SHORT.items()}
+    interface = FakeGPT(long, context_window=2000)
+
+    interface.evaluate_cohesion()
+
+    *summaries, cohesion = interface.requests
+    assert len(summaries) > 3
+    assert all("Summarize" in request["prompt"][-1]["content"] for request in summaries)
+    content = cohesion["prompt"][-1]["content"]
+    assert "Conclusion:A short answer." in content
+    assert cohesion["max_tokens"] > 1000
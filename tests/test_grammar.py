@@ -0,0 +1,122 @@
+from typing import List
+
+import pytest
+
+from interfaces import grammar
+from interfaces.chunking import count_tokens
+from interfaces.grammar import GrammarCheck, check_sentence, split_sentences, with_hints
+from tests.fakes import EchoInterface
+
+
+def test_sentences_are_not_split_at_abbreviations() -> None:
+    text = "Smith et al. 2020 proposed it. It works (see Fig. 2). Does it scale?"
+
+    assert split_sentences(text) == [
+        "Smith et al. 2020 proposed it.",
+        "It works (see Fig. 2).",
+        "Does it scale?",
+    ]
+
+
+@pytest.mark.parametrize(
+    "sentence, message",
+    [
+        ("We saw the the results.", 'Repeated word "the".'),
+        ("The model have converge to an wrong value.", 'Check the article in "an wrong".'),
+        ("It have converged.", 'Subject and verb do not agree in "It have".'),
+        ("They was right.", 'Subject and verb do not agree in "They was".'),
+        ("We could of known.", 'Use "have" in "could of".'),
+        ("It works (mostly.", 'Unbalanced "()".'),
+    ],
+)
+def test_checks_flag_common_errors(sentence: str, message: str) -> None:
+    assert message in check_sentence(sentence)
+
+
+@pytest.mark.parametrize(
+    "sentence",
+    [
+        "Does it have an effect?",
+        "We want this to have a unique and an unimportant part.",
+        "An hour is a one-off use of a university server.",
+        "He had had enough, and that that is true.",
+    ],
+)
+def test_checks_accept_correct_sentences(sentence: str) -> None:
+    assert check_sentence(sentence) == []
+
+
+def test_hints_follow_the_whole_text() -> None:
+    prompts: List[str] = []
+
+    def build_prompt(text: str) -> str:
+        prompts.append(text)
+        return text
+
+    build = with_hints(build_prompt)
+    text = "This is fine. We saw the the results."
+
+    build(text)
+    build("Nothing to flag here.")
+
+    assert prompts[0].startswith(text + "\n\n" + grammar.HINTS_HEADER)
+    assert 'Repeated word "the".' in prompts[0]
+    assert prompts[1] == "Nothing to flag here."
+    assert GrammarCheck("Nothing to flag here.").hints() == ""
+
+
+class GrammarEchoInterface(EchoInterface):
+    def evaluate_theme(self, prompt: str) -> str:
+        return self.evaluate_grammar(prompt, lambda chunk: f"Grammar of {chunk}", temperature=0)
+
+
+def test_clean_sections_are_answered_without_a_call() -> None:
+    clean = "A clean sentence. Another clean sentence."
+    flagged = "A clean sentence. We saw the the results."
+    interface = GrammarEchoInterface({"abstract": clean, "conclusion": flagged})
+
+    response = interface.response
+
+    prompts = [request["prompt"] for request in interface.requests]
+    assert [prompt for prompt in prompts if prompt.startswith("Grammar")] == [
+        f"Grammar of {flagged}\n\n{GrammarCheck(flagged).hints()}"
+    ]
+    assert response["Theme"] == {
+        "abstract": grammar.NO_FINDINGS,
+        # The echo model answers with the words of its prompt, hints included
+        "conclusion": " ".join(f"Grammar of {flagged}\n\n{GrammarCheck(flagged).hints()}".split())
+        + " ",
+    }
+
+
+def test_clean_sections_are_sent_when_skipping_is_off(monkeypatch) -> None:
+    monkeypatch.setattr(grammar, "SKIP_CLEAN", False)
+    clean = "A clean sentence. Another clean sentence."
+    interface = GrammarEchoInterface({"abstract": clean})
+
+    assert interface.response["Theme"] == {"abstract": f"Grammar of {clean} "}
+
+
+def test_hints_are_capped_to_their_budget() -> None:
+    check = GrammarCheck(" ".join(f"We saw the the result {index}." for index in range(50)))
+
+    capped = check.hints(max_tokens=100)
+
+    assert capped.startswith(grammar.HINTS_HEADER)
+    assert 1 < len(capped.splitlines()) < len(check.findings)
+    assert count_tokens("\n\n" + capped) <= 100
+    assert check.hints(max_tokens=10) == ""
+
+
+def test_chunks_leave_room_for_their_hints() -> None:
+    text = " ".join(f"We saw the the result {index}." for index in range(100))
+    interface = GrammarEchoInterface({"abstract": text})
+    interface.context_window = 2000
+
+    interface.get_response()
+
+    chunks = [request for request in interface.requests if request["prompt"].startswith("Grammar")]
+    assert len(chunks) > 1
+    for request in chunks:
+        assert 'Repeated word "the".' in request["prompt"]
+        assert count_tokens(request["prompt"]) + request["max_tokens"] <= 2000
@@ -0,0 +1,93 @@
+from typing import Dict, Optional, Tuple
+
+from interfaces.base import section_hashes
+from interfaces.results import CARRIED, MISS
+from tests.fakes import EchoInterface
+
+PROMPTS = {"abstract": "first text", "conclusion": "second text"}
+
+
+def first_review() -> EchoInterface:
+    interface = EchoInterface(PROMPTS)
+    assert interface.response
+    return interface
+
+
+def test_unchanged_cells_are_carried_over() -> None:
+    first = first_review()
+    second = EchoInterface(
+        PROMPTS, previous_response=first.response, previous_hashes=first.section_hashes
+    )
+
+    assert second.response == first.response
+    assert second.requests == []
+    assert {cell.cache_status for cell in second.get_result()} == {CARRIED}
+
+
+def test_cohesion_reruns_when_any_section_changes() -> None:
+    first = first_review()
+    edited = {**PROMPTS, "conclusion": "edited text"}
+    second = EchoInterface(
+        edited, previous_response=first.response, previous_hashes=first.section_hashes
+    )
+
+    assert set(second.carried_over) == {("Theme", "abstract")}
+    assert second.response == {
+        "Theme": {"abstract": "Theme of first text ", "conclusion": "Theme of edited text "},
+        "Cohesion": "Cohesion of first text edited text ",
+    }
+    assert [request["prompt"] for request in second.requests] == [
+        "Theme of edited text",
+        "Cohesion of first text edited text",
+    ]
+    result = second.get_result()
+    theme, cohesion = result.get("Theme", "abstract"), result.get("Cohesion")
+    assert theme is not None and theme.cache_status == CARRIED
+    assert cohesion is not None and cohesion.cache_status == MISS
+
+
+def test_removed_sections_rerun_cohesion() -> None:
+    first = first_review()
+    second = EchoInterface(
+        {"abstract": "first text"},
+        previous_response=first.response,
+        previous_hashes=first.section_hashes,
+    )
+
+    assert set(second.carried_over) == {("Theme", "abstract")}
+
+
+def test_context_or_backend_changes_invalidate_every_cell() -> None:
+    first = first_review()
+    other_context = section_hashes("EchoInterface", "echo", "other context", PROMPTS)
+    other_backend = section_hashes("GPTInterface", "echo", "context", PROMPTS)
+    other_model = section_hashes("EchoInterface", "gpt-4", "context", PROMPTS)
+
+    assert first.section_hashes == section_hashes("EchoInterface", "echo", "context", PROMPTS)
+    for previous_hashes in (other_context, other_backend, other_model):
+        second = EchoInterface(
+            PROMPTS, previous_response=first.response, previous_hashes=previous_hashes
+        )
+        assert second.carried_over == {}
+
+
+def test_stream_response_emits_the_carried_cells() -> None:
+    first = first_review()
+    edited = {**PROMPTS, "abstract": "edited text"}
+    second = EchoInterface(
+        edited, previous_response=first.response, previous_hashes=first.section_hashes
+    )
+
+    streamed: Dict[Tuple[str, Optional[str]], str] = {}
+    for title, section, chunk in second.stream_response():
+        streamed[(title, section)] = streamed.get((title, section), "") + chunk
+
+    assert streamed == {
+        ("Theme", "abstract"): "Theme of edited text ",
+        ("Theme", "conclusion"): "Theme of second text ",
+        ("Cohesion", None): "Cohesion of edited text second text ",
+    }
+    assert second.response["Theme"] == {
+        "abstract": "Theme of edited text ",
+        "conclusion": "Theme of second text ",
+    }
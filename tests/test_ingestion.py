@@ -0,0 +1,91 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from batch import read_articles, read_checkpoint, review_article
+from utils.ingestion import extract_sections, extract_sections_from_data
+
+LATEX = r"""
+\documentclass{article}
+\begin{document}
+\begin{abstract}
+We propose a method. % a comment
+\end{abstract}
+\section{Introduction}
+Reviews take time~\cite{smith}.
+\section{Method}
+Details.
+\section{Conclusion}
+It works \emph{well}.
+\bibliography{refs}
+\end{document}
+"""
+
+
+class DictCache:
+    def __init__(self) -> None:
+        self.entries: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.entries[key] = value
+
+
+def test_latex_sections_are_extracted() -> None:
+    sections = extract_sections_from_data("paper.tex", LATEX.encode("utf-8"))
+
+    assert sections == {
+        "abstract": "We propose a method.",
+        "introduction": "Reviews take time.",
+        "conclusion": "It works well.",
+    }
+
+
+def test_sections_are_kept_in_the_given_cache() -> None:
+    cache = DictCache()
+    data = (LATEX + "% another file").encode("utf-8")
+
+    sections = extract_sections_from_data("paper.tex", data, cache=cache)
+
+    assert [json.loads(value) for value in cache.entries.values()] == [sections]
+
+
+def test_unreadable_articles_are_reported_without_stopping_the_batch(tmp_path: Path) -> None:
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    (tmp_path / "paper.tex").write_text(LATEX, encoding="utf-8")
+    (tmp_path / "bad.json").write_text("{", encoding="utf-8")
+
+    articles = {article["id"]: article for article in read_articles(str(tmp_path))}
+
+    assert set(articles) == {"bad", "broken", "paper"}
+    assert "error" in articles["bad"] and "error" in articles["broken"]
+    assert articles["paper"]["conclusion"] == "It works well."
+    assert extract_sections(str(tmp_path / "paper.tex")) == {
+        section: articles["paper"][section]
+        for section in ("abstract", "introduction", "conclusion")
+    }
+
+
+def test_malformed_jsonl_lines_are_reported_without_stopping_the_batch(tmp_path: Path) -> None:
+    path = tmp_path / "articles.jsonl"
+    path.write_text('[1, 2]\n{\n\n{"abstract": "text"}\n', encoding="utf-8")
+
+    articles = list(read_articles(str(path)))
+
+    assert [article["id"] for article in articles] == ["1", "2", "4"]
+    assert "error" in articles[0] and "error" in articles[1]
+    assert articles[2] == {"id": "4", "abstract": "text"}
+
+
+def test_failed_articles_are_retried_on_resume(tmp_path: Path) -> None:
+    output = tmp_path / "reviews.jsonl"
+    article = {"id": "broken", "error": "ValueError('Not a PDF')"}
+
+    result = asyncio.run(review_article(article, "GPT-3.5", asyncio.Semaphore(1), retries=0))
+    output.write_text(json.dumps(result) + "\n" + json.dumps({"id": "ok", "model": "GPT-3.5"}))
+
+    assert result == {"id": "broken", "model": "GPT-3.5", "error": "ValueError('Not a PDF')"}
+    assert read_checkpoint(str(output), "GPT-3.5") == {"ok"}
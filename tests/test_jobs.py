@@ -0,0 +1,54 @@
+from interfaces.jobs import DONE, FAILED, Job, JobQueue
+from tests.fakes import EchoInterface
+
+PROMPTS = {"abstract": "first text", "conclusion": "second text"}
+
+
+def test_job_streams_every_cell_and_keeps_the_result() -> None:
+    job = Job(EchoInterface(PROMPTS))
+
+    job.run()
+
+    assert job.status == DONE
+    assert job.cells == [("Theme", "abstract"), ("Theme", "conclusion"), ("Cohesion", None)]
+    assert job.partial[("Theme", "abstract")] == "Theme of first text "
+    assert job.response == {
+        "Theme": {"abstract": "Theme of first text ", "conclusion": "Theme of second text "},
+        "Cohesion": "Cohesion of first text second text ",
+    }
+    # Replaying the events rebuilds every cell
+    replayed = {cell: "" for cell in job.cells}
+    for title, section, chunk in job.stream():
+        replayed[(title, section)] += chunk
+    assert replayed == job.partial
+    assert list(job.stream(start=len(job.events))) == []
+    # The interface is dropped once the job is over, running it again does nothing
+    job.run()
+    assert job.status == DONE
+
+
+def test_failed_job_reports_the_error() -> None:
+    job = Job(EchoInterface(PROMPTS, fail_on="second"))
+
+    job.run()
+
+    snapshot = job.snapshot()
+    assert snapshot["status"] == FAILED
+    assert snapshot["error"] == "Failed on second."
+    assert snapshot["response"] is None
+
+
+def test_queue_runs_jobs_and_evicts_only_finished_ones() -> None:
+    queue = JobQueue(workers=2, history=2)
+    try:
+        job_ids = [queue.submit(EchoInterface(PROMPTS)) for _ in range(4)]
+        for job_id in job_ids:
+            job = queue.get(job_id)
+            if job is not None:
+                assert job.wait(5)
+        queue.submit(EchoInterface(PROMPTS))
+
+        assert queue.get(job_ids[0]) is None
+        assert queue.get(job_ids[-1]) is not None
+    finally:
+        queue.shutdown()
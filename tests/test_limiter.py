@@ -0,0 +1,106 @@
+import asyncio
+import email.utils
+import time
+
+import openai
+import pytest
+
+from interfaces import metrics
+from interfaces.gpt.limiter import RateLimiter, TokenBucket, retry_after
+
+
+def rate_limited(retry: str = "0") -> openai.error.RateLimitError:
+    return openai.error.RateLimitError("Rate limit reached", headers={"retry-after": retry})
+
+
+def test_token_bucket_waits_for_the_missing_tokens() -> None:
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60, now=bucket.updated)
+
+    assert bucket.wait_time(1, now=bucket.updated) == pytest.approx(1)
+    assert bucket.wait_time(1, now=bucket.updated + 1) == 0
+    # A request larger than the bucket only waits for a full bucket
+    assert bucket.wait_time(600, now=bucket.updated) == pytest.approx(59)
+
+
+def test_retry_after_reads_the_header() -> None:
+    assert retry_after(rate_limited("2.5")) == 2.5
+    assert retry_after(rate_limited("soon")) is None
+    assert retry_after(ValueError()) is None
+    # HTTP dates are read too, a date in the past means no wait
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(rate_limited(later)) == pytest.approx(30, abs=2)
+    assert retry_after(rate_limited("Wed, 21 Oct 2015 07:28:00 GMT")) == 0
+
+
+def test_burst_of_rate_limits_halves_the_limit_once() -> None:
+    limiter = RateLimiter(0, 0, initial_in_flight=8, max_in_flight=8, backoff=0)
+    started = [limiter.acquire(1) for _ in range(4)]
+
+    for start in started:
+        limiter.release(rate_limited=True, retry_after=0, started=start)
+
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_successful_calls_raise_the_limit_additively() -> None:
+    limiter = RateLimiter(0, 0, initial_in_flight=2, max_in_flight=3)
+    for _ in range(4):
+        limiter.acquire(1)
+        limiter.release()
+
+    assert limiter.limit == 3
+
+
+def test_call_retries_rate_limited_requests() -> None:
+    limiter = RateLimiter(0, 0, initial_in_flight=4, max_in_flight=4, backoff=0)
+    errors = [rate_limited(), rate_limited()]
+
+    def request() -> str:
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    record = metrics.CallRecord("GPTInterface", "gpt-3.5-turbo")
+    token = metrics.current_call.set(record)
+    try:
+        assert limiter.call(1, request) == "ok"
+    finally:
+        metrics.current_call.reset(token)
+
+    assert record.retries == 2
+    assert limiter.in_flight == 0
+    # Halved by each rate limit (4, 2, 1), then raised by the successful call
+    assert limiter.limit == 2
+
+
+def test_call_does_not_retry_other_errors() -> None:
+    limiter = RateLimiter(0, 0, initial_in_flight=4, max_in_flight=4)
+    calls = []
+
+    def request() -> str:
+        calls.append(1)
+        raise openai.error.InvalidRequestError("Bad request", param=None)
+
+    with pytest.raises(openai.error.InvalidRequestError):
+        limiter.call(1, request)
+    assert len(calls) == 1
+    assert limiter.in_flight == 0
+
+
+def test_acall_waits_for_a_free_slot() -> None:
+    limiter = RateLimiter(0, 0, initial_in_flight=1, max_in_flight=1)
+    running = []
+
+    async def request() -> int:
+        running.append(limiter.in_flight)
+        await asyncio.sleep(0.01)
+        return limiter.in_flight
+
+    async def main() -> list:
+        return await asyncio.gather(*(limiter.acall(1, request) for _ in range(3)))
+
+    assert asyncio.run(main()) == [1, 1, 1]
+    assert running == [1, 1, 1]
+    assert limiter.in_flight == 0
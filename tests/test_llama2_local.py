@@ -0,0 +1,24 @@
+import pytest
+
+from interfaces import AVAILABLE_MODELS
+from interfaces.llama2 import local
+from interfaces.llama2.local import CONTEXT_WINDOW, LocalLLAMA2Interface
+
+
+def test_context_window_matches_the_model_context() -> None:
+    interface = LocalLLAMA2Interface("context", {"abstract": "text"}, use_cache=False)
+
+    assert interface.context_window == CONTEXT_WINDOW
+
+
+def test_missing_llama_cpp_is_reported(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(local, "Llama", None)
+    monkeypatch.setattr(local, "_model", None)
+    interface = LocalLLAMA2Interface("context", {"abstract": "text"}, use_cache=False)
+
+    with pytest.raises(ValueError, match="llama-cpp-python is not installed"):
+        interface.validate_initialization()
+
+
+def test_local_model_is_only_offered_with_llama_cpp() -> None:
+    assert ("LLAMA2 (local)" in AVAILABLE_MODELS) == (local.Llama is not None)
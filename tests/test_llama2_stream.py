@@ -0,0 +1,13 @@
+from benchmarks.mock_server import MockLLMServer
+from interfaces.llama2.interface import LLAMA2Interface
+
+
+def test_stream_decodes_utf8_tokens(mock_server: MockLLMServer, monkeypatch) -> None:
+    monkeypatch.setattr(
+        "benchmarks.mock_server.generate_tokens", lambda count: iter(["revisão ", "ótima"])
+    )
+    monkeypatch.setenv("LLAMA2_API_URL", mock_server.url)
+    interface = LLAMA2Interface("context", {"abstract": "text"}, use_cache=False)
+    request = {"prompt": "p", "temperature": 0, "max_tokens": 4, "top_p": 0.5}
+
+    assert "".join(interface._stream_model(request)) == "revisão ótima"
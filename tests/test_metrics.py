@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from interfaces import metrics
+
+
+def test_in_context_carries_the_evaluation_into_worker_threads() -> None:
+    token = metrics.current_evaluation.set(("Theme", "abstract"))
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            bound = executor.submit(metrics.in_context(metrics.current_evaluation.get))
+            unbound = executor.submit(metrics.current_evaluation.get)
+            assert bound.result() == ("Theme", "abstract")
+            assert unbound.result() == (None, None)
+    finally:
+        metrics.current_evaluation.reset(token)
+
+
+def test_records_are_attributed_to_the_current_evaluation() -> None:
+    token = metrics.current_evaluation.set(("Grammar", "introduction"))
+    try:
+        record = metrics.CallRecord("GPTInterface", "gpt-3.5-turbo")
+    finally:
+        metrics.current_evaluation.reset(token)
+    record.prompt_tokens, record.completion_tokens = 1000, 500
+    record.finish()
+
+    assert (record.evaluation, record.section) == ("Grammar", "introduction")
+    assert record.cost == 0.0015 + 0.001
+    assert record.wall_time is not None and record.time_to_first_token == record.wall_time
@@ -0,0 +1,56 @@
+import requests
+
+from benchmarks.mock_server import MockLLMServer
+
+
+def generate_payload(max_tokens: int = 100) -> dict:
+    return {"inputs": "Review this.", "parameters": {"max_tokens": max_tokens}}
+
+
+def test_generate_respects_max_tokens(mock_server: MockLLMServer) -> None:
+    response = requests.post(mock_server.url + "/generate", json=generate_payload(4), timeout=5)
+
+    assert response.status_code == 200
+    assert response.json()["generated_text"] == "word " * 4
+    assert mock_server.reset_counts() == {"POST /generate": 1}
+
+
+def test_chat_completion_reports_usage(mock_server: MockLLMServer) -> None:
+    body = {"messages": [{"role": "user", "content": "x" * 40}], "max_tokens": 8}
+    response = requests.post(mock_server.url + "/v1/chat/completions", json=body, timeout=5)
+
+    assert response.json()["usage"] == {
+        "prompt_tokens": 10,
+        "completion_tokens": 8,
+        "total_tokens": 18,
+    }
+
+
+def test_stream_generate_sends_one_event_per_token(mock_server: MockLLMServer) -> None:
+    with requests.post(
+        mock_server.url + "/generate_stream", json=generate_payload(3), stream=True, timeout=5
+    ) as response:
+        events = [line for line in response.iter_lines() if line]
+
+    assert len(events) == 3
+
+
+def test_injected_errors(mock_server: MockLLMServer) -> None:
+    mock_server.settings.error_rate = 1
+    response = requests.post(mock_server.url + "/generate", json=generate_payload(), timeout=5)
+
+    assert response.status_code == 503
+    assert mock_server.reset_counts()["errors"] == 1
+
+
+def test_rate_limit(mock_server: MockLLMServer) -> None:
+    mock_server.settings.requests_per_second = 1
+    statuses = [
+        requests.post(
+            mock_server.url + "/generate", json=generate_payload(1), timeout=5
+        ).status_code
+        for _ in range(3)
+    ]
+
+    assert statuses.count(429) >= 1
+    assert mock_server.reset_counts()["rate_limited"] == statuses.count(429)
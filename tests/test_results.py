@@ -0,0 +1,80 @@
+from typing import Dict, Optional, Union
+
+import pytest
+
+from interfaces import metrics
+from interfaces.results import CARRIED, HIT, MISS, PARTIAL, ReviewResult
+from tests.fakes import EchoInterface
+
+RESPONSE: Dict[str, Union[Dict[str, str], str]] = {
+    "Theme": {"abstract": "a", "conclusion": "b"},
+    "Cohesion": "c",
+}
+
+
+def record(
+    evaluation: Optional[str], section: Optional[str], tokens: int = 10, cache_hit: bool = False
+) -> metrics.CallRecord:
+    token = metrics.current_evaluation.set((evaluation, section))
+    try:
+        call = metrics.CallRecord("GPTInterface", "gpt-3.5-turbo")
+    finally:
+        metrics.current_evaluation.reset(token)
+    call.prompt_tokens, call.completion_tokens = tokens, tokens
+    call.cache_hit = cache_hit
+    call.finish()
+    return call
+
+
+def test_records_are_attributed_to_their_cell() -> None:
+    records = [
+        record("Theme", "abstract"),
+        record("Theme", "abstract", cache_hit=True),
+        record("Theme", "conclusion", cache_hit=True),
+    ]
+
+    result = ReviewResult.build("GPTInterface", "gpt-3.5-turbo", RESPONSE, records)
+
+    abstract, conclusion, cohesion = result
+    assert (abstract.calls, abstract.prompt_tokens, abstract.cache_status) == (2, 20, PARTIAL)
+    assert (conclusion.calls, conclusion.cache_status) == (1, HIT)
+    assert (cohesion.calls, cohesion.prompt_tokens, cohesion.cache_status) == (0, None, MISS)
+
+
+def test_fused_call_is_counted_once() -> None:
+    fused = record(None, None, tokens=30)
+
+    result = ReviewResult.build("GPTInterface", "gpt-3.5-turbo", RESPONSE, [fused])
+
+    assert sum(cell.calls for cell in result) == 1
+    assert sum(cell.prompt_tokens or 0 for cell in result) == 30
+    assert all(cell.wall_time == pytest.approx(fused.wall_time, abs=1e-3) for cell in result)
+    assert {cell.cache_status for cell in result} == {MISS}
+
+
+def test_carried_cells_and_round_trip() -> None:
+    result = ReviewResult.build(
+        "GPTInterface",
+        "gpt-3.5-turbo",
+        RESPONSE,
+        [record("Cohesion", None)],
+        carried_over={("Theme", "abstract"): "a"},
+        section_hashes={"abstract": "hash"},
+    )
+
+    loaded = ReviewResult.from_json(result.to_json())
+
+    assert loaded.to_response() == RESPONSE
+    assert loaded.section_hashes == {"abstract": "hash"}
+    carried = loaded.get("Theme", "abstract")
+    assert carried is not None and carried.cache_status == CARRIED
+    assert [cell.as_dict() for cell in loaded] == [cell.as_dict() for cell in result]
+
+
+def test_interface_result_matches_its_response() -> None:
+    interface = EchoInterface({"abstract": "first text"})
+
+    result = interface.get_result()
+
+    assert result.to_response() == interface.response
+    assert [cell.calls for cell in result] == [1, 1]
@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pytest
+
+from interfaces import routing
+from interfaces.routing import RoutingInterface, RoutingStats
+from tests.fakes import EchoInterface
+
+PROMPTS = {"abstract": "short abstract"}
+
+
+class RoutedEcho(EchoInterface):
+    # An echo backend that fails, or waits for delay seconds (for ever without a delay) first
+    def __init__(self, model: str, delay: Optional[float] = 0, fail: bool = False):
+        super().__init__(PROMPTS)
+        # Calls to another model are never coalesced with these
+        self.model = model
+        self.delay = delay
+        self.fail = fail
+        self.released = threading.Event()
+
+    def _stream_model(self, request: Dict[str, Any]) -> Iterator[str]:
+        if self.fail:
+            raise ValueError("Backend is down.")
+        self.released.wait(self.delay)
+        yield from super()._stream_model(request)
+
+    def evaluate_prompt_by_theme(self, prompt: str) -> str:
+        return self.evaluate_theme(prompt)
+
+    def evaluate_prompt_by_grammar(self, prompt: str) -> str:
+        return self.call_model(f"Grammar of {prompt}", temperature=0, max_tokens=100)
+
+    def evaluate_prompt_by_cohesion(self) -> str:
+        return self.evaluate_cohesion()
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(routing, "HEDGE_DELAY", 0.05)
+    monkeypatch.setattr(routing, "MIN_HEDGE_DELAY", 0.05)
+    routing.STATS.clear()
+    yield routing.STATS
+    routing.STATS.clear()
+
+
+def review(**backends: RoutedEcho) -> RoutingInterface:
+    interface = RoutingInterface("context", PROMPTS, use_cache=False)
+    interface.backends = dict(backends)
+    assert interface.response
+    return interface
+
+
+def test_unmeasured_backends_rank_after_faster_measured_ones():
+    stats = RoutingStats()
+    for _ in range(3):
+        stats.record("fast", True, ("fast", "Theme", False), 0.01)
+        stats.record("slow", True, ("slow", "Theme", False), 1.0)
+
+    assert stats.rank(["slow", "new", "fast"], "Theme", False) == ["fast", "new", "slow"]
+
+
+def test_failed_backends_are_failed_over(stats):
+    down, up = RoutedEcho("down", fail=True), RoutedEcho("up")
+    interface = review(down=down, up=up)
+
+    assert interface.response["Cohesion"] == "Cohesion of short abstract "
+    assert interface.get_result().get("Theme", "abstract").calls == 1
+    assert stats.error_rate("down") == 1
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_hung_backends_time_out_and_rank_last(stats, monkeypatch):
+    monkeypatch.setattr(routing, "ATTEMPT_TIMEOUT", 0.3)
+    hung, up = RoutedEcho("hung", delay=None), RoutedEcho("up")
+    try:
+        interface = review(hung=hung, up=up)
+        assert interface.response["Theme"] == {"abstract": "Theme of short abstract "}
+
+        # Every hung attempt counted as a failure once it timed out, not when it lost the race
+        assert stats.healthy("hung")
+        wait_for(lambda: not stats.healthy("hung"))
+        latencies = stats.latencies(("hung", "Theme", False))
+        assert latencies and min(latencies) >= 0.3
+        assert stats.rank(["hung", "up"], "Theme", False) == ["up", "hung"]
+
+        # From then on, the hung backend only gets evaluations the others failed
+        requests = len(hung.requests)
+        start = time.perf_counter()
+        review(hung=hung, up=up)
+        assert len(hung.requests) == requests
+        assert time.perf_counter() - start < 0.05
+    finally:
+        hung.released.set()
+
+
+def test_slow_losers_settle_with_their_real_latency(stats):
+    slow, fast = RoutedEcho("slow", delay=0.15), RoutedEcho("fast")
+    interface = review(slow=slow, fast=fast)
+    assert interface.get_result().get("Theme", "abstract").calls == 1
+
+    # The slow backend lost every race but answered: it stays healthy, measured to its answer
+    # and not to the hedge delay
+    keys = [("slow", evaluation, False) for evaluation in ("Theme", "Grammar", "Cohesion")]
+    wait_for(lambda: all(stats.latencies(key) for key in keys))
+    assert min(latency for key in keys for latency in stats.latencies(key)) >= 0.15
+    assert stats.error_rate("slow") == 0
+    assert stats.healthy("slow")
+
+
+def test_attempts_run_on_daemon_threads():
+    pool = routing.AttemptPool(max_workers=1, thread_name_prefix="test")
+    first, second = routing.Future(), routing.Future()
+    pool.run(first, threading.current_thread)
+    pool.run(second, threading.current_thread)
+
+    assert first.result(timeout=1) is second.result(timeout=1)
+    assert first.result().daemon
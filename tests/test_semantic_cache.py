@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from interfaces.base import AsyncBaseInterface  # noqa: E402
+from interfaces.results import HIT, MISS  # noqa: E402
+from interfaces.semantic_cache import HashingEmbedder, SemanticCache  # noqa: E402
+from tests.fakes import EchoInterface  # noqa: E402
+
+TEXT = "The results show that the proposed method improves the accuracy of the classifier."
+
+
+def test_near_duplicates_are_hits():
+    cache = SemanticCache(None, HashingEmbedder(256), threshold=0.9)
+    cache.set("theme", TEXT, "review")
+
+    assert cache.get("theme", TEXT.replace("results show", "results, show")) is not None
+    assert cache.get("cohesion", TEXT) is None
+    assert cache.get("theme", "Something else entirely.") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SemanticCache(None, HashingEmbedder(256), max_entries=2)
+    cache.set("theme", "first text", "1")
+    cache.set("theme", "second text", "2")
+    cache.get("theme", "first text")
+    cache.set("theme", "third text", "3")
+
+    assert len(cache) == 2
+    assert cache.get("theme", "second text") is None
+    assert cache.get("theme", "first text") == (pytest.approx(1), "1")
+
+
+def test_workers_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "semantic.sqlite3")
+    first = SemanticCache(path, HashingEmbedder(256))
+    second = SemanticCache(path, HashingEmbedder(256))
+    first.set("theme", "first text", "1")
+    second.set("theme", "second text", "2")
+
+    # Each one reads what the other wrote, and a new process finds both
+    assert first.get("theme", "second text") == (pytest.approx(1), "2")
+    assert second.get("theme", "first text") == (pytest.approx(1), "1")
+    reopened = SemanticCache(path, HashingEmbedder(256))
+    assert len(reopened) == 2
+
+
+class SimilarEchoInterface(EchoInterface):
+    def __init__(self, *args: Any, cache: SemanticCache, **kwargs: Any):
+        self._semantic_cache = cache
+        super().__init__(*args, **kwargs)
+
+    def semantic_cache(self) -> Optional[Any]:
+        return self._semantic_cache
+
+    def evaluate_theme(self, prompt: str) -> str:
+        return self.evaluate_similar(
+            "theme", prompt, lambda: EchoInterface.evaluate_theme(self, prompt)
+        )
+
+
+def test_semantic_hits_are_reported_as_hits():
+    cache = SemanticCache(None, HashingEmbedder(256))
+    first = SimilarEchoInterface({"abstract": TEXT}, cache=cache)
+    response = first.response
+    second = SimilarEchoInterface({"abstract": TEXT + " "}, cache=cache)
+
+    assert second.response == response
+    result = second.get_result().get("Theme", "abstract")
+    assert result is not None
+    assert (result.cache_status, result.calls, result.cached_calls) == (HIT, 1, 1)
+    assert first.get_result().get("Theme", "abstract").cache_status == MISS
+    assert len(second.requests) == 1
+
+
+class ThreadRecordingCache(SemanticCache):
+    # Keeps the threads every lookup and store ran on
+    def __init__(self) -> None:
+        super().__init__(None, HashingEmbedder(256))
+        self.threads: List[threading.Thread] = []
+
+    def get(self, namespace: str, text: str) -> Any:
+        self.threads.append(threading.current_thread())
+        return super().get(namespace, text)
+
+    def set(self, namespace: str, text: str, value: str) -> None:
+        self.threads.append(threading.current_thread())
+        super().set(namespace, text, value)
+
+
+class AsyncSimilarInterface(AsyncBaseInterface):
+    def __init__(self, cache: SemanticCache):
+        self._semantic_cache = cache
+        super().__init__("context", {"abstract": TEXT}, "model", [], use_cache=False)
+
+    async def validate_initialization(self) -> None:
+        pass
+
+    async def _call_model(self, request: Dict[str, Any]) -> str:
+        return "review"
+
+    def semantic_cache(self) -> Optional[Any]:
+        return self._semantic_cache
+
+
+def test_async_lookups_run_off_the_event_loop():
+    cache = ThreadRecordingCache()
+    interface = AsyncSimilarInterface(cache)
+
+    async def evaluate() -> str:
+        return "review"
+
+    async def main() -> List[str]:
+        return [await interface.evaluate_similar("theme", TEXT, evaluate) for _ in range(2)]
+
+    assert asyncio.run(main()) == ["review", "review"]
+    assert cache.stats()["hits"] == 1
+    assert len(cache.threads) == 3
+    assert threading.current_thread() not in cache.threads
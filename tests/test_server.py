@@ -0,0 +1,79 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("tornado")
+
+import tornado.httpserver  # noqa: E402
+import tornado.netutil  # noqa: E402
+from tornado.httpclient import AsyncHTTPClient  # noqa: E402
+
+from server import ReviewStore, last_event_id, make_app, run_review  # noqa: E402
+from tests.fakes import EchoInterface  # noqa: E402
+
+PROMPTS = {"abstract": "short abstract", "introduction": "short introduction"}
+
+
+@pytest.mark.parametrize(
+    "value, expected", [(None, -1), ("", -1), ("abc", -1), ("-5", -1), ("3", 3), (" 2 ", 2)]
+)
+def test_last_event_id(value, expected):
+    assert last_event_id(value) == expected
+
+
+def fetch(store, path, **kwargs):
+    # Serves the app on a free port for the one request
+    async def request():
+        sockets = tornado.netutil.bind_sockets(0, "127.0.0.1")
+        server = tornado.httpserver.HTTPServer(make_app(store, executor))
+        server.add_sockets(sockets)
+        port = sockets[0].getsockname()[1]
+        try:
+            return await AsyncHTTPClient().fetch(
+                f"http://127.0.0.1:{port}{path}", raise_error=False, **kwargs
+            )
+        finally:
+            server.stop()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return asyncio.run(request())
+
+
+def post_review(store, prompts):
+    body = json.dumps({"model": "GPT-3.5", "context": "", "prompts": prompts})
+    return fetch(store, "/reviews", method="POST", body=body)
+
+
+def test_unknown_sections_are_rejected():
+    store = ReviewStore(":memory:")
+    response = post_review(store, {**PROMPTS, "conclusion": "c", "methods": "m"})
+    assert response.code == 400
+    assert "abstract, introduction, conclusion" in json.loads(response.body)["error"]
+    assert post_review(store, PROMPTS).code == 400
+
+
+def test_malformed_last_event_id_replays_the_stream():
+    store = ReviewStore(":memory:")
+    interface = EchoInterface(PROMPTS)
+    store.create("ab12", "Echo", interface)
+    run_review(store, "ab12", interface)
+
+    response = fetch(store, "/reviews/ab12/events", headers={"Last-Event-ID": "abc"})
+    assert response.code == 200
+    body = response.body.decode("utf-8")
+    assert body.startswith("id: 0\n")
+    assert body.endswith('event: done\ndata: {"status": "done", "error": null}\n\n')
+
+
+def test_snapshots_are_served_by_id():
+    store = ReviewStore(":memory:")
+    interface = EchoInterface(PROMPTS)
+    store.create("cd34", "Echo", interface)
+    run_review(store, "cd34", interface)
+
+    response = fetch(store, "/reviews/cd34")
+    assert response.code == 200
+    assert json.loads(response.body)["response"] == interface.response
+    assert fetch(store, "/reviews/ef56").code == 404
@@ -1,9 +1,22 @@
 import os
+import threading
 from typing import List
 
-from dotenv import load_dotenv
+_environment_loaded = False
+_environment_lock = threading.Lock()
 
-load_dotenv()
+
+def load_environment() -> None:
+    # Reads the .env file once per process, before the first backend is imported
+    global _environment_loaded
+
+    with _environment_lock:
+        if _environment_loaded:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _environment_loaded = True
 
 
 def should_have_all_defined(variables: List[str]):
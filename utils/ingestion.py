@@ -0,0 +1,245 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from utils.cache import LRUCache
+
+# Bumped whenever the segmentation changes, so sections cached by an older parser are ignored
+PARSER_VERSION = 1
+
+SECTIONS = ("abstract", "introduction", "conclusion")
+
+# DoCO/DEO rhetorical sections (deo:Introduction, deo:Conclusion, doco:Bibliography, ...) and
+# the headings that open them, in English and Portuguese
+SECTION_HEADINGS = {
+    "abstract": r"abstract|resumo",
+    "introduction": r"introduction|introdu[çc][ãa]o",
+    "related_work": r"related works?|background|preliminaries|literature review"
+    r"|trabalhos relacionados|fundamenta[çc][ãa]o te[óo]rica",
+    "methods": r"methods?|methodology|materials and methods|proposed (?:method|approach)"
+    r"|metodologia",
+    "results": r"results|experiments?|experimental results|evaluation|resultados",
+    "discussion": r"discussion|discuss[ãa]o",
+    "conclusion": r"conclusions?|concluding remarks|conclusions? and future works?"
+    r"|conclus[ãa]o|considera[çc][õo]es finais",
+    "acknowledgements": r"acknowledge?ments?|agradecimentos",
+    "references": r"references|bibliography|refer[êe]ncias(?: bibliogr[áa]ficas)?",
+    "appendix": r"appendix|appendices|ap[êe]ndices?",
+}
+# Everything the reader may skip once the wanted sections were found
+BACK_MATTER = ("acknowledgements", "references", "appendix")
+
+HEADING = re.compile(
+    # Optional top level number ("1", "2.", "IV.") but not subsections such as "2.1"
+    r"^(?:(?:\d+|[IVX]+)\.?\s+)?(?:"
+    + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_HEADINGS.items())
+    # Run-in headings ("Abstract. We propose", "Abstract—We propose") keep their text
+    + r")(?:\s*[.:—–-]\s*(?P<rest>.*)|\s*)$",
+    re.IGNORECASE,
+)
+PAGE_NUMBER = re.compile(r"^\d{1,4}$")
+
+LATEX_COMMENT = re.compile(r"(?<!\\)%.*$")
+LATEX_SECTION = re.compile(r"^\\(?:section|chapter)\*?(?:\[[^\]]*\])?\{(?P<title>[^}]*)\}")
+LATEX_DROP = re.compile(
+    r"\s*~?\\(?:cite[tp]?|ref|eqref|autoref|label|footnote|(?:sub)+section|paragraph)\*?"
+    r"(?:\[[^\]]*\])?\{[^}]*\}"
+)
+LATEX_ESCAPED = re.compile(r"\\([%&_#$])")
+LATEX_UNWRAP = re.compile(r"\\(?:emph|textbf|textit|texttt|underline|textsc)\{([^}]*)\}")
+LATEX_FLOATS = re.compile(r"\\(begin|end)\{(?:figure|table|algorithm|equation|align)\*?\}")
+
+Data = Union[mmap.mmap, bytes]
+
+PARSED = LRUCache(int(os.getenv("REVAISOR_INGESTION_CACHE_SIZE", "64")))
+
+
+def classify_heading(line: str) -> Optional[Tuple[str, str]]:
+    # Returns the section a heading line opens and the text that follows a run-in heading
+    # Headings are capitalized or numbered, a wrapped line that is just "results" is not one
+    if not line[:1].isupper() and not line[:1].isdigit():
+        return None
+    match = HEADING.match(line)
+    if match is None:
+        return None
+    section = next(name for name in SECTION_HEADINGS if match.group(name))
+    rest = match.group("rest") or ""
+    # Only the abstract is commonly run in, "Results show that ..." is not a heading
+    if rest and section != "abstract":
+        return None
+    return section, rest
+
+
+def join_lines(lines: Iterable[str]) -> str:
+    # Undoes the line breaks (and hyphenation) of the layout, keeping blank lines as paragraphs
+    paragraphs: List[str] = []
+    current = ""
+    for line in lines:
+        if not line:
+            if current:
+                paragraphs.append(current)
+                current = ""
+        elif current.endswith("-") and line[:1].islower():
+            current = current[:-1] + line
+        else:
+            current = f"{current} {line}" if current else line
+    if current:
+        paragraphs.append(current)
+    return "\n\n".join(paragraphs)
+
+
+class SectionSegmenter:
+    def __init__(self, wanted: Iterable[str] = SECTIONS):
+        self.wanted = tuple(wanted)
+        self.current: Optional[str] = None
+        self._lines: Dict[str, List[str]] = {}
+
+    @property
+    def finished(self) -> bool:
+        # The back matter comes after every section we care about, so reading can stop there
+        return self.current in BACK_MATTER and all(name in self._lines for name in self.wanted)
+
+    def start(self, section: Optional[str]) -> None:
+        self.current = section
+        if section in self.wanted:
+            self._lines.setdefault(section, [])
+
+    def feed(self, line: str) -> None:
+        if self.current in self.wanted:
+            self._lines[self.current].append(line)
+
+    def feed_text(self, line: str) -> None:
+        # Plain text (extracted from a PDF page): headings are lines of their own
+        line = line.strip()
+        if PAGE_NUMBER.match(line):
+            return
+        heading = classify_heading(line)
+        if heading is not None:
+            self.start(heading[0])
+            line = heading[1]
+            if not line:
+                return
+        self.feed(line)
+
+    def sections(self) -> Dict[str, str]:
+        return {name: join_lines(self._lines[name]) for name in self.wanted if name in self._lines}
+
+
+@contextmanager
+def open_mapped(path: str) -> Iterator[Data]:
+    # The file is mapped, not read: pages are loaded by the OS only when the parser touches them
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def as_stream(data: Data) -> IO[bytes]:
+    if isinstance(data, mmap.mmap):
+        data.seek(0)
+        return data  # type: ignore[return-value]
+    return io.BytesIO(data)
+
+
+def document_kind(name: str, data: Data) -> str:
+    if data[:5] == b"%PDF-" or name.lower().endswith(".pdf"):
+        return "pdf"
+    return "latex"
+
+
+def iter_pdf_pages(data: Data) -> Iterator[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("pypdf is not installed. Please, refer to the README.md file.")
+
+    # pypdf reads the objects of each page from the stream on demand
+    for page in PdfReader(as_stream(data)).pages:
+        yield page.extract_text() or ""
+
+
+def segment_pdf(data: Data, wanted: Iterable[str]) -> Dict[str, str]:
+    segmenter = SectionSegmenter(wanted)
+    for page in iter_pdf_pages(data):
+        for line in page.splitlines():
+            segmenter.feed_text(line)
+        if segmenter.finished:
+            break
+    return segmenter.sections()
+
+
+def segment_latex(data: Data, wanted: Iterable[str]) -> Dict[str, str]:
+    segmenter = SectionSegmenter(wanted)
+    stream = as_stream(data)
+    in_float = 0
+    for raw_line in iter(stream.readline, b""):
+        line = LATEX_COMMENT.sub("", raw_line.decode("utf-8", errors="replace")).strip()
+        if line.startswith("\\end{document}"):
+            break
+
+        section = LATEX_SECTION.match(line)
+        if section is not None:
+            heading = classify_heading(LATEX_UNWRAP.sub(r"\1", section.group("title")).strip())
+            segmenter.start(heading[0] if heading is not None and not heading[1] else None)
+        elif line.startswith("\\begin{abstract}"):
+            segmenter.start("abstract")
+        elif line.startswith("\\end{abstract}"):
+            segmenter.start(None)
+        elif line.startswith(("\\bibliography", "\\begin{thebibliography}", "\\printbibliography")):
+            segmenter.start("references")
+        elif line.startswith("\\appendix"):
+            segmenter.start("appendix")
+        else:
+            # Figures, tables and equations are not prose to review
+            floats = LATEX_FLOATS.findall(line)
+            if floats or in_float:
+                in_float = max(0, in_float + floats.count("begin") - floats.count("end"))
+            else:
+                line = LATEX_UNWRAP.sub(r"\1", LATEX_DROP.sub("", line))
+                segmenter.feed(LATEX_ESCAPED.sub(r"\1", line).strip())
+
+        if segmenter.finished:
+            break
+    return segmenter.sections()
+
+
+def extract_sections_from_data(
+    name: str, data: Data, wanted: Iterable[str] = SECTIONS, cache: Optional[Any] = None
+) -> Dict[str, str]:
+    # cache is an optional persistent cache (get(key) and set(key, text), e.g. the response
+    # cache), so sections parsed by another process are not parsed again
+    wanted = tuple(wanted)
+    # Hashing the mapped file does not copy it either
+    digest = hashlib.sha256(data).hexdigest()
+    key = LRUCache.key("ingestion", PARSER_VERSION, digest, wanted)
+
+    sections = PARSED.get(key)
+    if sections is not None:
+        return dict(sections)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        sections = json.loads(cached)
+    else:
+        if document_kind(name, data) == "pdf":
+            sections = segment_pdf(data, wanted)
+        else:
+            sections = segment_latex(data, wanted)
+        if cache is not None:
+            cache.set(key, json.dumps(sections))
+    PARSED.set(key, sections)
+    return dict(sections)
+
+
+def extract_sections(
+    path: str, wanted: Iterable[str] = SECTIONS, cache: Optional[Any] = None
+) -> Dict[str, str]:
+    # Returns the prompts dict (section name -> text) the interfaces expect
+    with open_mapped(path) as data:
+        return extract_sections_from_data(path, data, wanted, cache)